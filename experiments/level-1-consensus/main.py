@@ -9,7 +9,7 @@ Date:    2017-02
 import pprint, glob, time, datetime, sys
 sys.path.append("../../preflibtools")
 
-from preflibtools import consensus, io, generate_profiles, domain_restriction
+from preflibtools import consensus, io, generate_profiles, domain_restriction, result_store, corpus, conditional, montecarlo
 from collections import Counter
 import pandas
 from pandas import DataFrame
@@ -17,6 +17,16 @@ from pandas.tools import plotting
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+# Version of the per-profile analyses; bump it when their code changes, so that stored results are not reused.
+ANALYSIS_VERSION = "1"
+
+# The per-profile analyses, by the names under which their results are stored.
+ANALYSES = (
+	("level1-strict", consensus.getLevel1Consensus),
+	("level1-flexible", lambda profile: consensus.getLevel1Consensus(profile, flexible=True)),
+	("single-peaked", lambda profile: domain_restriction.is_single_peaked_orders(map(list,profile.keys()))),
+)
+
 class ConsensusCounter(object):
 	def __init__(self, verbose=False):
 		self.total = Counter()
@@ -26,21 +36,19 @@ class ConsensusCounter(object):
 		self.verbose = verbose
 		
 	def count(self, profile, numalternatives):
+		results = []
+		for name, function in ANALYSES:
+			before = time.process_time()
+			results.append(function(profile))
+			if (self.verbose): print(name, "time: ",time.process_time()-before)
+		self.countResults(numalternatives, *results)
+
+	def countResults(self, numalternatives, consensusPref, weakConsensusPref, socialAxis):
 		self.total[numalternatives] += 1
-
-		before = time.process_time()
-		consensusPref = consensus.getLevel1Consensus(profile)
 		if (self.verbose): print("consensus pref: ",consensusPref)
 		self.consensusExists[numalternatives] += (consensusPref is not None)
-		if (self.verbose): print("time: ",time.process_time()-before)
-
-		before = time.process_time()
-		consensusPref = consensus.getLevel1Consensus(profile, flexible=True)
-		if (self.verbose): print("flexible consensus pref: ",consensusPref)
-		self.weakConsensusExists[numalternatives] += (consensusPref is not None)
-		if (self.verbose): print("time: ",time.process_time()-before)
-		
-		socialAxis = domain_restriction.is_single_peaked_orders(map(list,profile.keys()))
+		if (self.verbose): print("flexible consensus pref: ",weakConsensusPref)
+		self.weakConsensusExists[numalternatives] += (weakConsensusPref is not None)
 		self.singlePeaked[numalternatives] += (len(socialAxis)>0)
 		
 	def getTotal(self): return sum(self.total.values())
@@ -59,12 +67,15 @@ class ConsensusCounter(object):
 def preflibDataExperiment():
 	print("\nPreflib Data")
 	counter = ConsensusCounter(verbose=True)
-	for filename in sorted(glob.iglob('../preflibdata/*.soc')):
-		profileObject = io.read_weighted_preflib_file(filename)
-		profile = profileObject.get_map_from_order_to_weight()
+	profileObjects = corpus.loadCorpus('../preflibdata', patterns=("*.soc",))
+	profiles = [profileObject.get_map_from_order_to_weight() for profileObject in profileObjects.values()]
+	# One batched lookup and insert per analysis, over the whole corpus; only the profiles that are not stored yet are analysed.
+	with result_store.ResultStore("results/preflib.sqlite") as store:
+		results = [store.getOrCompute(profiles, name, ANALYSIS_VERSION, function) for name, function in ANALYSES]
+	for (filename, profileObject), profile, found in zip(profileObjects.items(), profiles, zip(*results)):
 		numalternatives = profileObject.num_of_alternatives()
 		print(filename, numalternatives, profile)
-		counter.count(profile, numalternatives)
+		counter.countResults(numalternatives, *found)
 	counter.show(iterations)
 
 def ImpartialCultureExperiment(iterations:int, numvotes:int, numreplace:int, numalternativess:list):
@@ -87,28 +98,67 @@ def SinglePeakedExperiment(iterations:int, numvotes:int, numalternativess:list):
 			counter.count(profile, numalternatives)
 	counter.show()
 
-def MallowsExperiment(iterations:int, numvotess:int, phis:float, numalternativess:list, filename:str):
-	results =  DataFrame(columns=('iterations', 'numvotes', 'phi', 'numalternatives', 'Level-1 Consensus', 'Flexible Consensus', 'Single-peaked'))
+PROPERTIES = ('Level-1 Consensus', 'Flexible Consensus', 'Single-peaked')
+
+def mallowsBlockSampler(numvotes:int, phi:float, numalternatives:int):
+	"""
+	Returns a function that draws a block of Mallows profiles (in one vectorized draw) and checks them with the batch checkers.
+	"""
+	generator = conditional.ProfileGenerator("mallows", numvotes, numalternatives, mix=[1.0], phis=[phi], refs=[list(range(numalternatives))])
+	def sampleBlock(size:int) -> dict:
+		counts = generator(size)
+		strict, flexible = consensus.getLevel1ConsensusBatch(counts, numalternatives)
+		return {'Level-1 Consensus': strict, 'Flexible Consensus': flexible,
+			'Single-peaked': domain_restriction.is_single_peaked_counts(counts, numalternatives)}
+	return sampleBlock
+
+def MallowsExperiment(iterations:int, numvotess:int, phis:float, numalternativess:list, filename:str,
+		width:float=None, blockSize:int=100, interval:str="wilson"):
+	"""
+	With width=None (the default), runs a fixed number of iterations per (numalternatives, numvotes, phi) cell, with ConsensusCounter.
+	Setting a width opts in to the adaptive mode: each cell draws profiles in blocks of blockSize, until the confidence interval
+	of each probability is at most width wide, with iterations as a hard cap (see montecarlo.estimateProbabilities).
+	The adaptive mode uses the batch checkers, so its results are not directly comparable with the default mode:
+	* consensus.getLevel1ConsensusBatch may differ from getLevel1Consensus in rare profiles with several most-frequent rankings;
+	* domain_restriction.is_single_peaked_counts is exact, while is_single_peaked_orders (used by ConsensusCounter)
+	  misses the axis of some single-peaked profiles, so the Single-peaked column can be higher in the adaptive mode.
+	The CSV records the number of iterations of each cell and the interval bounds of each probability.
+	"""
+	results =  DataFrame(columns=('iterations', 'numvotes', 'phi', 'numalternatives') + PROPERTIES
+		+ tuple(name+' '+bound for name in PROPERTIES for bound in ('low','high')))
 	
 	for numalternatives in numalternativess:
 		alternatives = range(numalternatives)
 		for numvotes in numvotess:
 			for phi in phis:
 				print("\nMallows with phi="+str(phi)+", numvotes="+str(numvotes)+", numalternative="+str(numalternatives)+", filename="+filename)
-				counter = ConsensusCounter(verbose=False)
-				for i in range(iterations):
-					profile = generate_profiles.gen_mallows_voteset(numvotes, alternatives, [1], [phi], [alternatives])
-					print (".",end='',flush=True)
-					# print(numalternatives, profile)
-					counter.count(profile, numalternatives)
-				counter.show()
-				results.loc[len(results)] = [iterations, numvotes, phi, numalternatives, counter.getConsensusExists(), counter.getWeakConsensusExists(), counter.getSinglePeaked()]
+				if width is None:
+					counter = ConsensusCounter(verbose=False)
+					for i in range(iterations):
+						profile = generate_profiles.gen_mallows_voteset(numvotes, alternatives, [1], [phi], [alternatives])
+						print (".",end='',flush=True)
+						# print(numalternatives, profile)
+						counter.count(profile, numalternatives)
+					counter.show()
+					samples = iterations
+					successes = dict(zip(PROPERTIES, (counter.getConsensusExists(), counter.getWeakConsensusExists(), counter.getSinglePeaked())))
+					bounds = {name: montecarlo.INTERVALS[interval](successes[name], samples) for name in PROPERTIES}
+				else:
+					estimate = montecarlo.estimateProbabilities(mallowsBlockSampler(numvotes, phi, numalternatives), width,
+						blockSize=blockSize, maxSamples=iterations, interval=interval)
+					samples = estimate["samples"]
+					successes = {name: estimate[name]["successes"] for name in PROPERTIES}
+					bounds = {name: (estimate[name]["low"], estimate[name]["high"]) for name in PROPERTIES}
+					print(samples, "iterations:", {name: bounds[name] for name in PROPERTIES})
+				results.loc[len(results)] = [samples, numvotes, phi, numalternatives] + [successes[name] for name in PROPERTIES] \
+					+ [bound for name in PROPERTIES for bound in bounds[name]]
 				results.to_csv("results/"+filename+".csv")
 
 def probabilityOfCondorcetWinner(numvoters:int) -> float:
 	"""
 	From "The expected probability of Condorcet's paradox", by William V. Gehrlein.
 	Economics Letters, Vol. 7, No. 1. (1981), pp. 33-37, doi:10.1016/0165-1765(81)90107-5
+	For exact probabilities of other properties and distributions, see enumeration.exactProbabilities.
 	"""
 	n = numvoters
 	return (15*(n+3)*(n+3))/(16*(n+2)*(n+4))
@@ -168,6 +218,8 @@ if createResults:
 	#ImpartialCultureExperiment(iterations, numvotes, numreplace=0, numalternativess=[3,4])
 	#SinglePeakedExperiment(iterations, numvotes, numalternativess=[3,4])
 	filename = "mallows_"+str(datetime.now()); 	  MallowsExperiment(iterations, numvotess=[100,200,300,400,500,600,700,800,900,1000], phis=[0,.05,.1,.15,.2,.25,.3,.4,.5,.6,.7,.8,.9,1.0], numalternativess=[3,4,5], filename=filename)
+	# Opt-in adaptive mode, e.g. width=0.06 (about the precision of 1000 fixed iterations at probability 1/2), with 2*iterations as the cap:
+	# MallowsExperiment(2*iterations, ..., filename=filename, width=0.06)
 else:   # Use existing results:
 	filename = "mallows_1000iters"
 	
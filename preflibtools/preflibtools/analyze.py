@@ -0,0 +1,167 @@
+#!python3
+"""
+Runs a set of analyses over a whole corpus of PrefLib files of orders, with a pool of worker processes.
+
+Per-file results are written as JSON lines (one object per file) as soon as each file is done;
+a summary with the throughput and the time spent in each analysis is printed to stderr at the end.
+
+Installed as the console script preflib-analyze, e.g.:
+
+	preflib-analyze ../preflibdata --analyses single-peaked,condorcet --processes 8 > results.jsonl
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import argparse, json, os, sys, time
+from multiprocessing import Pool
+from preflibtools import consensus, corpus, domain_restriction, winners
+
+
+def singlePeakedAxis(profile) -> list:
+	axis = domain_restriction.is_single_peaked_orders(profile.orders.tolist())
+	return axis if axis != [] else None
+
+def level1Strict(profile) -> list:
+	return consensus.getLevel1Consensus(profile.get_map_from_order_to_weight(), flexible=False)
+
+def level1Flexible(profile) -> list:
+	return consensus.getLevel1Consensus(profile.get_map_from_order_to_weight(), flexible=True)
+
+def condorcet(profile):
+	return winners.condorcetWinner(winners.pairwiseMatrix(profile), sorted(profile.objects))
+
+def plurality(profile) -> list:
+	return winners.scoringWinners(winners.positionMatrix(profile), winners.pluralityVector(profile.num_of_alternatives()), sorted(profile.objects))
+
+def borda(profile) -> list:
+	return winners.scoringWinners(winners.positionMatrix(profile), winners.bordaVector(profile.num_of_alternatives()), sorted(profile.objects))
+
+
+# name -> (function, whether it requires complete strict orders)
+ANALYSES = {
+	"single-peaked":   (singlePeakedAxis, True),
+	"level1-strict":   (level1Strict, True),
+	"level1-flexible": (level1Flexible, True),
+	"condorcet":       (condorcet, False),
+	"plurality":       (plurality, False),
+	"borda":           (borda, False),
+}
+
+
+def analyseFile(task: tuple) -> dict:
+	"""
+	Parses (or reads from the corpus cache) a single file and runs the given analyses on it. Runs in the worker processes.
+
+	INPUT: task, a tuple (path, cachePath, names).
+	OUTPUT: a dict with the file, its size, the result of each analysis, and the seconds spent in each analysis.
+	Analyses that require strict orders are skipped (result None) on files with ties or partial orders.
+
+	>>> import tempfile
+	>>> root = tempfile.mkdtemp()
+	>>> path = os.path.join(root, "a.soc")
+	>>> with open(path, "w") as f: _ = f.write("3\\n1,x\\n2,y\\n3,z\\n7,7,3\\n3,1,2,3\\n2,2,3,1\\n2,3,1,2\\n")
+	>>> record = analyseFile((path, None, ["condorcet", "borda", "single-peaked"]))
+	>>> record["results"], record["skipped"], sorted(record["seconds"])
+	({'condorcet': None, 'borda': [1], 'single-peaked': None}, [], ['borda', 'condorcet', 'single-peaked'])
+	"""
+	path, cachePath, names = task
+	profile = corpus.readCache(path, cachePath)
+	if profile is None:
+		path, profile = corpus.parseAndCache((path, cachePath))
+	strict = profile.is_strict()
+	record = {"file": path, "alternatives": profile.num_of_alternatives(), "voters": profile.numvoters,
+		"orders": len(profile.orders), "strict": strict, "results": {}, "skipped": [], "seconds": {}}
+	for name in names:
+		function, requiresStrict = ANALYSES[name]
+		if requiresStrict and not strict:
+			record["results"][name] = None
+			record["skipped"].append(name)
+			continue
+		start = time.perf_counter()
+		record["results"][name] = function(profile)
+		record["seconds"][name] = time.perf_counter() - start
+	return record
+
+
+def analyseCorpus(root: str, names: list, patterns: tuple=corpus.ORDER_PATTERNS, processes: int=None,
+		cacheDirectory: str=None, shard: tuple=(0,1)):
+	"""
+	Generates the records of analyseFile for all files under root, in the order in which they are done.
+
+	shard: a tuple (index, count); only the files whose position in the sorted file list is index modulo count
+	are analysed, so that a large corpus can be split between several machines.
+	"""
+	if cacheDirectory is None:
+		cacheDirectory = os.path.join(root, corpus.CACHE_DIRECTORY_NAME)
+	index, count = shard
+	tasks = [(path, os.path.join(cacheDirectory, os.path.relpath(path, root)+".pickle") if cacheDirectory else None, names)
+		for path in corpus.findFiles(root, patterns)[index::count]]
+	if processes == 1 or len(tasks) <= 1:
+		yield from map(analyseFile, tasks)
+	else:
+		with Pool(processes) as pool:
+			yield from pool.imap_unordered(analyseFile, tasks)
+
+
+def summarize(records, output=sys.stdout) -> dict:
+	"""
+	Writes each record to output as a JSON line, and returns aggregate statistics:
+	the number of files, and for each analysis the number of files on which it ran, the number with
+	a non-None result (e.g. single-peaked, or with a Condorcet winner), and the total seconds.
+	"""
+	summary = {"files": 0, "analyses": {}}
+	for record in records:
+		output.write(json.dumps(record) + "\n")
+		output.flush()
+		summary["files"] += 1
+		for name, seconds in record["seconds"].items():
+			stats = summary["analyses"].setdefault(name, {"files": 0, "found": 0, "seconds": 0.0})
+			stats["files"] += 1
+			stats["found"] += record["results"][name] is not None
+			stats["seconds"] += seconds
+	return summary
+
+
+def main(argv: list=None):
+	parser = argparse.ArgumentParser(description='Run analyses over a corpus of PrefLib files, writing one JSON line per file.')
+	parser.add_argument('root', help='Directory to scan (recursively) for PrefLib files.')
+	parser.add_argument('-a', '--analyses', default=",".join(ANALYSES), help='Comma-separated analyses to run, from: '+", ".join(ANALYSES)+' (default: all).')
+	parser.add_argument('-p', '--processes', type=int, default=None, help='Number of worker processes (default: the number of cores).')
+	parser.add_argument('--patterns', default=",".join(corpus.ORDER_PATTERNS), help='Comma-separated file-name patterns (default: %(default)s).')
+	parser.add_argument('--shard', default="0/1", metavar='K/N', help='Analyse only the K-th of N shards of the corpus (default: %(default)s).')
+	parser.add_argument('--no-cache', dest='cache', action='store_false', help='Do not read or write the corpus parse cache.')
+	parser.add_argument('-o', '--output', default=None, help='File for the JSON lines (default: stdout).')
+	args = parser.parse_args(argv)
+
+	names = [name.strip() for name in args.analyses.split(",") if name.strip()]
+	unknown = [name for name in names if name not in ANALYSES]
+	if unknown:
+		parser.error("unknown analyses: " + ", ".join(unknown))
+	try:
+		shard = tuple(int(x) for x in args.shard.split("/"))
+		if len(shard) != 2 or not 0 <= shard[0] < shard[1]:
+			raise ValueError
+	except ValueError:
+		parser.error("--shard must be K/N with 0 <= K < N")
+
+	start = time.perf_counter()
+	records = analyseCorpus(args.root, names, patterns=tuple(args.patterns.split(",")), processes=args.processes,
+		cacheDirectory=None if args.cache else "", shard=shard)
+	if args.output:
+		with open(args.output, "w") as output:
+			summary = summarize(records, output)
+	else:
+		summary = summarize(records)
+	elapsed = time.perf_counter() - start
+
+	print("{} files in {:.2f} seconds ({:.1f} files/sec)".format(summary["files"], elapsed, summary["files"]/elapsed if elapsed>0 else 0.0), file=sys.stderr)
+	for name in names:
+		stats = summary["analyses"].get(name, {"files": 0, "found": 0, "seconds": 0.0})
+		print("  {:16} {:6} files  {:6} found  {:9.3f} s total  {:9.3f} ms/file".format(
+			name, stats["files"], stats["found"], stats["seconds"], 1000*stats["seconds"]/stats["files"] if stats["files"] else 0.0), file=sys.stderr)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,213 @@
+#!python3
+"""
+Bootstrap resampling of a weighted profile, to estimate how stable its properties
+(level-1 consensus, single-peakedness, winners) are under resampling of the voters.
+
+Each replicate is a single multinomial draw of the voters over the distinct orders of the profile
+(from get_map_from_order_to_weight), so the voters are never expanded.
+The replicates are evaluated in chunks, as matrices with one row per replicate:
+* pairwise and scoring results are matrix products of the replicate weights with per-order summaries;
+* for complete strict orders of m <= 7 alternatives, consensus and single-peakedness use the batch checkers
+  (consensus.countProperties) on count vectors over the m! rankings.
+* for more alternatives, consensus uses consensus.checkAxesBatch on the replicate weights of the distinct orders,
+  with the Kendall distances of the distinct orders from each potential axis, which are computed once per axis.
+  As in the batch checkers, all the most-frequent orders of a replicate are tried as axes.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import math
+import numpy as np
+from preflibtools import consensus, domain_restriction, inversions, permutation_tables, winners
+from preflibtools.profile import CompactOrderProfile
+
+
+BOOLEAN_ANALYSES = ("level1-strict", "level1-flexible", "single-peaked")
+ANALYSES = BOOLEAN_ANALYSES + ("condorcet", "plurality", "borda")
+
+
+def distinctOrders(profile) -> CompactOrderProfile:
+	"""
+	Returns a CompactOrderProfile with one row per distinct order of the given profile, weighted by its total weight.
+
+	>>> distinctOrders(CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,2,3],[2,1,3],[1,2,3]], weights=[5,2,1])).get_map_from_order_to_weight()
+	{(1, 2, 3): 6, (2, 1, 3): 2}
+	>>> distinctOrders(CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,3,2],[2,0,0]], ties=[[False,True,False],[False,False,False]])).get_order_strings()
+	['{1,3},2', '2']
+	>>> from preflibtools.profile import WeightedOrderProfile, WeightedPreferenceOrder
+	>>> distinctOrders(WeightedOrderProfile({1:"a",2:"b"}, {1: WeightedPreferenceOrder({1:[1],2:[2]}, weight=3), 2: WeightedPreferenceOrder({1:[2],2:[1]}, weight=2)})).numvoters
+	5
+	"""
+	orderToWeight = profile.get_map_from_order_to_weight()
+	# A WeightedOrderProfile (e.g. from io.read_weighted_preflib_file) has no numvoters.
+	numvoters = getattr(profile, "numvoters", None)
+	return CompactOrderProfile.from_map(profile.objects, orderToWeight, numvoters if numvoters is not None else sum(orderToWeight.values()))
+
+
+def resampleWeights(weights: np.ndarray, numReplicates: int) -> np.ndarray:
+	"""
+	Draws the weights of the distinct orders in numReplicates bootstrap replicates: one multinomial draw per replicate,
+	of as many voters as the total weight, with probabilities proportional to the weights.
+
+	>>> np.random.seed(0)
+	>>> resampleWeights(np.array([6, 2, 0]), 4).sum(axis=1).tolist()
+	[8, 8, 8, 8]
+	"""
+	weights = np.asarray(weights, dtype=float)
+	total = weights.sum()
+	return np.random.multinomial(int(round(total)), weights / total, size=numReplicates)
+
+
+def bootstrap(profile, numReplicates: int=1000, analyses: tuple=ANALYSES, chunkSize: int=2**22) -> dict:
+	"""
+	Evaluates the given analyses on numReplicates bootstrap replicates of the profile.
+
+	INPUT:
+	profile       - a CompactOrderProfile, a WeightedOrderProfile, or any profile with objects, num_of_alternatives() and get_map_from_order_to_weight().
+	numReplicates - int, the number B of replicates.
+	analyses      - names from ANALYSES. level1-strict, level1-flexible and single-peaked require complete strict orders.
+	chunkSize     - int, bounds the number of matrix elements processed at once.
+
+	OUTPUT: dict that maps each analysis to an array with one row per replicate:
+	* level1-strict, level1-flexible, single-peaked: boolean array of shape (B,).
+	* condorcet: array of shape (B,), the Condorcet winner of each replicate, or 0 if there is none.
+	* plurality, borda: array of shape (B, m), the score of each object (in sorted(profile.objects)) in each replicate.
+
+	>>> np.random.seed(0)
+	>>> p = CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,2,3],[1,3,2],[2,1,3]], weights=[30,20,20])
+	>>> replicates = bootstrap(p, 100)
+	>>> replicates["level1-strict"].shape, replicates["borda"].shape
+	((100,), (100, 3))
+	>>> bool(replicates["single-peaked"].all()), set(replicates["condorcet"].tolist())
+	(True, {1})
+	>>> bool(np.all(replicates["borda"].sum(axis=1) == 3*70))
+	True
+
+	With more than 7 alternatives, the consensus of all replicates is checked together (see the module docstring):
+
+	>>> p8 = CompactOrderProfile({c: str(c) for c in range(1,9)}, orders=[[1,2,3,4,5,6,7,8],[2,1,3,4,5,6,7,8],[1,2,3,4,5,6,8,7]], weights=[50,10,1])
+	>>> replicates = bootstrap(p8, 100, ("level1-strict", "level1-flexible"))
+	>>> int(replicates["level1-strict"].sum()), int(replicates["level1-flexible"].sum())
+	(0, 100)
+	"""
+	unknown = [name for name in analyses if name not in ANALYSES]
+	if unknown:
+		raise ValueError("unknown analyses: "+", ".join(unknown))
+	distinct = distinctOrders(profile)
+	weights = distinct.weights
+	numOrders = len(weights)
+	m = distinct.num_of_alternatives()
+	booleanAnalyses = [name for name in analyses if name in BOOLEAN_ANALYSES]
+	if booleanAnalyses and not distinct.is_strict():
+		raise ValueError(", ".join(booleanAnalyses)+" require(s) complete strict orders")
+
+	# Per-order summaries, computed once:
+	ranks = winners.groupRanks(distinct)
+	ranked = np.isfinite(ranks)
+	# The products below are in float64, which uses BLAS, and is exact for integer weights below 2**53.
+	above = ((ranks[:,:,None] < ranks[:,None,:]) & ranked[:,None,:]).reshape(numOrders, m*m).astype(float)
+	scoreVectors = {"plurality": winners.pluralityVector(m), "borda": winners.bordaVector(m)}
+	orderScores = {name: np.where(ranked, vector[np.where(ranked, ranks, 0).astype(np.int64)], 0).astype(float) for name,vector in scoreVectors.items()}
+	useBatch = booleanAnalyses and m <= permutation_tables.MAX_ALTERNATIVES
+	if useBatch:
+		# the index of each distinct order among the m! rankings of the positions of the objects in sorted(objects)
+		rankingIndices = inversions.permutationsToIndices(np.argsort(ranks, axis=1))
+	objects = np.array(sorted(distinct.objects))
+	orderTuples = [tuple(order) for order in distinct.orders.tolist()]
+	singlePeakedCache = {}
+	consensusAnalyses = [name for name in ("level1-strict", "level1-flexible") if name in analyses]
+	if consensusAnalyses and not useBatch:
+		orderRanks = consensus.rankMatrix(orderTuples)
+		mahonian = inversions.mahonianRow(m)
+		axisDistances = {}   # the Kendall distance of each distinct order from the distinct order j, for each potential axis j
+
+	results = {}
+	for name in analyses:
+		shape = (numReplicates, m) if name in scoreVectors else (numReplicates,)
+		results[name] = np.zeros(shape, dtype=bool if name in BOOLEAN_ANALYSES else np.int64)
+	rowsPerChunk = max(1, chunkSize // max(numOrders, m*m, math.factorial(m) if useBatch else 1))
+	for start in range(0, numReplicates, rowsPerChunk):
+		end = min(numReplicates, start+rowsPerChunk)
+		replicateWeights = resampleWeights(weights, end-start)
+		if "condorcet" in analyses:
+			pairwise = (replicateWeights.astype(float) @ above).reshape(-1, m, m)
+			beats = (pairwise > pairwise.transpose(0,2,1)).sum(axis=2) == m-1
+			hasWinner = beats.any(axis=1)
+			results["condorcet"][start:end] = np.where(hasWinner, objects[beats.argmax(axis=1)], 0)
+		for name in scoreVectors:
+			if name in analyses:
+				results[name][start:end] = np.rint(replicateWeights.astype(float) @ orderScores[name])
+		if useBatch:
+			counts = np.zeros((end-start, math.factorial(m)), dtype=replicateWeights.dtype)
+			counts[:, rankingIndices] = replicateWeights
+			for name, values in consensus.countProperties(counts, m, booleanAnalyses).items():
+				results[name][start:end] = values
+		elif booleanAnalyses:
+			if consensusAnalyses:
+				# The potential axes of each replicate are its most frequent orders.
+				replicateIndices, axisIndices = np.nonzero(replicateWeights == replicateWeights.max(axis=1, keepdims=True))
+				for j in np.unique(axisIndices).tolist():
+					if j not in axisDistances:
+						axisDistances[j] = inversions.countInversions(orderRanks[:, np.argsort(orderRanks[j])])
+				dists = np.stack([axisDistances[j] for j in axisIndices.tolist()])
+				checks = dict(zip(("level1-strict", "level1-flexible"), consensus.checkAxesBatch(replicateWeights[replicateIndices], dists, mahonian)))
+				for name in consensusAnalyses:
+					results[name][start + replicateIndices[checks[name]]] = True
+			if "single-peaked" in analyses:
+				for r, row in enumerate(replicateWeights):
+					# Single-peakedness depends only on which orders are present, and supports repeat often.
+					key = np.packbits(row > 0).tobytes()
+					if key not in singlePeakedCache:
+						singlePeakedCache[key] = domain_restriction.is_single_peaked_orders([list(orderTuples[j]) for j in np.nonzero(row)[0]]) != []
+					results["single-peaked"][start+r] = singlePeakedCache[key]
+	return results
+
+
+def summarize(results: dict, objects: list, confidence: float=0.95) -> dict:
+	"""
+	Summarizes the replicates returned by bootstrap:
+	* level1-strict, level1-flexible, single-peaked: the fraction of replicates that have the property.
+	* condorcet: dict that maps each Condorcet winner (None for no winner) to the fraction of replicates in which it wins.
+	* plurality, borda: dict with "winners", the fraction of replicates in which each object is a (possibly tied) winner,
+	  and "scores", the percentile confidence interval of the score of each object.
+	objects is sorted(profile.objects).
+
+	>>> results = {"single-peaked": np.array([True, True, False, True]), "condorcet": np.array([1, 1, 0, 2]),
+	...            "borda": np.array([[3, 1], [2, 2], [1, 3], [4, 0]])}
+	>>> summary = summarize(results, [1, 2], confidence=0.5)
+	>>> summary["single-peaked"], summary["condorcet"]
+	(0.75, {1: 0.5, None: 0.25, 2: 0.25})
+	>>> summary["borda"]["winners"], summary["borda"]["scores"][1]
+	({1: 0.75, 2: 0.5}, (1.75, 3.25))
+	"""
+	summary = {}
+	for name, replicates in results.items():
+		if name in BOOLEAN_ANALYSES:
+			summary[name] = replicates.mean().item()
+		elif name == "condorcet":
+			values, counts = np.unique(replicates, return_counts=True)
+			order = np.argsort(-counts, kind="stable")
+			summary[name] = {(values[i].item() or None): counts[i].item() / len(replicates) for i in order}
+		else:
+			isWinner = replicates == replicates.max(axis=1, keepdims=True)
+			low, high = np.percentile(replicates, [50*(1-confidence), 50*(1+confidence)], axis=0)
+			summary[name] = {
+				"winners": {objects[c]: isWinner[:,c].mean().item() for c in range(len(objects))},
+				"scores": {objects[c]: (low[c].item(), high[c].item()) for c in range(len(objects))},
+			}
+	return summary
+
+
+if __name__ == "__main__":
+	import doctest, time
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	np.random.seed(1)
+	orders = [list(np.random.permutation(5)+1) for _ in range(50)]
+	profile = CompactOrderProfile({c: str(c) for c in range(1,6)}, orders=orders, weights=np.random.randint(1, 200, size=50))
+	start = time.time()
+	results = bootstrap(profile, 10000)
+	print("{} replicates of {} voters in {:.2f} seconds".format(10000, profile.numvoters, time.time()-start))
+	print(summarize(results, sorted(profile.objects)))
@@ -0,0 +1,146 @@
+#!python3
+"""
+Canonical forms of weighted profiles under relabeling of the alternatives,
+and a bounded cache of analysis results keyed on the canonical form.
+
+Level-1 consensus and single-peakedness do not change when the alternatives are renamed,
+so profiles that are identical up to relabeling can share a single computation.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import numpy as np
+from collections import OrderedDict
+from preflibtools import consensus, domain_restriction, permutation_tables
+
+
+def canonicalProfile(profile: dict) -> (tuple, list):
+	"""
+		Maps a weighted profile to a canonical form under permutations of the alternatives.
+
+		INPUT:
+		profile: dict that maps tuples that represent strict rankings to their weight (frequency).
+
+		OUTPUT: a tuple (canonical, labels):
+		* canonical: a tuple of (ranking, weight) pairs, sorted by ranking, where the alternatives are renamed 0,...,m-1.
+		  Two profiles have the same canonical form iff one of them is a relabeling of the other.
+		* labels: a list; labels[i] is the alternative of the given profile that was renamed to i.
+
+		The candidate relabelings are those that rename one of the most frequent rankings to (0,1,...,m-1);
+		the canonical form is the smallest of the resulting relabeled profiles.
+
+		>>> canonicalProfile({("a","b","c"):3, ("b","a","c"):2})
+		((((0, 1, 2), 3), ((1, 0, 2), 2)), ['a', 'b', 'c'])
+		>>> canonicalProfile({(3,1,2):3, (1,3,2):2})
+		((((0, 1, 2), 3), ((1, 0, 2), 2)), [3, 1, 2])
+		>>> canonicalProfile({(1,2,3):2, (3,2,1):2})[0] == canonicalProfile({(2,1,3):2, (3,1,2):2})[0]
+		True
+	"""
+	prefs = list(profile.keys())
+	weights = list(profile.values())
+	alternatives = list(prefs[0])
+	prefIndices = np.argsort(consensus.rankMatrix(prefs), axis=1)   # [j,t] = index (in alternatives) of the t-th alternative of prefs[j]
+	maxWeight = max(weights)
+	best = None
+	for axis in [j for j,weight in enumerate(weights) if weight==maxWeight]:
+		newName = np.empty(len(alternatives), dtype=np.int64)
+		newName[prefIndices[axis]] = np.arange(len(alternatives))
+		relabeled = sorted(zip(map(tuple, newName[prefIndices].tolist()), weights))
+		candidate = tuple(relabeled)
+		if best is None or candidate < best[0]:
+			best = (candidate, [alternatives[i] for i in prefIndices[axis]])
+	return best
+
+
+class ProfileCache:
+	"""
+	A bounded LRU cache of analysis results, keyed on the canonical form of the profile.
+	Results are computed on the canonical profile and translated back to the alternatives of the given profile.
+	When several axes qualify, the returned axis is the one found on the canonical profile,
+	which may differ from the one returned by a direct call on the given profile.
+	Similarly, in the rare profiles where getLevel1Consensus does not try all the most-frequent
+	rankings, the answer is the one for the canonical profile, so it is the same for all relabelings.
+
+	>>> cache = ProfileCache(maxsize=100)
+	>>> cache.getLevel1Consensus({(1,2,3):3, (1,3,2):2, (2,1,3):2})
+	(1, 2, 3)
+	>>> cache.getLevel1Consensus({("b","a","c"):3, ("b","c","a"):2, ("a","b","c"):2})   # the same profile, relabeled
+	('b', 'a', 'c')
+	>>> cache.isSinglePeaked({(1,2,3):1, (3,2,1):1})
+	[1, 2, 3]
+	>>> cache.stats()
+	{'hits': 1, 'misses': 2, 'size': 2, 'maxsize': 100}
+	"""
+	def __init__(self, maxsize: int=2**16):
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def getLevel1Consensus(self, profile: dict, flexible: bool=False) -> tuple:
+		"""
+		Same as consensus.getLevel1Consensus.
+		"""
+		canonical, labels = canonicalProfile(profile)
+		axis = self._lookup(("level1", flexible), canonical,
+			lambda: consensus.getLevel1Consensus(dict(canonical), flexible))
+		return None if axis is None else tuple(labels[i] for i in axis)
+
+	def isSinglePeaked(self, profile: dict) -> list:
+		"""
+		Returns an axis on which the rankings of the profile are single-peaked, or [] if there is none.
+
+		For up to permutation_tables.MAX_ALTERNATIVES alternatives, the answer is exact (the first axis of
+		permutation_tables whose single-peaked bitsets contain all the rankings of the canonical profile), so it is
+		the same for all relabelings. It may find an axis where domain_restriction.is_single_peaked_orders finds none,
+		since that heuristic depends on the order of its input.
+		For more alternatives, the result is not cached: it is is_single_peaked_orders on the given profile.
+
+		>>> cache = ProfileCache()
+		>>> cache.isSinglePeaked({(3,2,1,4):5, (3,1,4,2):4, (1,3,4,2):3, (1,3,2,4):2})
+		[2, 3, 1, 4]
+		>>> cache.isSinglePeaked({(1,2,3):1, (2,3,1):1, (3,1,2):1})
+		[]
+		"""
+		m = len(next(iter(profile)))
+		if m > permutation_tables.MAX_ALTERNATIVES:
+			return domain_restriction.is_single_peaked_orders([list(pref) for pref in profile])
+		canonical, labels = canonicalProfile(profile)
+		axis = self._lookup(("single-peaked",), canonical, lambda: _singlePeakedAxis(canonical, m))
+		return [labels[i] for i in axis]
+
+	def stats(self) -> dict:
+		return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+	def clear(self):
+		self.entries.clear()
+		self.hits = self.misses = 0
+
+	def _lookup(self, analysis: tuple, canonical: tuple, compute):
+		key = (analysis, canonical)
+		if key in self.entries:
+			self.hits += 1
+			self.entries.move_to_end(key)
+			return self.entries[key]
+		self.misses += 1
+		result = compute()
+		self.entries[key] = result
+		if len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+		return result
+
+
+def _singlePeakedAxis(canonical: tuple, numOfAlternatives: int) -> list:
+	# The first axis of the permutation tables that is compatible with all the rankings of the canonical profile, or [].
+	tables = permutation_tables.getTables(numOfAlternatives)
+	rows = tables.indexOf([pref for pref,weight in canonical])
+	common = np.bitwise_and.reduce(np.asarray(tables.singlePeaked)[rows], axis=0)
+	compatible = np.nonzero(np.unpackbits(common, count=len(tables.axes)))[0]
+	return tables.permutations[tables.axes[compatible[0]]].tolist() if len(compatible) > 0 else []
+
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
+	print("Doctest OK!\n")
@@ -0,0 +1,217 @@
+#!python3
+"""
+Sampling profiles conditioned on a property, e.g. "has level-1 consensus" or "is not single-peaked".
+
+Profiles of m <= 7 alternatives are generated in batches, as count vectors over the m! rankings
+(see consensus.profilesToCounts), and filtered with the batch property checkers.
+The batch size adapts to the observed acceptance rate, and batches run in worker processes
+until the requested number of profiles is accepted.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import itertools, math, os, time
+import numpy as np
+from multiprocessing import Pool
+from preflibtools import consensus, domain_restriction, generate_profiles
+
+
+class ProfileGenerator:
+	"""
+	Generates batches of random profiles as count vectors. Picklable, so it can be sent to worker processes.
+
+	model: "ic" (impartial culture), "iac" (impartial anonymous culture), "urn" (params: numreplace),
+	       "icsp" (single-peaked impartial culture on the axis 0,...,m-1),
+	       "mallows" (params: mix, phis, refs; or nref, for new random parameters in each profile),
+	       "plackett-luce" (params: weights; or none, for new random weights in each profile).
+	The alternatives are 0,...,m-1.
+	When all voters draw from a fixed distribution over rankings, a batch is generated with one vectorized multinomial draw.
+
+	>>> np.random.seed(0)
+	>>> counts = ProfileGenerator("ic", numVoters=10, numOfAlternatives=3)(4)
+	>>> counts.shape, counts.sum(axis=1).tolist()
+	((4, 6), [10, 10, 10, 10])
+	"""
+	MODELS = ("ic", "iac", "urn", "icsp", "mallows", "plackett-luce")
+
+	def __init__(self, model: str, numVoters: int, numOfAlternatives: int, **params):
+		if model not in ProfileGenerator.MODELS:
+			raise ValueError("model should be one of "+str(ProfileGenerator.MODELS)+", not "+str(model))
+		self.model = model
+		self.numVoters = numVoters
+		self.numOfAlternatives = numOfAlternatives
+		self.params = params
+
+	def __call__(self, numProfiles: int) -> np.ndarray:
+		probabilities = self.rankingProbabilities()
+		if probabilities is not None:
+			# All voters draw from the same distribution over rankings, so a whole batch is a single multinomial draw.
+			return np.random.multinomial(self.numVoters, probabilities, size=numProfiles)
+		alternatives = list(range(self.numOfAlternatives))
+		if self.model == "iac":
+			return np.array([generate_profiles.gen_urn(self.numVoters, 1, alternatives, output="counts") for _ in range(numProfiles)])
+		if self.model == "urn":
+			return np.array([generate_profiles.gen_urn(self.numVoters, self.params["numreplace"], alternatives, output="counts") for _ in range(numProfiles)])
+		if self.model == "mallows":
+			candmap = {i: i for i in alternatives}
+			return np.array([generate_profiles.gen_mallows_voteset(self.numVoters, alternatives,
+				*generate_profiles.gen_mallows_mix_parameters(candmap, self.params.get("nref", 1)), output="counts") for _ in range(numProfiles)])
+		# plackett-luce with random weights
+		return np.array([generate_profiles.gen_plackett_luce(self.numVoters, alternatives,
+			generate_profiles.gen_plackett_luce_weights(self.numOfAlternatives), output="counts") for _ in range(numProfiles)])
+
+	def rankingProbabilities(self) -> np.ndarray:
+		"""
+		The probability of each ranking of itertools.permutations(range(m)), if it is the same for all voters of all profiles
+		(ic, icsp, mallows with given refs, plackett-luce with given weights); otherwise None.
+
+		>>> ProfileGenerator("icsp", 10, 3).rankingProbabilities().tolist()
+		[0.25, 0.0, 0.25, 0.25, 0.0, 0.25]
+		>>> p = ProfileGenerator("mallows", 10, 3, mix=[1.0], phis=[0.5], refs=[[0,1,2]]).rankingProbabilities()
+		>>> [round(float(x)*2.625, 3) for x in p]
+		[1.0, 0.5, 0.5, 0.25, 0.25, 0.125]
+		>>> ProfileGenerator("plackett-luce", 10, 2, weights=[3.0, 1.0]).rankingProbabilities().tolist()
+		[0.75, 0.25]
+		"""
+		m = self.numOfAlternatives
+		rankings = np.array(list(itertools.permutations(range(m))))
+		if self.model == "ic":
+			return np.full(len(rankings), 1.0/len(rankings))
+		if self.model == "icsp":
+			# A ranking is single-peaked on the axis 0,...,m-1 iff each of its prefixes is an interval of the axis.
+			prefixMax = np.maximum.accumulate(rankings, axis=1)
+			prefixMin = np.minimum.accumulate(rankings, axis=1)
+			singlePeaked = np.all(prefixMax - prefixMin == np.arange(m), axis=1)
+			return singlePeaked / singlePeaked.sum()
+		if self.model == "mallows" and "refs" in self.params:
+			probabilities = np.zeros(len(rankings))
+			for weight, phi, ref in zip(self.params["mix"], self.params["phis"], self.params["refs"]):
+				position = np.argsort(ref)   # position[c] = the place of c in the reference ranking
+				places = position[rankings]
+				first, second = np.triu_indices(m, 1)
+				inversions = (places[:, first] > places[:, second]).sum(axis=1)
+				component = np.power(float(phi), inversions)
+				probabilities += weight * component / component.sum()
+			return probabilities
+		if self.model == "plackett-luce" and "weights" in self.params:
+			weights = np.asarray(self.params["weights"], dtype=float)[rankings]
+			# Each ranking is chosen top-down, each time in proportion to the weights of the remaining alternatives.
+			remaining = np.cumsum(weights[:, ::-1], axis=1)[:, ::-1]
+			return np.prod(weights / remaining, axis=1)
+		return None
+
+
+def sampleBatch(task: tuple) -> (np.ndarray, int):
+	"""
+	Generates one batch and returns its accepted profiles. Runs in the worker processes.
+
+	INPUT: task, a tuple (generator, condition, batchSize, seed); seed is a np.random.SeedSequence.
+	OUTPUT: a tuple (accepted count vectors, number of generated profiles).
+	"""
+	generator, condition, batchSize, seed = task
+	generate_profiles.seed_random(seed)
+	counts = generator(batchSize)
+	if isinstance(condition, str):
+		accepted = consensus.countProperties(counts, generator.numOfAlternatives, (condition,))[condition]
+	else:
+		accepted = condition(counts, generator.numOfAlternatives)
+	return counts[accepted], batchSize
+
+
+def sampleConditional(generator: ProfileGenerator, condition, numAccepted: int, processes: int=None, seed: int=None,
+		initialBatch: int=256, maxBatch: int=2**16, maxGenerated: int=None, verbose: bool=False) -> (np.ndarray, dict):
+	"""
+	Generates random profiles until numAccepted of them satisfy the condition.
+
+	INPUT:
+	generator    - a ProfileGenerator (or any picklable function with a numOfAlternatives attribute
+	               that maps a number of profiles to a 2-D array of count vectors).
+	condition    - a name in consensus.COUNT_PROPERTIES, or a picklable function that maps (counts, numOfAlternatives) to a boolean array.
+	numAccepted  - int, number of accepted profiles to return.
+	processes    - int, number of worker processes (default: the number of cores). 1 means no pool.
+	seed         - int, the random seed of the whole run (default: random).
+	initialBatch, maxBatch - bounds on the number of profiles in a batch.
+	maxGenerated - int, stop after generating this many profiles even if fewer were accepted (default: no limit).
+	verbose      - bool, print the statistics after each batch.
+
+	OUTPUT: a tuple (counts, stats):
+	* counts - 2-D array with numAccepted rows (fewer if maxGenerated was reached), the accepted count vectors.
+	* stats  - dict with the numbers of generated and accepted profiles (accepted may exceed numAccepted, as whole batches are checked),
+	           the acceptance rate, the number of batches and the seconds.
+
+	The size of each new batch is the number of profiles that are still missing, divided by the acceptance rate so far,
+	so that rare properties get large batches and common properties do not generate much more than needed.
+
+	>>> generator = ProfileGenerator("ic", numVoters=20, numOfAlternatives=3)
+	>>> counts, stats = sampleConditional(generator, "single-peaked", 5, processes=1, seed=1)
+	>>> counts.shape, bool(domain_restriction.is_single_peaked_counts(counts, 3).all())
+	((5, 6), True)
+	>>> stats["accepted"] >= 5, 0 < stats["rate"] < 1
+	(True, True)
+	"""
+	start = time.time()
+	seeds = np.random.SeedSequence(seed)
+	accepted = []
+	stats = {"generated": 0, "accepted": 0, "rate": 0.0, "batches": 0, "seconds": 0.0}
+
+	def nextBatchSize(inFlight: int) -> int:
+		if stats["batches"] == 0:
+			size = initialBatch
+		elif stats["accepted"] == 0:
+			size = stats["generated"] + inFlight   # nothing accepted yet: double the number of generated profiles
+		else:
+			size = int(math.ceil(1.2 * (numAccepted - stats["accepted"]) * stats["generated"] / stats["accepted"])) - inFlight
+			if size <= 0 and inFlight > 0:
+				return 0   # the batches in flight are expected to suffice
+		if maxGenerated is not None:
+			size = min(size, maxGenerated - stats["generated"] - inFlight)
+			if size <= 0:
+				return 0
+		return min(maxBatch, max(1, size))
+
+	def collect(result):
+		batchAccepted, batchSize = result
+		accepted.append(batchAccepted)
+		stats["generated"] += batchSize
+		stats["accepted"] += len(batchAccepted)
+		stats["batches"] += 1
+		stats["rate"] = stats["accepted"] / stats["generated"]
+		if verbose:
+			print("batch {}: {} generated, {} accepted, acceptance rate {:.4f}".format(stats["batches"], stats["generated"], stats["accepted"], stats["rate"]))
+
+	def done() -> bool:
+		return stats["accepted"] >= numAccepted or (maxGenerated is not None and stats["generated"] >= maxGenerated)
+
+	if processes == 1:
+		while not done():
+			collect(sampleBatch((generator, condition, nextBatchSize(0), seeds.spawn(1)[0])))
+	else:
+		processes = processes or os.cpu_count()
+		with Pool(processes) as pool:
+			pending = []   # list of (AsyncResult, batchSize)
+			while not done():
+				# Keep one batch per worker in flight:
+				while len(pending) < processes:
+					size = nextBatchSize(sum(size for _,size in pending))
+					if size == 0:
+						break
+					pending.append((pool.apply_async(sampleBatch, ((generator, condition, size, seeds.spawn(1)[0]),)), size))
+				if not pending:
+					break
+				result, size = pending.pop(0)
+				collect(result.get())
+
+	counts = np.concatenate(accepted)[:numAccepted] if accepted else np.empty((0, 0), dtype=np.int64)
+	stats["seconds"] = time.time() - start
+	return counts, stats
+
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	generator = ProfileGenerator("ic", numVoters=100, numOfAlternatives=4)
+	counts, stats = sampleConditional(generator, "level1-strict", 1000, verbose=True)
+	print(stats)
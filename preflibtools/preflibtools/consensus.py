@@ -11,23 +11,11 @@ Date:    2017-02
 
 import numpy as  np
 from collections import defaultdict,Counter
-from preflibtools import inversions
-import operator
+from preflibtools import domain_restriction, inversions, permutation_tables
+import itertools
 
 __DEBUG__ = False
 
-class __PrefFreqDist:
-	""" 
-	An auxiliary class for getLevel1Consensus. 
-	Contains a preference-ranking (list), its frequency (int), and its distance from a fixed ranking (int)
-	"""
-	def __init__(self, pref: tuple, freq: int, dist: int=None):
-		self.pref=pref
-		self.freq=freq
-		self.dist=dist
-	def __repr__(self):
-		return str(self.pref)+" "+str(self.freq)+" "+str(self.dist)
-
 def getLevel1Consensus(profile: dict, flexible: bool=False) -> tuple:
 	"""
 		Checks whether the given profile exhibits level-1 consensus.
@@ -56,61 +44,229 @@ def getLevel1Consensus(profile: dict, flexible: bool=False) -> tuple:
 		>>> getLevel1Consensus({(1,2,3):3, (1,3,2):2}, flexible=True)
 		(1, 2, 3)
 	"""
-	prefsFreqsDists = [__PrefFreqDist(pf[0], pf[1]) for pf in profile.items()]
-	prefsFreqsDists.sort(key=operator.attrgetter("freq"), reverse=True)  # sort the rankings from most frequent to least frequent
-	maxFreq = prefsFreqsDists[0].freq
-	for pfd in prefsFreqsDists:
-		if pfd.freq<maxFreq: 
-			# The current preference-relation, and those below it, cannot be an axis of a level-1 consensus, since their frequency is not maximal.
-			break
-		else:
-			# The current preference-relation is a candidate for being an axis of a level-1 consensus
-			potentialAxis = pfd.pref    # A preference-relation that is the current 
-			if isCondition1Satisfied(prefsFreqsDists, potentialAxis, flexible):
-				return potentialAxis
+	prefs = list(profile.keys())
+	freqs = np.array(list(profile.values()))
+	ranks = rankMatrix(prefs)
+	numOfAlternatives = ranks.shape[1]
+	order = np.argsort(-freqs, kind="stable")  # sort the rankings from most frequent to least frequent
+	maxFreq = freqs[order[0]]
+	# Only the preference-relations with maximal frequency are candidates for being an axis of a level-1 consensus.
+	# They always stay at the top of the order, which is re-sorted (stably) for each potential axis.
+	for i in range(np.count_nonzero(freqs==maxFreq)):
+		potentialAxis = order[i]
+		dists = inversions.countInversions(ranks[:, np.argsort(ranks[potentialAxis])])
+		# Sort by frequency (descending), then by distance from potentialAxis; ties keep the previous order:
+		order = order[np.lexsort((dists[order], -freqs[order]))]
+		if __DEBUG__: print(list(zip([prefs[j] for j in order], freqs[order], dists[order])))
+		if isCondition1Satisfied(freqs[order], dists[order], numOfAlternatives, flexible):
+			return prefs[potentialAxis]
 	return None
 
-def isCondition1Satisfied(prefsFreqsDists: list, potentialAxis: tuple, flexible: bool=False):
+def rankMatrix(prefs: list) -> np.ndarray:
+	"""
+		Subroutine of getLevel1Consensus.
+		INPUT: prefs: list of tuples, each of which is a strict ranking of the same alternatives.
+		OUTPUT: 2-D int array; element [j,c] is the position of the c-th alternative (in the order of prefs[0]) in prefs[j].
+
+		>>> rankMatrix([(1,2,3), (3,1,2), (2,3,1)])
+		array([[0, 1, 2],
+		       [1, 2, 0],
+		       [2, 0, 1]])
+	"""
+	index = {alternative:c for c,alternative in enumerate(prefs[0])}
+	prefIndices = np.array([[index[alternative] for alternative in pref] for pref in prefs])
+	ranks = np.empty_like(prefIndices)
+	ranks[np.arange(len(prefs))[:,None], prefIndices] = np.arange(prefIndices.shape[1])
+	return ranks
+
+def isCondition1Satisfied(freqs: np.ndarray, dists: np.ndarray, numOfAlternatives: int, flexible: bool=False) -> bool:
 	"""
 		Subroutine of getLevel1Consensus.
 		check whether the condition for level-1 consensus holds for a given preference-relation, potentialAxis.
+
+		INPUT:
+		freqs, dists: arrays with the frequency of each distinct preference and its distance from potentialAxis,
+		              sorted by frequency (descending) and then by distance (ascending).
+		numOfAlternatives: int, the length of each preference.
+
+		>>> isCondition1Satisfied(np.array([3,2,2]), np.array([0,1,1]), 3)
+		True
+		>>> isCondition1Satisfied(np.array([3,2,1]), np.array([0,1,1]), 3)
+		False
+		>>> isCondition1Satisfied(np.array([3,2,1]), np.array([0,1,1]), 3, flexible=True)
+		True
 	"""
-	for pfd in prefsFreqsDists:
-		pfd.dist = inversions.inversionDistance(pfd.pref, potentialAxis)
-		
-	# Sort the list of distinct preferences by frequency, then by distance from potentialAxis:
-	prefsFreqsDists.sort(key=operator.attrgetter("dist"))  # Sort by the secondary key first...
-	prefsFreqsDists.sort(key=operator.attrgetter("freq"), reverse=True)  #.... then by the primary key (sort is stable).
-	if __DEBUG__: print(prefsFreqsDists)
-
-	# Handle the preference-relations with positive frequencies:
-	previous = prefsFreqsDists[0]
-	for current in prefsFreqsDists[1:]:
-		if previous.freq>current.freq:
-			requirement = previous.dist<=current.dist if flexible else previous.dist<current.dist
-			if not requirement: return False
-		previous = current
+	# Handle the preference-relations with positive frequencies: whenever the frequency drops, the distance must grow.
+	drops = freqs[:-1] > freqs[1:]
+	if flexible:
+		requirement = dists[:-1][drops] <= dists[1:][drops]
+	else:
+		requirement = dists[:-1][drops] < dists[1:][drops]
+	if not requirement.all(): return False
 
 	# Handle the preference-relations with zero frequencies:
-	largestDistanceWithPositiveFrequency = previous.dist
-	numOfAlternatives = len(previous.pref)
-	if not flexible:
-		#expectedNumOfDistinctPrefs = inversions.numNPermutationsWithAtMostKInversions(numOfAlternatives,largestDistanceWithPositiveFrequency)
-		numOfDistinctPrefs = len(prefsFreqsDists)
-		for k in range(largestDistanceWithPositiveFrequency+1):
-			numPermutations = inversions.numNPermutationsWithKInversions(numOfAlternatives,k)
-			if numPermutations > numOfDistinctPrefs:
-				return False
-			numOfDistinctPrefs -= numPermutations
-	else:
-		#expectedNumOfDistinctPrefs = inversions.numNPermutationsWithAtMostKInversions(numOfAlternatives,largestDistanceWithPositiveFrequency-1)
-		numOfDistinctPrefs = sum([p.dist<largestDistanceWithPositiveFrequency for p in 	prefsFreqsDists])
-		for i in range(largestDistanceWithPositiveFrequency):
-			numPermutations = inversions.numNPermutationsWithKInversions(numOfAlternatives,i)
-			if numPermutations > numOfDistinctPrefs:
-				return False
-			numOfDistinctPrefs -= numPermutations
-	return numOfDistinctPrefs==0
+	# every ranking closer to the axis than the farthest one in the profile must appear in the profile
+	# (in the strict version, also the rankings at the same distance as the farthest one).
+	largestDistanceWithPositiveFrequency = dists[-1]
+	numOfDistances = largestDistanceWithPositiveFrequency if flexible else largestDistanceWithPositiveFrequency+1
+	histogram = np.bincount(dists[dists<numOfDistances], minlength=numOfDistances)
+	return np.array_equal(histogram, inversions.mahonianRow(numOfAlternatives)[:numOfDistances])
+
+def profilesToCounts(profiles: list, alternatives: list) -> np.ndarray:
+	"""
+		Stacks many profiles as dense count vectors over the m! rankings, for getLevel1ConsensusBatch.
+
+		INPUT:
+		profiles: list of dicts, each maps tuples that represent strict rankings of the alternatives to their frequency.
+		alternatives: list of the m alternatives. The r-th ranking is the r-th element of itertools.permutations(alternatives).
+
+		OUTPUT: 2-D array with one row per profile and m! columns.
+
+		>>> profilesToCounts([{(1,2,3):3, (2,1,3):2}, {(3,2,1):1}], [1,2,3])
+		array([[3, 0, 2, 0, 0, 0],
+		       [0, 0, 0, 0, 0, 1]])
+	"""
+	indexOf = {ranking:r for r,ranking in enumerate(itertools.permutations(alternatives))}
+	counts = np.zeros((len(profiles), len(indexOf)), dtype=np.result_type(*[np.array(list(profile.values())) for profile in profiles], np.int64))
+	for p,profile in enumerate(profiles):
+		for ranking,freq in profile.items():
+			counts[p, indexOf[ranking]] = freq
+	return counts
+
+def getLevel1ConsensusBatch(counts: np.ndarray, numOfAlternatives: int, chunkSize: int=2**22) -> (np.ndarray, np.ndarray):
+	"""
+		Checks, for many small profiles at once, whether each of them exhibits level-1 consensus and flexible consensus.
+
+		INPUT:
+		counts: 2-D array with one row per profile and m! columns (see profilesToCounts);
+		        counts[p,r] is the frequency of the r-th ranking in the order of itertools.permutations(range(m)).
+		numOfAlternatives: int, the number m of alternatives.
+		chunkSize: int, bounds the number of (potential axis, ranking) pairs processed in one numpy operation.
+
+		OUTPUT: two boolean arrays, (strict, flexible); element p is True iff the p-th profile exhibits
+		level-1 consensus (resp. flexible consensus) around one of its most frequent rankings.
+		This agrees with getLevel1Consensus(profile) is not None, except in rare profiles with several
+		most-frequent rankings, where getLevel1Consensus may not try all of them (it re-sorts the rankings
+		by their distance from each axis it tries, and visits them in that order).
+
+		All profiles share the Kendall table and the Mahonian row from permutation_tables (so m must be at most 7).
+		Each pair of a profile and one of its most-frequent rankings (the potential axes) is checked by checkAxesBatch.
+
+		>>> counts = profilesToCounts([{(1,2,3):3, (1,3,2):2, (2,1,3):2}, {(1,2,3):3, (1,3,2):2, (2,1,3):1}, {(1,2,3):3, (1,3,2):2}], [1,2,3])
+		>>> strict, flexible = getLevel1ConsensusBatch(counts, 3)
+		>>> strict
+		array([ True, False, False])
+		>>> flexible
+		array([ True,  True,  True])
+
+		A profile with a gap below the largest distance (here, no ranking at distance 1 or 2 from the axis) is ruled out
+		before the per-distance statistics:
+
+		>>> getLevel1ConsensusBatch(profilesToCounts([{(1,2,3):3, (3,2,1):1}], [1,2,3]), 3), getLevel1Consensus({(1,2,3):3, (3,2,1):1}, flexible=True)
+		((array([False]), array([False])), None)
+	"""
+	counts = np.asarray(counts)
+	numOfProfiles = counts.shape[0]
+	tables = permutation_tables.getTables(numOfAlternatives)
+	table = tables.kendall
+	mahonian = np.asarray(tables.mahonian)
+
+	maxFreqs = counts.max(axis=1)
+	profileIndices, axisIndices = np.nonzero((counts == maxFreqs[:,None]) & (maxFreqs[:,None] > 0))
+	strict = np.zeros(numOfProfiles, dtype=bool)
+	flexible = np.zeros(numOfProfiles, dtype=bool)
+	pairsPerChunk = max(1, chunkSize // counts.shape[1])
+	for start in range(0, len(profileIndices), pairsPerChunk):
+		profileChunk = profileIndices[start:start+pairsPerChunk]
+		strictOK, flexibleOK = checkAxesBatch(counts[profileChunk], table[axisIndices[start:start+pairsPerChunk]], mahonian)
+		strict[profileChunk[strictOK]] = True
+		flexible[profileChunk[flexibleOK]] = True
+	return strict, flexible
+
+
+def checkAxesBatch(freqs: np.ndarray, dists: np.ndarray, mahonian: np.ndarray) -> (np.ndarray, np.ndarray):
+	"""
+		Subroutine of getLevel1ConsensusBatch: checks the conditions for level-1 consensus for many pairs of a profile and a potential axis at once.
+
+		INPUT:
+		freqs, dists: 2-D arrays with one row per pair and one column per ranking; freqs[i,j] is the frequency of the j-th ranking
+		              in the profile of pair i (0 if it does not appear), and dists[i,j] is its distance from the axis of pair i.
+		              The columns need not cover all the rankings, as long as they cover those that appear.
+		mahonian: the Mahonian row of m (inversions.mahonianRow).
+
+		OUTPUT: two boolean arrays, (strict, flexible), with one element per pair.
+
+		The rankings are grouped by their distance from the axis, and the conditions are checked on the per-distance statistics:
+		* strict:   all rankings up to the largest distance L appear, the frequency is fixed within each distance, and does not grow with the distance.
+		* flexible: all rankings at distance smaller than L appear, and no ranking is more frequent than a ranking closer to the axis.
+
+		>>> checkAxesBatch(np.array([[3,2,2,0], [3,2,1,0]]), np.array([[0,1,1,2], [0,1,1,2]]), np.array([1,2,2,1]))
+		(array([ True, False]), array([ True,  True]))
+	"""
+	mahonian = np.asarray(mahonian)
+	numOfDistances = len(mahonian)
+	distances = np.arange(numOfDistances)
+	ballSizes = np.cumsum(mahonian)   # ballSizes[k] = number of rankings at distance at most k from the axis
+	strict = np.zeros(len(freqs), dtype=bool)
+	flexible = np.zeros(len(freqs), dtype=bool)
+	present = freqs > 0
+
+	# Both criteria require that all rankings closer than the largest distance L appear.
+	# This is cheap to check, and rules out most pairs of large profiles, before the per-distance statistics.
+	largestDistance = np.where(present, dists, -1).max(axis=1)
+	numCloser = (present & (dists < largestDistance[:,None])).sum(axis=1)
+	possible = np.nonzero(numCloser == np.where(largestDistance > 0, ballSizes[np.maximum(largestDistance-1, 0)], 0))[0]
+	dists, present, largestDistance = dists[possible], present[possible], largestDistance[possible]
+	freqs = freqs[possible].astype(float)
+
+	# Per-distance statistics: number of rankings in the profile, and their min and max frequency.
+	histogram = np.empty((len(possible), numOfDistances), dtype=np.int64)
+	minFreq = np.empty((len(possible), numOfDistances))
+	maxFreq = np.empty((len(possible), numOfDistances))
+	for k in distances:
+		atK = present & (dists == k)
+		histogram[:,k] = atK.sum(axis=1)
+		minFreq[:,k] = np.where(atK, freqs, np.inf).min(axis=1)
+		maxFreq[:,k] = np.where(atK, freqs, -np.inf).max(axis=1)
+	below = distances[None,:] < largestDistance[:,None]
+	upTo = distances[None,:] <= largestDistance[:,None]
+	full = histogram == mahonian[None,:]
+
+	strict[possible] = np.all(full | ~upTo, axis=1) \
+		& np.all((minFreq == maxFreq) | (histogram == 0), axis=1) \
+		& np.all((minFreq[:,1:] <= minFreq[:,:-1]) | ~below[:,:-1], axis=1)
+	maxFreqFarther = np.empty_like(maxFreq)
+	maxFreqFarther[:,:-1] = np.maximum.accumulate(maxFreq[:,:0:-1], axis=1)[:,::-1]
+	maxFreqFarther[:,-1] = -np.inf
+	flexible[possible] = np.all(full | ~below, axis=1) \
+		& np.all((maxFreqFarther <= minFreq) | ~below, axis=1)
+	return strict, flexible
+
+
+# The properties that countProperties evaluates by name.
+COUNT_PROPERTIES = ("level1-strict", "level1-flexible", "single-peaked", "not-single-peaked")
+
+def countProperties(counts: np.ndarray, numOfAlternatives: int, names: tuple=COUNT_PROPERTIES) -> dict:
+	"""
+		Evaluates properties, given by name from COUNT_PROPERTIES, on many profiles given as count vectors (see profilesToCounts).
+		The strict and flexible consensus come from a single call of getLevel1ConsensusBatch.
+
+		OUTPUT: dict that maps each name to a boolean array with one element per profile.
+
+		>>> counts = profilesToCounts([{(1,2,3):3, (1,3,2):2, (2,1,3):2}, {(1,2,3):1, (2,3,1):1, (3,1,2):1}], [1,2,3])
+		>>> countProperties(counts, 3, ("level1-strict", "not-single-peaked"))
+		{'level1-strict': array([ True, False]), 'not-single-peaked': array([False,  True])}
+	"""
+	unknown = [name for name in names if name not in COUNT_PROPERTIES]
+	if unknown:
+		raise ValueError("unknown properties: "+", ".join(unknown))
+	results = {}
+	if "level1-strict" in names or "level1-flexible" in names:
+		results["level1-strict"], results["level1-flexible"] = getLevel1ConsensusBatch(counts, numOfAlternatives)
+	if "single-peaked" in names or "not-single-peaked" in names:
+		results["single-peaked"] = domain_restriction.is_single_peaked_counts(counts, numOfAlternatives)
+		results["not-single-peaked"] = ~results["single-peaked"]
+	return {name: results[name] for name in names}
 
 if __name__ == "__main__":
 	__DEBUG__ = False
@@ -0,0 +1,130 @@
+#!python3
+"""
+Loading a whole corpus (a directory tree) of PrefLib files of orders.
+
+Files are parsed into profile.CompactOrderProfile objects by a pool of worker processes.
+Compressed files (e.g. .soc.gz, .toi.xz) are decompressed while parsing (see io.open_preflib_file).
+Each parsed profile is also saved in a side-car cache file (under <root>/.preflibcache by default),
+together with the modification time and size of its source file, so that a second load of
+an unchanged corpus only reads the cache files.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import fnmatch, os, pickle, tempfile
+from multiprocessing import Pool
+from preflibtools import io
+
+ORDER_PATTERNS = tuple("*."+ext+suffix for ext in ("soc", "soi", "toc", "toi") for suffix in [""]+list(io.COMPRESSIONS))
+CACHE_DIRECTORY_NAME = ".preflibcache"
+
+def findFiles(root: str, patterns: tuple=ORDER_PATTERNS) -> list:
+	"""
+	Returns the sorted list of files under root (recursively) whose name matches one of the patterns.
+	The cache directory is skipped.
+	"""
+	found = []
+	for directory, subdirectories, filenames in os.walk(root):
+		subdirectories[:] = [d for d in subdirectories if d != CACHE_DIRECTORY_NAME]
+		found += [os.path.join(directory, filename) for filename in filenames
+			if any(fnmatch.fnmatch(filename, pattern) for pattern in patterns)]
+	return sorted(found)
+
+
+def loadCorpus(root: str, patterns: tuple=ORDER_PATTERNS, processes: int=None, cacheDirectory: str=None) -> dict:
+	"""
+	Parses all PrefLib files of orders under root.
+
+	INPUT:
+	root: str, the directory to scan (recursively).
+	patterns: tuple of file-name patterns to load.
+	processes: int, number of worker processes for parsing (default: the number of cores). 1 means no pool.
+	cacheDirectory: str, where the side-car cache is kept (default: root/.preflibcache). Empty string means no cache.
+
+	OUTPUT: a dict that maps each file path to its profile.CompactOrderProfile, sorted by path.
+
+	>>> import tempfile
+	>>> root = tempfile.mkdtemp()
+	>>> for name in ["a.soc", "b.soc"]:
+	...     with open(os.path.join(root, name), "w") as f: _ = f.write("2\\n1,x\\n2,y\\n3,3,2\\n2,1,2\\n1,2,1\\n")
+	>>> corpus = loadCorpus(root, processes=2)
+	>>> [(os.path.basename(path), profile.get_map_from_order_to_weight()) for path,profile in corpus.items()]
+	[('a.soc', {(1, 2): 2, (2, 1): 1}), ('b.soc', {(1, 2): 2, (2, 1): 1})]
+	>>> sorted(os.listdir(os.path.join(root, CACHE_DIRECTORY_NAME)))
+	['a.soc.pickle', 'b.soc.pickle']
+	>>> len(loadCorpus(root, processes=1))   # now read from the cache
+	2
+	"""
+	if cacheDirectory is None:
+		cacheDirectory = os.path.join(root, CACHE_DIRECTORY_NAME)
+	tasks = []
+	for path in findFiles(root, patterns):
+		cachePath = os.path.join(cacheDirectory, os.path.relpath(path, root)+".pickle") if cacheDirectory else None
+		tasks.append((path, cachePath))
+
+	corpus = {}
+	missing = []
+	for path, cachePath in tasks:
+		profile = readCache(path, cachePath)
+		if profile is None:
+			missing.append((path, cachePath))
+		else:
+			corpus[path] = profile
+
+	if processes == 1 or len(missing) <= 1:
+		corpus.update(map(parseAndCache, missing))
+	else:
+		with Pool(processes) as pool:
+			corpus.update(pool.imap_unordered(parseAndCache, missing, chunksize=max(1, len(missing)//(4*(processes or os.cpu_count())))))
+	return {path: corpus[path] for path,cachePath in tasks}
+
+
+def readCache(path: str, cachePath: str):
+	"""
+	Returns the cached profile of the given file, or None if there is no valid cache entry.
+	A cache entry is valid iff the modification time and size of the file did not change since it was written.
+	"""
+	if not cachePath:
+		return None
+	try:
+		with open(cachePath, "rb") as cacheFile:
+			mtime, size, profile = pickle.load(cacheFile)
+	except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+		return None
+	stat = os.stat(path)
+	return profile if (mtime, size) == (stat.st_mtime_ns, stat.st_size) else None
+
+
+def parseAndCache(task: tuple) -> tuple:
+	"""
+	Parses a single file and writes its cache entry. Runs in the worker processes.
+
+	INPUT: task, a tuple (path, cachePath).
+	OUTPUT: a tuple (path, profile).
+	"""
+	path, cachePath = task
+	stat = os.stat(path)
+	profile = io.read_compact_preflib_file(path)
+	if cachePath:
+		try:
+			os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+			# Write to a temporary file and rename, so that a concurrent load never reads a partial entry.
+			fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(cachePath), suffix=".tmp")
+			with os.fdopen(fd, "wb") as tmpFile:
+				pickle.dump((stat.st_mtime_ns, stat.st_size, profile), tmpFile, protocol=pickle.HIGHEST_PROTOCOL)
+			os.replace(tmpPath, cachePath)
+		except OSError:   # e.g. a read-only corpus; parsing still works without the cache.
+			pass
+	return path, profile
+
+
+if __name__ == "__main__":
+	import doctest, sys, time
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	if len(sys.argv) > 1:
+		start = time.time()
+		corpus = loadCorpus(sys.argv[1])
+		print("Loaded {} files in {:.3f} seconds".format(len(corpus), time.time()-start))
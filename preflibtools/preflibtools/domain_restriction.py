@@ -41,8 +41,9 @@ About
 '''
 
 import copy
+import numpy as np
 
-from preflibtools import io
+from preflibtools import io, permutation_tables
 
 # Implement of the Single Peaked Consistancy Algorithm detailed in
 # B. Escoffier, J. Lang, and M. Ozturk, "Single-peaked consistency and its complexity".
@@ -219,6 +220,39 @@ def is_single_peaked_orders(orders):
   else:
     return []
 
+# Test many small profiles for single-peakedness at once, using the precomputed
+# single-peaked-axis bitsets of permutation_tables (so at most 7 candidates).
+# A profile is single-peaked iff the AND of the bitsets of its rankings is not empty.
+def is_single_peaked_counts(counts, numcandidates):
+  """
+  INPUT:
+  counts - 2-D array with one row per profile and m! columns; counts[p,r] is the number of voters in profile p
+           whose ranking is the r-th element of itertools.permutations(range(m)) (see consensus.profilesToCounts).
+  numcandidates - int, the number m of candidates.
+
+  OUTPUT: boolean array; element p is True iff the p-th profile is single-peaked.
+
+  >>> is_single_peaked_counts([[1,0,0,0,0,1], [1,1,0,0,0,1], [0,1,0,0,1,0]], 3)   # {012,210}, {012,021,210}, {021,201}
+  array([ True, False,  True])
+
+  A profile with more than 2^(m-1) distinct rankings is rejected without checking the axes:
+
+  >>> is_single_peaked_counts([[1,1,1,1,1,0]], 3)
+  array([False])
+  """
+  bitsets = np.asarray(permutation_tables.getTables(numcandidates).singlePeaked)
+  counts = np.asarray(counts)
+  # A single-peaked profile has at most 2^(m-1) distinct rankings, so larger profiles need not be checked.
+  candidates = np.nonzero((counts > 0).sum(axis=1) <= 2**(numcandidates-1))[0]
+  result = np.zeros(len(counts), dtype=bool)
+  chunk = max(1, 2**24 // bitsets.size)
+  for start in range(0, len(candidates), chunk):
+    rows = candidates[start:start+chunk]
+    present = counts[rows, :, None] > 0
+    common = np.bitwise_and.reduce(np.where(present, bitsets[None], np.uint8(255)), axis=1)
+    result[rows] = common.any(axis=1)
+  return result
+
 # Helper function to find last place candidates
 def last_set(orders):
   """
@@ -0,0 +1,193 @@
+#!python3
+"""
+Exact probabilities of profile properties for small electorates, by enumerating all anonymous profiles.
+
+An anonymous profile of n voters over m alternatives is a vector of counts over the m! rankings
+(a composition of n into m! parts). The profiles are enumerated in a Gray-code order,
+in which each profile differs from the previous one by moving a single voter from one ranking to another,
+so the counts and the pairwise matrix are updated incrementally, by one ranking's contribution per step.
+The property checks themselves are not incremental: they are recomputed in batch on each block of profiles
+(consensus.countProperties on the counts, and the Condorcet check on the pairwise matrices).
+Each profile is weighted by its exact probability (under IAC, or under i.i.d. voters, e.g. IC or Mallows),
+and the weights of the profiles with each property are summed.
+
+The number of profiles is C(n+m!-1, m!-1), so this is practical for m=3 with up to about 30 voters,
+and for m=4 with up to about 7 voters.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import itertools, math
+import numpy as np
+from preflibtools import consensus
+
+
+def grayMoves(numVoters: int, numTypes: int):
+	"""
+	Generates the moves of a Gray code over the compositions of numVoters into numTypes parts.
+	The first composition has all voters at type 0; each move (source, target) moves a single voter from type source to type target.
+
+	>>> counts = [3, 0, 0]
+	>>> visited = [tuple(counts)]
+	>>> for source, target in grayMoves(3, 3):
+	...     counts[source] -= 1; counts[target] += 1
+	...     visited.append(tuple(counts))
+	>>> len(visited), len(set(visited)), min(min(c) for c in visited)
+	(10, 10, 0)
+	>>> visited[:4]
+	[(3, 0, 0), (2, 0, 1), (2, 1, 0), (1, 2, 0)]
+	"""
+	if numTypes >= 2:
+		yield from _grayPath(numVoters, list(range(numTypes)))
+
+def _grayPath(total: int, types: list):
+	# A Gray path over the compositions of total into the given types (the other types are fixed),
+	# from all of total at types[0] to all of total at types[1].
+	if total == 0:
+		return
+	if len(types) == 2:
+		for _ in range(total):
+			yield (types[0], types[1])
+		return
+	first, others = types[0], types[3:]
+	# Block t has t voters outside the first type. Block t ends with all of them at end(t), and block t+1 starts
+	# by moving one more voter there, so the ends alternate between types[1] and types[2], and end(total) = types[1].
+	for t in range(1, total+1):
+		end = types[1] if (total-t) % 2 == 0 else types[2]
+		start = types[2] if end == types[1] else types[1]
+		yield (first, start)
+		yield from _grayPath(t, [start, end] + others)
+
+
+def numberOfProfiles(numVoters: int, numOfAlternatives: int) -> int:
+	"""
+	>>> numberOfProfiles(5, 3)
+	252
+	"""
+	numTypes = math.factorial(numOfAlternatives)
+	return math.comb(numVoters+numTypes-1, numTypes-1)
+
+
+def enumerateProfiles(numVoters: int, numOfAlternatives: int, blockSize: int=2**14):
+	"""
+	Generates all anonymous profiles of numVoters voters over numOfAlternatives alternatives, in blocks.
+	Each block is a tuple (counts, pairwise):
+	* counts: int array of shape (B, m!); the r-th column counts the voters with the r-th ranking of itertools.permutations(range(m)).
+	* pairwise: int array of shape (B, m, m); element [p,c,d] is the number of voters in profile p who prefer c to d.
+	Within a block, both are cumulative sums of the changes made by the moves of grayMoves.
+
+	>>> blocks = list(enumerateProfiles(2, 3, blockSize=10))
+	>>> [len(counts) for counts,pairwise in blocks]
+	[10, 10, 1]
+	>>> counts, pairwise = blocks[0]
+	>>> counts[1].tolist(), pairwise[1].tolist()
+	([1, 1, 0, 0, 0, 0], [[0, 2, 2], [0, 0, 1], [0, 1, 0]])
+	"""
+	m = numOfAlternatives
+	rankings = np.array(list(itertools.permutations(range(m))))
+	numTypes = len(rankings)
+	positions = np.argsort(rankings, axis=1)
+	above = (positions[:,:,None] < positions[:,None,:]).astype(np.int64)   # above[r,c,d] = 1 iff ranking r prefers c to d
+
+	counts = np.zeros(numTypes, dtype=np.int64)
+	counts[0] = numVoters
+	pairwise = numVoters * above[0]
+	moves = grayMoves(numVoters, numTypes)
+	first = True
+	while True:
+		block = np.fromiter(itertools.chain.from_iterable(itertools.islice(moves, blockSize - first)), dtype=np.int64).reshape(-1, 2)
+		if len(block) == 0 and not first:
+			return
+		countChanges = np.zeros((len(block)+first, numTypes), dtype=np.int64)
+		pairwiseChanges = np.zeros((len(block)+first, m, m), dtype=np.int64)
+		rows = np.arange(first, len(block)+first)
+		np.add.at(countChanges, (rows, block[:,0]), -1)
+		np.add.at(countChanges, (rows, block[:,1]), 1)
+		pairwiseChanges[first:] = above[block[:,1]] - above[block[:,0]]
+		blockCounts = counts + np.cumsum(countChanges, axis=0)
+		blockPairwise = pairwise + np.cumsum(pairwiseChanges, axis=0)
+		yield blockCounts, blockPairwise
+		counts, pairwise = blockCounts[-1], blockPairwise[-1]
+		first = False
+
+
+def hasCondorcetWinner(counts: np.ndarray, pairwise: np.ndarray, numOfAlternatives: int) -> np.ndarray:
+	return np.any(np.sum(pairwise > pairwise.transpose(0,2,1), axis=2) == numOfAlternatives-1, axis=1)
+
+# The properties that exactProbabilities computes: the Condorcet winner, from the pairwise matrices,
+# and the properties of consensus.countProperties, from the counts.
+PROPERTIES = ("condorcet",) + consensus.COUNT_PROPERTIES
+
+
+def exactProbabilities(numVoters: int, numOfAlternatives: int, distribution="ic", properties: tuple=("condorcet", "level1-strict", "level1-flexible", "single-peaked"), blockSize: int=2**14) -> dict:
+	"""
+	Computes the exact probability of each property, by summing the probabilities of all anonymous profiles that have it.
+
+	INPUT:
+	distribution - "iac": all anonymous profiles are equally likely (impartial anonymous culture);
+	               "ic": the voters are i.i.d. and uniform over the m! rankings (impartial culture);
+	               or an array of m! probabilities of the rankings of itertools.permutations(range(m)),
+	               for i.i.d. voters, e.g. conditional.ProfileGenerator("mallows", ...).rankingProbabilities().
+	properties   - names in PROPERTIES.
+
+	OUTPUT: dict that maps each property to its probability.
+
+	Gehrlein's formula for the probability of a Condorcet winner with 3 alternatives, under IAC and odd n, is 15(n+3)^2/(16(n+2)(n+4)):
+
+	>>> round(exactProbabilities(5, 3, "iac", ["condorcet"])["condorcet"], 6), round(15*8*8/(16*7*9), 6)
+	(0.952381, 0.952381)
+
+	Under IC with 3 voters, the probability of Condorcet's paradox is 1/18:
+
+	>>> round(1 - exactProbabilities(3, 3, "ic", ["condorcet"])["condorcet"], 6), round(1/18, 6)
+	(0.055556, 0.055556)
+	>>> probabilities = exactProbabilities(2, 3, "ic")
+	>>> round(probabilities["single-peaked"], 6), round(probabilities["level1-strict"], 6)
+	(1.0, 0.166667)
+	"""
+	unknown = [name for name in properties if name not in PROPERTIES]
+	if unknown:
+		raise ValueError("unknown properties: "+", ".join(unknown))
+	m = numOfAlternatives
+	numTypes = math.factorial(m)
+	countNames = tuple(name for name in properties if name in consensus.COUNT_PROPERTIES)
+	if isinstance(distribution, str):
+		if distribution not in ("ic", "iac"):
+			raise ValueError("distribution should be 'ic', 'iac' or an array of probabilities, not "+distribution)
+		logProbabilities = None if distribution == "iac" else np.full(numTypes, -math.log(numTypes))
+	else:
+		distribution = np.asarray(distribution, dtype=float)
+		if distribution.shape != (numTypes,):
+			raise ValueError("distribution should have "+str(numTypes)+" probabilities")
+		with np.errstate(divide="ignore"):
+			logProbabilities = np.log(distribution)
+	logFactorials = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, numVoters+1)))))
+
+	totals = {name: 0.0 for name in properties}
+	for counts, pairwise in enumerateProfiles(numVoters, m, blockSize):
+		if logProbabilities is None:
+			weights = np.full(len(counts), 1.0 / numberOfProfiles(numVoters, m))
+		else:
+			# The multinomial probability n!/prod(c_r!) * prod(p_r^c_r); rankings with c_r = 0 contribute 1 even if p_r = 0.
+			logWeights = logFactorials[numVoters] - logFactorials[counts].sum(axis=1) \
+				+ np.where(counts > 0, counts * logProbabilities, 0.0).sum(axis=1)
+			weights = np.exp(logWeights)
+		# The property checks are recomputed on the whole block, with one batch consensus check for both consensus variants.
+		found = consensus.countProperties(counts, m, countNames)
+		if "condorcet" in properties:
+			found["condorcet"] = hasCondorcetWinner(counts, pairwise, m)
+		for name in properties:
+			totals[name] += weights[found[name]].sum()
+	return {name: float(total) for name, total in totals.items()}
+
+
+if __name__ == "__main__":
+	import doctest, time
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	for n in range(1, 16, 2):
+		start = time.time()
+		probabilities = exactProbabilities(n, 3, "iac")
+		print(n, numberOfProfiles(n, 3), "profiles", probabilities, "Gehrlein:", 15*(n+3)**2/(16*(n+2)*(n+4)), "({:.2f} seconds)".format(time.time()-start))
@@ -48,7 +48,20 @@ About
   * Single-Peaked Impartial Culture --- gen_single_peaked_impartial_culture_strict, gen_icsp
   * Mallows       --- gen_mallows
   * Mallows mix   --- gen_mallows_mix
+  * Plackett-Luce --- gen_plackett_luce, gen_plackett_luce_mix
+  * Spatial (Euclidean) --- gen_spatial
   
+  The low-level generators (gen_urn, gen_icsp, gen_mallows_voteset) return a voteset
+  (a dict from tuples to counts) by default. With output="counts" they return instead
+  a count vector over the m! rankings (np.bincount over the Lehmer-code index of each
+  ranking; see orders_to_counts), which avoids hashing a tuple for every voter.
+  Mallows mixtures are sampled in bulk: one multinomial draw splits the voters among
+  the components, and each component decodes all its insertion vectors at once
+  (see gen_mallows_mixture_votes and mallows_insertvecs_to_votes).
+
+  From the command line, -p distributes the instances among worker processes,
+  each with its own random seed (derived from --seed). Each worker writes its files
+  directly from the count vectors (see gen_instance_file).
   
 
 '''
@@ -58,9 +71,15 @@ import math
 import copy
 import argparse
 import sys
+import os
+import time
+from multiprocessing import Pool
 import numpy as np
 
-from preflibtools import io
+from preflibtools import io, inversions, profile
+
+# gen_icsp counts the coin-flip patterns of at most this many alternatives directly.
+ICSP_PATTERN_LIMIT = 20
 
 # Refactored Generator Functions.
 
@@ -143,6 +162,24 @@ def gen_mallows_mix(numvotes, candmap, nref):
   >>> len(rmapcount)
   6
   """
+  mix, phis, refs = gen_mallows_mix_parameters(candmap, nref)
+  return gen_mallows(numvotes, candmap, mix, phis, refs)
+
+
+# Draw the parameters of a Mallows mixture: nref random reference rankings,
+# with phis and mixture weights drawn iid.
+def gen_mallows_mix_parameters(candmap, nref):
+  """
+  INPUT:
+  candmap - dict, maps candidate id to candidate name.
+  nref    - int number of reference-rankings.
+
+  OUTPUT: mix, phis, refs - as in gen_mallows.
+
+  >>> mix, phis, refs = gen_mallows_mix_parameters({1:"Alice",2:"Bob",3:"Carl"}, 2)
+  >>> len(mix), len(phis), len(refs[0])
+  (2, 2, 3)
+  """
   #Generate the requisite number of reference rankings and phis
   #Mix should be a random number over each...
   mix = []
@@ -155,10 +192,10 @@ def gen_mallows_mix(numvotes, candmap, nref):
     mix.append(random.randint(1,100))
   # Normalize mix to 1:
   smix = sum(mix)
-  mix = [float(i) / float(smix) for i in mix]  
-  return gen_mallows(numvotes, candmap, mix, phis, refs)
+  mix = [float(i) / float(smix) for i in mix]
+  return mix, phis, refs
+
 
-  
 def gen_mallows(numvotes, candmap, mix, phis, refs):
   """
   INPUT:
@@ -181,7 +218,7 @@ def gen_mallows(numvotes, candmap, mix, phis, refs):
   return voteset_to_rankmap(voteset, candmap)
 
 
-def gen_mallows_voteset(numvotes, alternatives, mix, phis, refs):
+def gen_mallows_voteset(numvotes, alternatives, mix, phis, refs, output="voteset"):
   """
   INPUT:
   numvotes - int, number of votes to generate.
@@ -189,56 +226,363 @@ def gen_mallows_voteset(numvotes, alternatives, mix, phis, refs):
   mix     - list of float, summing to 1. Probability distribution over Mallows models with different references.
   phis    - list of float, parameter of Mallows function for each reference.
   refs    - list of lists, the reference ("correct") rankings.
+  output  - "voteset" (default) or "counts".
   
-  OUTPUT:  dict, represents a profile, maps preferences (tuples) to their frequency in the profile.
+  OUTPUT:
+  * if output=="voteset": dict, represents a profile, maps preferences (tuples) to their frequency in the profile.
+  * if output=="counts":  np.array of length m!, element r is the frequency of the r-th ranking of itertools.permutations(alternatives).
   
   >>> voteset = gen_mallows_voteset(100, {1:"Alice",2:"Bob",3:"Carl"}, [1.0], [0.5], [[1,2,3]])
   >>> len(voteset)    # should be 3! - number of possible rankings.
   6
+  >>> counts = gen_mallows_voteset(100, [1,2,3], [1.0], [0.0], [[3,1,2]], output="counts")
+  >>> counts_to_voteset(counts, [1,2,3])
+  {(3, 1, 2): 100}
   """
+  check_output(output)
   numrefs = len(refs)
   if len(mix) != numrefs or len(phis) != numrefs:
     raise ValueError("mix, phis and refs must be lists of the same length")
+  if round(sum(mix),5) != 1.0:
+    raise ValueError("Input Distro is not a Distro...\n"+str(mix) + "  Sum: " + str(sum(mix)))
 
-  #Precompute the distros for each Phi and Ref.
-  #Turn each ref into an order for ease of use...
-  m_insert_dists = []
-  for i in range(numrefs):
-    m_insert_dists.append(compute_mallows_insertvec_dist(len(alternatives), phis[i]))
-    
-  #print("m_insert_dists",m_insert_dists)
+  # Generate the votes as indices into the list of alternatives.
+  alternatives = list(alternatives)
+  position = {alternative: i for i, alternative in enumerate(alternatives)}
+  refs = [[position[alternative] for alternative in ref] for ref in refs]
+  votes = gen_mallows_mixture_votes(numvotes, mix, phis, refs)
+  return votes_to_output(votes, alternatives, output)
 
-  #Now, generate votes...
-  votemap = {}
-  for cvoter in range(numvotes):
-    #print("drawing")
-    cmodel = draw(range(numrefs), mix)
-    #print("cmodel", cmodel)
-    ref = refs[cmodel]
-    #print("ref", ref)
-    insertvec_dist = m_insert_dists[cmodel]   # the probabilities of Mallows model. A dict from int to discrete probability distribution.
-    
-    #Generate a vote for the selected model
-    insvec = [0] * len(alternatives)
-    for i in range(1, len(insvec)+1):
-      options = list(range(1, i+1))
-      #options are 1...max
-      #print("Options: " + str(options))
-      #print("Dist: " + str(insertvec_dist[i]))
-      #print("Drawing on model " + str(cmodel))
-      insvec[i-1] = draw(options, insertvec_dist[i])
-    #print("insvec",insvec)
-    vote = []
-    for i in range(len(ref)):
-      vote.insert(insvec[i]-1, ref[i])
-    #print("mallows vote: " + str(vote))
-    tvote = tuple(vote)
-    votemap[tvote] = votemap.get(tvote, 0) + 1
-  return votemap
+# Generate a Plackett-Luce profile: each voter ranks the alternatives by
+# repeatedly picking one of the remaining ones with probability proportional to its weight.
+def gen_plackett_luce(numvotes, alternatives, weights, output="voteset"):
+  """
+  INPUT:
+  numvotes     - int, number of votes to generate.
+  alternatives - list of alternatives.
+  weights      - list of positive floats, the weight of each alternative.
+  output       - "voteset" (default) or "counts".
+
+  OUTPUT: as in gen_mallows_voteset.
+
+  >>> voteset = gen_plackett_luce(1000, ["a", "b", "c"], [1.0, 1.0, 1.0])
+  >>> len(voteset), sum(voteset.values())
+  (6, 1000)
+  >>> np.random.seed(0)
+  >>> counts = gen_plackett_luce(1000, [1, 2, 3], [100.0, 10.0, 1.0], output="counts")
+  >>> counts_to_voteset(counts, [1, 2, 3])
+  {(1, 2, 3): 804, (1, 3, 2): 85, (2, 1, 3): 103, (3, 1, 2): 6, (3, 2, 1): 2}
+  """
+  return gen_plackett_luce_mix(numvotes, alternatives, [1.0], [weights], output)
+
+# Generate a mixture of Plackett-Luce models: one multinomial draw splits the voters
+# among the components, then each component is sampled in bulk.
+def gen_plackett_luce_mix(numvotes, alternatives, mix, weights, output="voteset"):
+  """
+  INPUT:
+  numvotes     - int, number of votes to generate.
+  alternatives - list of alternatives.
+  mix          - list of float, summing to 1. Probability distribution over the Plackett-Luce models.
+  weights      - list of lists of positive floats; weights[k][i] is the weight of alternatives[i] in the k-th model.
+  output       - "voteset" (default) or "counts".
+
+  OUTPUT: as in gen_mallows_voteset.
+
+  >>> voteset = gen_plackett_luce_mix(100, [1, 2, 3], [0.5, 0.5], [[1e9, 1e3, 1.0], [1.0, 1e3, 1e9]])
+  >>> sorted(voteset.keys())
+  [(1, 2, 3), (3, 2, 1)]
+  """
+  check_output(output)
+  if len(mix) != len(weights):
+    raise ValueError("mix and weights must be lists of the same length")
+  if round(sum(mix),5) != 1.0:
+    raise ValueError("Input Distro is not a Distro...\n"+str(mix) + "  Sum: " + str(sum(mix)))
+  alternatives = list(alternatives)
+  sizes = np.random.multinomial(numvotes, np.asarray(mix, dtype=float) / sum(mix))
+  votes = np.concatenate([np.empty((0, len(alternatives)), dtype=np.int64)] +
+    [gen_plackett_luce_votes(size, w) for size, w in zip(sizes.tolist(), weights) if size > 0])
+  return votes_to_output(votes, alternatives, output)
+
+# Generate Plackett-Luce votes for many voters at once, with the Gumbel-max trick:
+# sorting log(weight) + Gumbel noise in decreasing order gives a Plackett-Luce ranking.
+def gen_plackett_luce_votes(numvotes, weights, chunksize=2**22):
+  """
+  INPUT:
+  numvotes  - int, number of votes.
+  weights   - list of m positive floats.
+  chunksize - int, bounds the number of (voter, alternative) pairs processed together.
+
+  OUTPUT: int array of shape (numvotes, m); each row is a ranking of the indices 0,...,m-1.
+
+  >>> gen_plackett_luce_votes(2, [1.0, 1e9, 1e3])
+  array([[1, 2, 0],
+         [1, 2, 0]])
+  >>> gen_plackett_luce_votes(2, [1.0, 0.0, 3.0])
+  Traceback (most recent call last):
+  ...
+  ValueError: Plackett-Luce weights must be positive: [1.0, 0.0, 3.0]
+  """
+  weights = np.asarray(weights, dtype=float)
+  if not np.all((weights > 0) & np.isfinite(weights)):
+    raise ValueError("Plackett-Luce weights must be positive: " + str(weights.tolist()))
+  logweights = np.log(weights)
+  ncand = len(logweights)
+  votes = np.empty((numvotes, ncand), dtype=np.int64)
+  rows = max(1, chunksize // max(ncand, 1))
+  for start in range(0, numvotes, rows):
+    size = min(rows, numvotes - start)
+    votes[start:start+size] = np.argsort(-(logweights + np.random.gumbel(size=(size, ncand))), axis=1)
+  return votes
+
+# Generate a spatial (Euclidean) profile: voters and alternatives are points in
+# d-dimensional space, and each voter ranks the alternatives by their distance.
+def gen_spatial(numvotes, alternatives, dimensions=2, voter_distribution="uniform", candidate_distribution="uniform", candidate_positions=None, output="voteset"):
+  """
+  INPUT:
+  numvotes     - int, number of votes to generate.
+  alternatives - list of alternatives.
+  dimensions   - int, the dimension d of the space.
+  voter_distribution, candidate_distribution - "uniform" (on the unit cube), "gaussian" (standard normal),
+                 or a function that takes a shape (n, d) and returns an array of n points.
+  candidate_positions - array of shape (m, d); if given, candidate_distribution is not used.
+  output       - "voteset" (default) or "counts".
+
+  OUTPUT: as in gen_mallows_voteset.
+  With dimensions=1 the profile is single-peaked with respect to the alternatives sorted by position.
+
+  >>> from preflibtools import domain_restriction
+  >>> voteset = gen_spatial(1000, [1, 2, 3, 4, 5], dimensions=1, candidate_positions=[[0.1], [0.9], [0.3], [0.5], [0.7]])
+  >>> domain_restriction.verify_orders_single_peaked_axis_strict([1, 3, 4, 5, 2], [list(vote) for vote in voteset])
+  True
+  """
+  check_output(output)
+  alternatives = list(alternatives)
+  if candidate_positions is None:
+    candidate_positions = gen_spatial_points(len(alternatives), dimensions, candidate_distribution)
+  votes = gen_spatial_votes(numvotes, candidate_positions, voter_distribution)
+  return votes_to_output(votes, alternatives, output)
+
+# Draw n points in d dimensions from one of the distributions of gen_spatial.
+def gen_spatial_points(n, dimensions, distribution="uniform"):
+  if callable(distribution):
+    return np.asarray(distribution((n, dimensions)), dtype=float)
+  if distribution == "uniform":
+    return np.random.random((n, dimensions))
+  if distribution == "gaussian":
+    return np.random.standard_normal((n, dimensions))
+  raise ValueError("distribution should be 'uniform', 'gaussian' or a function, not " + str(distribution))
+
+# Generate spatial votes for many voters at once: the (voters x alternatives) distance
+# matrix is computed and argsorted in chunks that fit in memory.
+def gen_spatial_votes(numvotes, candidate_positions, voter_distribution="uniform", chunksize=2**22):
+  """
+  INPUT:
+  numvotes            - int, number of votes.
+  candidate_positions - array of shape (m, d).
+  voter_distribution  - as in gen_spatial.
+  chunksize           - int, bounds the number of (voter, alternative) distances computed together.
+
+  OUTPUT: int array of shape (numvotes, m); row v ranks the indices of the alternatives from the nearest to voter v to the farthest.
+
+  >>> gen_spatial_votes(2, [[0.0], [1.0], [0.4]], lambda shape: np.zeros(shape))
+  array([[0, 2, 1],
+         [0, 2, 1]])
+  """
+  candidate_positions = np.asarray(candidate_positions, dtype=float)
+  ncand, dimensions = candidate_positions.shape
+  squarednorms = (candidate_positions ** 2).sum(axis=1)
+  votes = np.empty((numvotes, ncand), dtype=np.int64)
+  rows = max(1, chunksize // max(ncand, dimensions, 1))
+  for start in range(0, numvotes, rows):
+    size = min(rows, numvotes - start)
+    voters = gen_spatial_points(size, dimensions, voter_distribution)
+    # The squared distance, up to the squared norm of the voter (which does not change the ranking):
+    distances = squarednorms - 2 * voters @ candidate_positions.T
+    votes[start:start+size] = np.argsort(distances, axis=1)
+  return votes
+
+# Aggregate votes, given as indices into the list of alternatives, into the requested output.
+def votes_to_output(votes, alternatives, output):
+  """
+  >>> votes_to_output(np.array([[0, 1], [1, 0], [0, 1]]), ["a", "b"], "voteset")
+  {('a', 'b'): 2, ('b', 'a'): 1}
+  >>> votes_to_output(np.array([[0, 1], [1, 0], [0, 1]]), ["a", "b"], "counts")
+  array([2, 1])
+  """
+  if output == "counts":
+    return orders_to_counts(votes, len(alternatives))
+  orders, counts = np.unique(votes, axis=0, return_counts=True)
+  return {tuple(alternatives[i] for i in order): count for order, count in zip(orders.tolist(), counts.tolist())}
+
+# Generate the votes of a mixture of Mallows models: a single multinomial draw
+# splits the voters among the components, then each component is sampled in bulk.
+def gen_mallows_mixture_votes(numvotes, mix, phis, refs):
+  """
+  INPUT:
+  numvotes - int, number of votes to generate.
+  mix      - list of float, summing to 1. Probability distribution over the Mallows models.
+  phis     - list of float, parameter of each Mallows model.
+  refs     - list of lists, the reference ranking of each Mallows model.
+
+  OUTPUT: array of shape (numvotes, m), one vote per row, grouped by component.
+
+  >>> votes = gen_mallows_mixture_votes(10, [0.5, 0.5], [0.0, 0.0], [[0,1,2], [2,1,0]])
+  >>> votes.shape, sorted(set(map(tuple, votes.tolist())) - {(0,1,2), (2,1,0)})
+  ((10, 3), [])
+  """
+  mix = np.asarray(mix, dtype=float)
+  sizes = np.random.multinomial(numvotes, mix / mix.sum())
+  # Components with the same phi share their insertion distributions.
+  insertvec_dists = {}
+  parts = [np.empty((0, len(refs[0]) if refs else 0), dtype=np.int64)]
+  for size, phi, ref in zip(sizes.tolist(), phis, refs):
+    if size == 0:
+      continue
+    if phi not in insertvec_dists:
+      insertvec_dists[phi] = compute_mallows_insertvec_dist(len(ref), phi)
+    parts.append(gen_mallows_votes(size, ref, phi, insertvec_dists[phi]))
+  return np.concatenate(parts)
 
 
 #  Helper Functions -- Actual Generators -- Don't call these directly.
 
+# Check the output mode requested from a generator.
+def check_output(output):
+  if output not in ("voteset", "counts"):
+    raise ValueError("output should be 'voteset' or 'counts', not " + str(output))
+
+# Aggregate sampled votes into a single count vector over all the m! rankings.
+def orders_to_counts(orders, ncand):
+  """
+  INPUT:
+  orders - int array (or list of lists) with one row per vote; each row is a ranking of 0,...,ncand-1 (indices into the list of alternatives).
+  ncand  - int, number of candidates.
+
+  OUTPUT: np.array of length ncand!; element r is the number of votes whose ranking
+  is the r-th element of itertools.permutations(range(ncand)) (its Lehmer-code index).
+
+  >>> orders_to_counts([[0,1,2],[2,1,0],[0,1,2]], 3)
+  array([2, 0, 0, 0, 0, 1])
+  """
+  indices = inversions.permutationsToIndices(np.asarray(orders, dtype=np.int64).reshape(-1, ncand))
+  return np.bincount(indices, minlength=math.factorial(ncand))
+
+# Convert a count vector over the m! rankings back to a voteset.
+def counts_to_voteset(counts, alternatives):
+  """
+  INPUT:
+  counts - np.array of length m!, as returned by orders_to_counts.
+  alternatives - list of the m alternatives.
+
+  OUTPUT: dict from tuples to ints, containing the rankings with a positive count.
+
+  >>> counts_to_voteset(np.array([2,0,0,0,0,1]), ["a","b","c"])
+  {('a', 'b', 'c'): 2, ('c', 'b', 'a'): 1}
+  """
+  alternatives = list(alternatives)
+  nonzero = np.nonzero(counts)[0]
+  orders = inversions.indicesToPermutations(nonzero, len(alternatives))
+  return {tuple(alternatives[i] for i in order): counts[r].item() for r, order in zip(nonzero, orders)}
+
+# Convert a count vector over the m! rankings to a profile.CompactOrderProfile,
+# which io.write_compact writes without building a string per ranking.
+def counts_to_compact(counts, candmap, numvoters=None):
+  """
+  INPUT:
+  counts    - np.array of length m!, as returned by orders_to_counts.
+  candmap   - dict, maps candidate id to candidate name; the i-th key is the alternative with index i.
+  numvoters - int, number of voters (default: the sum of counts).
+
+  OUTPUT: profile.CompactOrderProfile with the rankings that have a positive count.
+
+  >>> counts_to_compact(np.array([2,0,0,0,0,1]), {1:"a",2:"b",3:"c"}).get_map_from_order_to_weight()
+  {(1, 2, 3): 2, (3, 2, 1): 1}
+  """
+  alternatives = np.array(list(candmap.keys()))
+  nonzero = np.nonzero(counts)[0]
+  orders = alternatives[inversions.indicesToPermutations(nonzero, len(alternatives))]
+  return profile.CompactOrderProfile(candmap, orders.reshape(len(nonzero), len(alternatives)), counts[nonzero], numvoters=numvoters)
+
+# Draw random weights for a Plackett-Luce model, uniformly from the simplex.
+def gen_plackett_luce_weights(ncand):
+  return np.random.dirichlet(np.ones(ncand)).tolist()
+
+# Generate the count vector of one instance of a model of the command line (-t).
+def gen_model_counts(model, numvotes, candmap):
+  """
+  INPUT:
+  model    - int, 1 to 6, as in the -t option of the command line.
+  numvotes - int, number of voters.
+  candmap  - dict, maps candidate id to candidate name.
+
+  OUTPUT: np.array of length m!, as returned by orders_to_counts (in the order of candmap.keys()).
+  Model 7 (Plackett-Luce) draws the weights of the alternatives with gen_plackett_luce_weights.
+
+  >>> int(gen_model_counts(4, 100, gen_cand_map(3)).sum())
+  100
+  """
+  alternatives = list(candmap.keys())
+  if model == 1:
+    return gen_urn(numvotes, 0, alternatives, output="counts")
+  elif model == 2:
+    return gen_icsp(numvotes, alternatives, output="counts")
+  elif model == 3:
+    return gen_urn(numvotes, 1, alternatives, output="counts")
+  elif model == 4 or model == 5:
+    mix, phis, refs = gen_mallows_mix_parameters(candmap, 5 if model == 4 else 1)
+    return gen_mallows_voteset(numvotes, alternatives, mix, phis, refs, output="counts")
+  elif model == 6:
+    return gen_urn(numvotes, math.factorial(len(alternatives)), alternatives, output="counts")
+  elif model == 7:
+    return gen_plackett_luce(numvotes, alternatives, gen_plackett_luce_weights(len(alternatives)), output="counts")
+  raise ValueError("Not a valid model: " + str(model))
+
+# Seed both the numpy and the python random generators from a np.random.SeedSequence,
+# e.g. in a worker process, so that runs with the same seed give the same results.
+def seed_random(seed):
+  state = seed.generate_state(4)
+  np.random.seed(state)
+  random.seed(int.from_bytes(state.tobytes(), "little"))
+
+# Generate one instance and write it to a file. Runs in the worker processes.
+def gen_instance_file(task):
+  """
+  INPUT: task - a tuple (model, numvotes, ncand, seed, fname); seed is a np.random.SeedSequence.
+
+  OUTPUT: fname.
+  """
+  model, numvotes, ncand, seed, fname = task
+  seed_random(seed)
+  candmap = gen_cand_map(ncand)
+  io.write_compact(counts_to_compact(gen_model_counts(model, numvotes, candmap), candmap, numvotes), fname)
+  return fname
+
+# Generate many instances in parallel, with independent seeds.
+def gen_instance_files(model, numvotes, ncand, fnames, processes=None, seed=None):
+  """
+  INPUT:
+  model, numvotes, ncand - as in gen_model_counts.
+  fnames    - list of str, one file per instance.
+  processes - int, number of worker processes (default: the number of cores). 1 means no pool.
+  seed      - int, seed of the whole run; the same seed gives the same files (default: random).
+
+  OUTPUT: the number of files written.
+
+  >>> import tempfile, os
+  >>> root = tempfile.mkdtemp()
+  >>> gen_instance_files(1, 20, 3, [os.path.join(root, "GenModel_"+str(i)+".soc") for i in range(3)], processes=2, seed=1)
+  3
+  >>> io.read_compact_preflib_file(os.path.join(root, "GenModel_0.soc")).numvoters
+  20
+  """
+  seeds = np.random.SeedSequence(seed).spawn(len(fnames))
+  tasks = [(model, numvotes, ncand, s, fname) for s, fname in zip(seeds, fnames)]
+  if processes == 1 or len(tasks) <= 1:
+    return sum(1 for fname in map(gen_instance_file, tasks))
+  with Pool(processes) as pool:
+    return sum(1 for fname in pool.imap_unordered(gen_instance_file, tasks, chunksize=max(1, len(tasks)//(16*(processes or os.cpu_count())))))
+
+
 # Return a value drawn from a particular distribution.
 def draw(values, distro):
   #Return a value randomly from a given discrete distribution.
@@ -293,7 +637,148 @@ def compute_mallows_insertvec_dist(ncand:int, phi:float) -> dict:
     #print(str(dist) + "total: " + str(sum(dist)))
     vec_dist[i] = dist
   return vec_dist
-  
+
+# Sample insertion vectors for many voters at once, with the
+# distributions of compute_mallows_insertvec_dist.
+def gen_mallows_insertvecs(numvotes, ncand, phi, insertvec_dist=None):
+  """
+  INPUT:
+  numvotes       - int, number of votes.
+  ncand          - int, number of candidates.
+  phi            - float, parameter of the Mallows distribution.
+  insertvec_dist - the output of compute_mallows_insertvec_dist(ncand, phi), if it was already computed.
+
+  OUTPUT: int array of shape (numvotes, ncand); element [v,i] is in 1,...,i+1 and is drawn from insertvec_dist[i+1].
+
+  >>> gen_mallows_insertvecs(2, 4, 0)
+  array([[1, 2, 3, 4],
+         [1, 2, 3, 4]])
+  """
+  if insertvec_dist is None:
+    insertvec_dist = compute_mallows_insertvec_dist(ncand, phi)
+  insvecs = np.empty((numvotes, ncand), dtype=np.int64)
+  uniform = np.random.random((numvotes, ncand))
+  for i in range(ncand):
+    cdf = np.cumsum(insertvec_dist[i+1])
+    # Inverse-CDF sampling; the clip guards against a cdf that sums to slightly less than 1.
+    insvecs[:, i] = np.minimum(np.searchsorted(cdf, uniform[:, i], side="right"), i) + 1
+  return insvecs
+
+# Convert an insertion vector to a vote in O(m log m), with a Fenwick tree.
+def mallows_insertvec_to_vote(insvec, ref):
+  """
+  The vote is the one built by inserting ref[i] at position insvec[i] (1-based),
+  for i = 0,...,m-1, as in gen_mallows_voteset. Instead of m list insertions (O(m^2)),
+  the insertions are processed in reverse: the i-th inserted element ends up in the
+  insvec[i]-th slot that is still free after the later elements took their slots.
+  A Fenwick tree over the free slots finds that slot in O(log m).
+
+  INPUT:
+  insvec - list of ints, insvec[i] in 1,...,i+1.
+  ref    - list, the reference ranking.
+
+  OUTPUT: list, the vote.
+
+  >>> mallows_insertvec_to_vote([1, 1, 2, 4], ["a", "b", "c", "d"])
+  ['b', 'c', 'a', 'd']
+  """
+  m = len(ref)
+  tree = [0] + [i & -i for i in range(1, m+1)]   # the Fenwick tree of m free slots
+  top = 1 << (m.bit_length() - 1) if m > 0 else 0
+  vote = [None] * m
+  for i in range(m-1, -1, -1):
+    # Find the insvec[i]-th free slot.
+    k = insvec[i]
+    pos = 0
+    step = top
+    while step:
+      if pos + step <= m and tree[pos + step] < k:
+        pos += step
+        k -= tree[pos]
+      step >>= 1
+    vote[pos] = ref[i]
+    # Mark slot pos+1 (1-based) as taken.
+    j = pos + 1
+    while j <= m:
+      tree[j] -= 1
+      j += j & -j
+  return vote
+
+# Convert many insertion vectors to votes at once: the same Fenwick tree
+# walk as mallows_insertvec_to_vote, over integer arrays with one row per voter.
+def mallows_insertvecs_to_votes(insvecs, ref, chunksize=2**22):
+  """
+  INPUT:
+  insvecs   - int array of shape (numvotes, m), e.g. from gen_mallows_insertvecs.
+  ref       - list or array, the reference ranking.
+  chunksize - int, bounds the number of (voter, alternative) pairs decoded together.
+
+  OUTPUT: array of shape (numvotes, m); row v is mallows_insertvec_to_vote(insvecs[v], ref).
+
+  >>> mallows_insertvecs_to_votes(np.array([[1, 1, 2, 4], [1, 2, 3, 4]]), [10, 20, 30, 40])
+  array([[20, 30, 10, 40],
+         [10, 20, 30, 40]])
+  >>> mallows_insertvecs_to_votes(np.array([[1, 1, 2, 4], [1, 2, 3, 4], [1, 1, 1, 1]]), [10, 20, 30, 40], chunksize=5)
+  array([[20, 30, 10, 40],
+         [10, 20, 30, 40],
+         [40, 30, 20, 10]])
+  """
+  insvecs = np.asarray(insvecs)
+  ref = np.asarray(ref)
+  numvotes, m = insvecs.shape
+  votes = np.empty((numvotes, m), dtype=ref.dtype)
+  rows = max(1, chunksize // (m+1))
+  for start in range(0, numvotes, rows):
+    votes[start:start+rows] = _fenwick_decode(insvecs[start:start+rows], ref)
+  return votes
+
+# Decode a chunk of insertion vectors with one Fenwick tree per voter, as in mallows_insertvecs_to_votes.
+def _fenwick_decode(insvecs, ref):
+  numvotes, m = insvecs.shape
+  rows = np.arange(numvotes)
+  lowbits = np.arange(m+1) & -np.arange(m+1)
+  tree = np.tile(lowbits.astype(np.int32), (numvotes, 1))
+  top = 1 << (m.bit_length() - 1) if m > 0 else 0
+  votes = np.empty((numvotes, m), dtype=ref.dtype)
+  for i in range(m-1, -1, -1):
+    k = insvecs[:, i].astype(np.int32)
+    pos = np.zeros(numvotes, dtype=np.int64)
+    step = top
+    while step:
+      candidate = pos + step
+      inside = candidate <= m
+      counts = tree[rows, np.minimum(candidate, m)]
+      move = inside & (counts < k)
+      k -= np.where(move, counts, 0)
+      pos = np.where(move, candidate, pos)
+      step >>= 1
+    votes[rows, pos] = ref[i]
+    j = pos + 1
+    active = j <= m
+    while active.any():
+      tree[rows[active], j[active]] -= 1
+      j = np.where(active, j + (j & -j), j)
+      active = j <= m
+  return votes
+
+# Generate Mallows votes around a single reference ranking, for many voters at once.
+def gen_mallows_votes(numvotes, ref, phi, insertvec_dist=None):
+  """
+  INPUT:
+  numvotes - int, number of votes.
+  ref      - list, the reference ranking.
+  phi      - float, parameter of the Mallows distribution.
+  insertvec_dist - the output of compute_mallows_insertvec_dist(len(ref), phi), if it was already computed.
+
+  OUTPUT: array of shape (numvotes, len(ref)), one vote per row.
+  The votes have the same distribution as those of gen_mallows_voteset.
+
+  >>> gen_mallows_votes(2, [3, 1, 2], 0.0)
+  array([[3, 1, 2],
+         [3, 1, 2]])
+  """
+  return mallows_insertvecs_to_votes(gen_mallows_insertvecs(numvotes, len(ref), phi, insertvec_dist), ref)
+
 
 # Convert a votemap to a rankmap and rankmapcounts....
 def voteset_to_rankmap(votemap, candmap=None):
@@ -364,16 +849,18 @@ def gen_icsp_single_vote(alternatives):
   return tuple(temp[::-1]) # reverse
 
 
-def gen_icsp(numvotes, alternatives):
+def gen_icsp(numvotes, alternatives, output="voteset"):
   """
   Generate single-peaked votes based on Impartial-Culture assumption.
 
   INPUT:
   * numvotes -         int, total number of voters.
   * alternatives  -    list, codes of alternatives (aka candidates)
+  * output -           "voteset" (default) or "counts".
   
   OUTPUT:
   * voteMap - dict from tuples to ints: maps tuples that represent rankings, to the number of times it appears in the profile.
+  * if output=="counts": np.array of length m!, as returned by orders_to_counts.
   
   >>> voteMap = gen_icsp(200, [10,20,30])
   >>> len(voteMap)   # should be 4 - num of different single-peaked rankings.
@@ -384,16 +871,85 @@ def gen_icsp(numvotes, alternatives):
   True
   >>> voteMap[(30,20,10)] > 0
   True
+  >>> counts = gen_icsp(200, [10,20,30], output="counts")
+  >>> int(counts.sum()), int(np.count_nonzero(counts))
+  (200, 4)
+  """
+  check_output(output)
+  alternatives = list(alternatives)
+  ncand = len(alternatives)
+  if ncand <= ICSP_PATTERN_LIMIT:
+    # Each of the 2^(m-1) coin-flip patterns is equally likely, so the number of voters
+    # with each pattern is multinomial; only the patterns that occur are decoded.
+    npatterns = 2 ** max(ncand-1, 0)
+    patterncounts = np.random.multinomial(numvotes, [1.0/npatterns]*npatterns)
+    patterns = np.nonzero(patterncounts)[0]
+    votes = decode_icsp_bits((patterns[:, None] >> np.arange(ncand-1)) & 1, np.arange(ncand))
+    weights = patterncounts[patterns]
+  else:
+    votes, weights = np.unique(gen_icsp_votes(numvotes, np.arange(ncand)), axis=0, return_counts=True)
+  if output == "counts":
+    counts = np.zeros(math.factorial(ncand), dtype=np.int64)
+    counts[inversions.permutationsToIndices(votes)] = weights
+    return counts
+  return {tuple(alternatives[i] for i in vote): count for vote, count in zip(votes.tolist(), weights.tolist())}
+
+# Decode single-peaked votes from coin flips, as in gen_icsp_single_vote.
+def decode_icsp_bits(bits, axis):
+  """
+  The vote is built from the worst alternative to the best: at step t, the leftmost
+  remaining alternative of the axis is taken if bits[t]==1, and the rightmost otherwise.
+  The remaining alternative after m-1 steps is the peak. The leftmost (rightmost) pointer
+  at step t is the number of ones (zeros) among the previous bits, so all the votes are
+  decoded together with cumulative sums.
+
+  INPUT:
+  bits - int or bool array of shape (numvotes, m-1).
+  axis - list or array of the m alternatives, from left to right.
+
+  OUTPUT: array of shape (numvotes, m), one vote (best first) per row.
+
+  >>> decode_icsp_bits(np.array([[1, 1], [0, 1], [0, 0]]), [10, 20, 30])
+  array([[30, 20, 10],
+         [20, 10, 30],
+         [10, 20, 30]])
   """
-  voteset = {}
-  for i in range(numvotes):
-    tvote = gen_icsp_single_vote(alternatives)  # returns a tuple representing a rank
-    voteset[tvote] = voteset.get(tvote, 0) + 1
-  return voteset
+  axis = np.asarray(axis)
+  bits = np.asarray(bits, dtype=bool)
+  ncand = len(axis)
+  ones = np.cumsum(bits, axis=1)
+  left = ones - bits                                 # the number of ones before step t
+  right = ncand - 1 - (np.arange(ncand-1) - left)    # the number of zeros before step t, from the right
+  taken = np.empty((len(bits), ncand), dtype=np.int64)
+  taken[:, :ncand-1] = np.where(bits, left, right)
+  taken[:, ncand-1] = ones[:, -1] if ncand > 1 else 0
+  return axis[taken[:, ::-1]]
+
+# Generate single-peaked impartial-culture votes for many voters at once.
+def gen_icsp_votes(numvotes, axis, chunksize=2**20):
+  """
+  INPUT:
+  numvotes  - int, number of votes.
+  axis      - list or array of the alternatives, from left to right.
+  chunksize - int, number of votes decoded together.
+
+  OUTPUT: array of shape (numvotes, len(axis)), one vote (best first) per row.
+  Each vote is single-peaked with respect to the axis, with the distribution of gen_icsp_single_vote.
+
+  >>> votes = gen_icsp_votes(1000, ["a", "b", "c"])
+  >>> votes.shape, sorted(set(map(tuple, votes.tolist())))
+  ((1000, 3), [('a', 'b', 'c'), ('b', 'a', 'c'), ('b', 'c', 'a'), ('c', 'b', 'a')])
+  """
+  axis = np.asarray(axis)
+  votes = np.empty((numvotes, len(axis)), dtype=axis.dtype)
+  for start in range(0, numvotes, chunksize):
+    size = min(chunksize, numvotes - start)
+    votes[start:start+size] = decode_icsp_bits(np.random.randint(2, size=(size, max(len(axis)-1, 0))), axis)
+  return votes
 
 # Generate votes based on the URN Model.
 # we need numvotes votes with numreplace replacements.
-def gen_urn(numvotes, numreplace, alternatives):
+def gen_urn(numvotes, numreplace, alternatives, output="voteset"):
   """
   Generate votes based on the URN Model.
 
@@ -401,9 +957,11 @@ def gen_urn(numvotes, numreplace, alternatives):
   * numvotes -         int, total number of voters.
   * numreplace -       int, number of replacements (???)
   * alternatives  -    list, codes of alternatives (aka candidates)
+  * output -           "voteset" (default) or "counts".
   
   OUTPUT:
   * voteMap - dict from tuples to ints: maps tuples that represent rankings, to the number of times it appears in the profile.
+  * if output=="counts": np.array of length m!, as returned by orders_to_counts.
   
   >>> voteMap = gen_urn(200, 0, [10,20,30])
   >>> len(voteMap)   # should be 3! = num of different strict rankings.
@@ -414,11 +972,22 @@ def gen_urn(numvotes, numreplace, alternatives):
   True
   >>> voteMap[(30,20,10)] > 0
   True
+  >>> counts = gen_urn(200, 6, [10,20,30], output="counts")
+  >>> len(counts), int(counts.sum())
+  (6, 200)
   """
+  check_output(output)
+  numranks = math.factorial(len(alternatives))
+  if output == "counts":
+    if numreplace == 0:
+      return np.bincount(np.random.randint(numranks, size=numvotes), minlength=numranks)
+    # The urn is a Polya urn that starts with one ball per ranking and adds numreplace balls of the drawn
+    # ranking after each draw, so the counts are Dirichlet-multinomial with parameter 1/numreplace per ranking.
+    return np.random.multinomial(numvotes, np.random.dirichlet([1.0/numreplace]*numranks))
+
   voteMap = {}
   ReplaceVotes = {}
 
-  numranks = math.factorial(len(alternatives))
   alternatives = list(alternatives)
   ReplaceSize = 0
 
@@ -471,9 +1040,11 @@ if __name__ == '__main__':
   parser.add_argument('-i', '--interactive', dest='interactive', action='store_true', help='Run in Interactive Mode.')
   parser.add_argument('-n', '--voters', type=int, dest='nvoter', metavar='nvoter', help='Number of voters in profiles.')
   parser.add_argument('-m', '--candidates', type=int, dest='ncand', metavar='ncand', help='Number of candidates in profiles.')
-  parser.add_argument('-t', '--modeltype', type=int, dest='model', metavar='model', default="1", help='Model to generate the profile:  (1) Impartial Culture (2) Single Peaked Impartial Culture (3) Impartial Anonymous Culture (4) Mallows with 5 Reference Orders  (5) Mallows with 1 Reference Order  (6) Urn with 50%% Replacement.')
+  parser.add_argument('-t', '--modeltype', type=int, dest='model', metavar='model', default="1", help='Model to generate the profile:  (1) Impartial Culture (2) Single Peaked Impartial Culture (3) Impartial Anonymous Culture (4) Mallows with 5 Reference Orders  (5) Mallows with 1 Reference Order  (6) Urn with 50%% Replacement (7) Plackett-Luce with random weights.')
   parser.add_argument('-c', '--numinstances', type=int, dest='ninst', metavar='ninst', help='Number of instanes to generate.')
   parser.add_argument('-o', '--outpath', dest='outpath', metavar='path', help='Path to save output.')
+  parser.add_argument('-p', '--processes', type=int, dest='processes', metavar='nproc', help='Generate the instances in parallel with nproc worker processes (0 = number of cores), writing the files directly from the sampled counts.')
+  parser.add_argument('--seed', type=int, dest='seed', metavar='seed', help='Random seed of the parallel generation; the same seed gives the same files.')
 
   results = parser.parse_args()
 
@@ -485,7 +1056,7 @@ if __name__ == '__main__':
     ncand = int(input("Enter a number of candidates: "))
     nvoter = int(input("Enter a number of voters: "))
 
-    print('''Please select from the following: \n 1) Impartial Culture \n 2) Single Peaked Impartial Culture \n 3) Impartial Anonymous Culture \n 4) Mallows with 5 Reference Orders \n 5) Mallows with 1 Reference Order \n 6) Urn with 50% Replacement \n''')
+    print('''Please select from the following: \n 1) Impartial Culture \n 2) Single Peaked Impartial Culture \n 3) Impartial Anonymous Culture \n 4) Mallows with 5 Reference Orders \n 5) Mallows with 1 Reference Order \n 6) Urn with 50% Replacement \n 7) Plackett-Luce with random weights \n''')
     model = int(input("Selection >> "))
     ninst = 1
   else:
@@ -496,6 +1067,14 @@ if __name__ == '__main__':
     base_file_name = "GenModel_"
     base_path = results.outpath if results.outpath != None else "./"
 
+    if results.processes != None:
+      fnames = [base_path + base_file_name + str(i) + ".soc" for i in range(ninst)]
+      start = time.time()
+      gen_instance_files(model, nvoter, ncand, fnames, processes=results.processes or None, seed=results.seed)
+      elapsed = time.time() - start
+      print("Generated " + str(ninst) + " instances in " + "{:.2f}".format(elapsed) + " seconds (" + "{:.1f}".format(ninst / elapsed) + " instances/sec)")
+      exit()
+
   candidateMap = gen_cand_map(ncand)
   for i in range(ninst):
     if model == 1:
@@ -518,6 +1097,9 @@ if __name__ == '__main__':
       #if we want a 50% chance the second preference is like the first, then
       #we set replacement to items!
       rmaps, rmapscounts = gen_urn_strict(nvoter, math.factorial(ncand), candidateMap)
+    elif model == 7:
+      # Generate a Plackett-Luce profile with random weights.
+      rmaps, rmapscounts = voteset_to_rankmap(gen_plackett_luce(nvoter, list(candidateMap.keys()), gen_plackett_luce_weights(ncand)))
     else:
       print("Not a valid model")
       exit()
@@ -7,6 +7,7 @@ Date:    2017-02
 """
 
 import functools
+import numpy as np
 from typing import Sequence
 
 @functools.lru_cache(maxsize=None)
@@ -50,6 +51,110 @@ def numNPermutationsWithKInversions(N: int, K: int) -> int:
 	return val;
 
 
+@functools.lru_cache(maxsize=None)
+def mahonianRow(N: int) -> np.ndarray:
+	"""
+	Return the N-th row of the Mahonian triangle as a read-only numpy array:
+	element K is numNPermutationsWithKInversions(N,K), for K=0,...,N(N-1)/2.
+
+	The row is computed with exact integers; entries that do not fit in int64 (N>20)
+	are clipped to the int64 maximum, which is still larger than any count of distinct rankings.
+
+	>>> mahonianRow(4)
+	array([1, 3, 5, 6, 5, 3, 1])
+	>>> mahonianRow(1)
+	array([1])
+	"""
+	row = [1]
+	for n in range(2, N+1):
+		# T(n,k) = T(n-1,k) + T(n-1,k-1) + ... + T(n-1,k-n+1), computed with a sliding window:
+		newRow = []
+		window = 0
+		for k in range(len(row)+n-1):
+			if k < len(row): window += row[k]
+			if k-n >= 0: window -= row[k-n]
+			newRow.append(window)
+		row = newRow
+	limit = np.iinfo(np.int64).max
+	result = np.array([min(x,limit) for x in row], dtype=np.int64)
+	result.setflags(write=False)
+	return result
+
+
+def countInversions(A: np.ndarray) -> np.ndarray:
+	"""
+	INPUT: A, a 2-D array of numbers.
+
+	OUTPUT: a 1-D int array with the number of inverted pairs in each row of A.
+	All rows are handled together, so the cost is O(m) numpy operations on arrays with one entry per row.
+
+	>>> countInversions([[1,2,3],[1,3,2],[2,3,1],[3,2,1]])
+	array([0, 1, 2, 3])
+	>>> countInversions([[1,4,2,3],[4,3,2,1]])
+	array([2, 6])
+	"""
+	A = np.asarray(A)
+	counts = np.zeros(A.shape[0], dtype=np.int64)
+	for i in range(A.shape[1]-1):
+		counts += np.count_nonzero(A[:, i, None] > A[:, i+1:], axis=1)
+	return counts
+
+
+def permutationsToIndices(perms) -> np.ndarray:
+	"""
+	Rank permutations by their Lehmer code (factorial number system).
+
+	INPUT: perms, an int array whose last axis has length m; each row is a permutation of 0,...,m-1.
+
+	OUTPUT: an int64 array with the index of each permutation in lexicographic order,
+	which is the order of itertools.permutations(range(m)). Supports m<=20, since 20! < 2**63.
+
+	>>> permutationsToIndices([[0,1,2],[0,2,1],[1,0,2],[1,2,0],[2,0,1],[2,1,0]])
+	array([0, 1, 2, 3, 4, 5])
+	>>> int(permutationsToIndices([3,2,1,0]))
+	23
+	"""
+	perms = np.asarray(perms)
+	m = perms.shape[-1]
+	if m > 20:
+		raise ValueError("Permutation indices of "+str(m)+" elements do not fit in int64")
+	indices = np.zeros(perms.shape[:-1], dtype=np.int64)
+	for i in range(m):
+		# The i-th Lehmer digit is the number of later elements that are smaller than the i-th element:
+		digit = np.count_nonzero(perms[..., i+1:] < perms[..., i, None], axis=-1)
+		indices = indices*(m-i) + digit
+	return indices
+
+
+def indicesToPermutations(indices, m: int) -> np.ndarray:
+	"""
+	Unrank permutations: the inverse of permutationsToIndices.
+
+	INPUT: indices, an int array with values in 0,...,m!-1; m, the number of elements.
+
+	OUTPUT: an int array with one more axis, of length m; the permutations of 0,...,m-1 with the given indices.
+
+	>>> indicesToPermutations([0,1,5], 3)
+	array([[0, 1, 2],
+	       [0, 2, 1],
+	       [2, 1, 0]])
+	>>> indicesToPermutations(23, 4)
+	array([3, 2, 1, 0])
+	"""
+	remainders = np.array(indices, dtype=np.int64)
+	digits = np.empty(remainders.shape+(m,), dtype=np.int64)
+	for i in range(m-1, -1, -1):
+		digits[..., i] = remainders % (m-i)
+		remainders = remainders // (m-i)
+	# The i-th element is the digits[i]-th smallest element that was not used yet:
+	perms = np.empty_like(digits)
+	unused = np.ones(remainders.shape+(m,), dtype=bool)
+	for i in range(m):
+		perms[..., i] = np.argmax(np.cumsum(unused, axis=-1) > digits[..., i, None], axis=-1)
+		np.put_along_axis(unused, perms[..., i, None], False, axis=-1)
+	return perms
+
+
 def inversionDistance(A: Sequence, B: Sequence) -> int:
 	"""
 	INPUT: two lists/tuples, A and B. Must have the same size and the same set of elements.
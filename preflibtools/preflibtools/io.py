@@ -45,6 +45,11 @@ from preflibtools import profile
 import re
 import math
 import copy
+import os
+import queue
+import threading
+from io import BufferedReader, RawIOBase, TextIOWrapper
+import numpy as np
 
 def num(s: str):
     """ convert a string to either an int or a float """
@@ -52,6 +57,151 @@ def num(s: str):
     except ValueError: return float(s)
 
 
+# Map from file-name suffix to compression.
+COMPRESSIONS = {".gz": "gzip", ".xz": "xz", ".bz2": "bz2"}
+
+# Given a file name, return its PrefLib type and compression,
+# handling compound extensions such as .soc.gz and .toi.xz.
+def preflib_file_type(fname):
+  """
+  INPUT: fname, str, a file name or path.
+
+  OUTPUT: a tuple (ext, compression): ext is the PrefLib extension (e.g. "soc"),
+  compression is "gzip", "xz", "bz2" or None.
+
+  >>> preflib_file_type("data/ED-00004-00000001.soc")
+  ('soc', None)
+  >>> preflib_file_type("data/ED-00004-00000001.toi.xz")
+  ('toi', 'xz')
+  """
+  base = os.path.basename(fname)
+  compression = None
+  for suffix, name in COMPRESSIONS.items():
+    if base.endswith(suffix):
+      base = base[:-len(suffix)]
+      compression = name
+      break
+  return base.rpartition(".")[2] if "." in base else "", compression
+
+# Open a (possibly compressed) PrefLib file for reading text.
+def open_preflib_file(fname, blocksize=2**20, queuesize=8):
+  """
+  INPUT:
+  * fname     - str, path of a PrefLib file, possibly compressed (see preflib_file_type).
+  * blocksize - int, number of decompressed bytes passed from the decompressing thread at a time.
+  * queuesize - int, maximum number of blocks waiting in the queue.
+
+  OUTPUT: an open text file. Compressed files are decompressed as a stream on a
+  background thread, so that parsing overlaps with decompression.
+
+  >>> import tempfile, gzip
+  >>> fname = os.path.join(tempfile.mkdtemp(), "example.soc.gz")
+  >>> with gzip.open(fname, "wt") as f: _ = f.write("2\\n1,a\\n2,b\\n3,3,2\\n2,1,2\\n1,2,1\\n")
+  >>> with open_preflib_file(fname, blocksize=4) as f: f.readlines()[-2:]
+  ['2,1,2\\n', '1,2,1\\n']
+  >>> read_compact_preflib_file(fname).get_map_from_order_to_weight()
+  {(1, 2): 2, (2, 1): 1}
+
+  An error while decompressing is raised on every read after it:
+
+  >>> with open(fname, "rb") as f: data = f.read()
+  >>> with open(fname, "wb") as f: _ = f.write(data[:-10])
+  >>> f = open_preflib_file(fname)
+  >>> for attempt in range(2):
+  ...   try: f.read()
+  ...   except EOFError as e: print("EOFError")
+  EOFError
+  EOFError
+  >>> f.close()
+  """
+  ext, compression = preflib_file_type(fname)
+  if compression is None:
+    return open(fname)
+  raw = _BackgroundReader(_open_compressed(fname, compression, "rb"), blocksize, queuesize)
+  return TextIOWrapper(BufferedReader(raw, blocksize))
+
+def _open_compressed(fname, compression, mode):
+  if compression == "gzip":
+    import gzip
+    return gzip.open(fname, mode)
+  if compression == "xz":
+    import lzma
+    return lzma.open(fname, mode)
+  if compression == "bz2":
+    import bz2
+    return bz2.open(fname, mode)
+  raise ValueError("Unknown compression: " + str(compression))
+
+class _BackgroundReader(RawIOBase):
+  # A raw binary stream whose blocks are read from the source by a background thread,
+  # through a bounded queue. An error in the thread is raised in the reader, on every read after it.
+  def __init__(self, source, blocksize, queuesize):
+    self.source = source
+    self.blocksize = blocksize
+    self.blocks = queue.Queue(queuesize)
+    self.pending = memoryview(b"")
+    self.eof = False
+    self.error = None
+    self.stopping = threading.Event()
+    self.thread = threading.Thread(target=self._run, daemon=True)
+    self.thread.start()
+
+  def _run(self):
+    try:
+      while True:
+        block = self.source.read(self.blocksize)
+        if not self._put(block) or not block:
+          break
+    except Exception as e:
+      self._put(e)
+    finally:
+      self.source.close()
+
+  def _put(self, item):
+    # Wait for room in the queue, unless the reader was closed.
+    while not self.stopping.is_set():
+      try:
+        self.blocks.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def readable(self):
+    return True
+
+  def _get(self):
+    # Wait for the next block, unless the reader was closed.
+    while not self.stopping.is_set():
+      try:
+        return self.blocks.get(timeout=0.1)
+      except queue.Empty:
+        pass
+    raise ValueError("I/O operation on closed file")
+
+  def readinto(self, b):
+    if self.error is not None:
+      raise self.error
+    if not self.pending and not self.eof:
+      item = self._get()
+      if isinstance(item, Exception):
+        # The thread has stopped, so no more blocks will come.
+        self.error = item
+        raise item
+      self.eof = not item
+      self.pending = memoryview(item)
+    n = min(len(b), len(self.pending))
+    b[:n] = self.pending[:n]
+    self.pending = self.pending[n:]
+    return n
+
+  def close(self):
+    if not self.closed:
+      self.stopping.set()
+      self.thread.join()
+    super().close()
+
+
 def read_weighted_preflib_file(fname):
   """
   Given a file name, determine it's type and try to read it into
@@ -83,8 +233,8 @@ def read_weighted_preflib_file(fname):
   #TODO: Make this work for URLs
 
   # Get the extension type.
-  ext = fname[-3:]
-  with open(fname) as fin:
+  ext, compression = preflib_file_type(fname)
+  with open_preflib_file(fname) as fin:
     lines = fin.readlines()
 
   # Make sure it's an ED file.
@@ -115,6 +265,150 @@ def read_weighted_preflib_file(fname):
           prefs[i] = profile.WeightedPreferenceOrder(ranks=ranks, weight=weight)
   return profile.WeightedOrderProfile(objects, prefs)
 
+def read_compact_preflib_file(fname):
+  """
+  Read a PrefLib file of orders (soc, soi, toc or toi) into a profile.CompactOrderProfile,
+  without creating an object per order.
+
+  >>> import tempfile, os
+  >>> fname = os.path.join(tempfile.mkdtemp(), "example.toc")
+  >>> with open(fname, "w") as f: _ = f.write("3\\n1,a\\n2,b\\n3,c\\n8,8,3\\n5,1,2,3\\n2,{2,3},1\\n1,3,{1,2}\\n")
+  >>> p = read_compact_preflib_file(fname)
+  >>> p.get_order_strings(), p.weights.tolist(), p.numvoters
+  (['1,2,3', '{2,3},1', '3,{1,2}'], [5, 2, 1], 8)
+  """
+  with open_preflib_file(fname) as fin:
+    lines = fin.read().splitlines()
+  num_objects = int(lines[0].strip())
+  objects = {}
+  for line in lines[1:num_objects+1]:
+    bits = line.split(",", 1)
+    objects[int(bits[0].strip())] = bits[1].strip()
+  numvoters = int(lines[num_objects+1].split(",")[0].strip())
+  body = [line for line in lines[num_objects+2:] if line.strip()]
+
+  orders = np.zeros((len(body), num_objects), dtype=np.int32)
+  ties = np.zeros((len(body), num_objects), dtype=bool)
+  weights = []
+  for j, line in enumerate(body):
+    count, _, rest = line.partition(",")
+    weights.append(num(count.strip()))
+    if "{" not in rest:
+      ranked = [int(x) for x in rest.split(",") if x.strip()]
+      orders[j, :len(ranked)] = ranked
+    else:
+      inside = False
+      for i, token in enumerate(rest.split(",")):
+        token = token.strip()
+        if token.startswith("{"):
+          inside = True
+        else:
+          ties[j, i] = inside
+        if token.endswith("}"):
+          inside = False
+        orders[j, i] = int(token.strip("{}"))
+  return profile.CompactOrderProfile(objects, orders, np.array(weights), ties, numvoters)
+
+# Stream the orders of a PrefLib file of orders (soc, soi, toc or toi), one line at a time,
+# so that neither the file nor the profile is held in memory.
+def iter_preflib_orders(fname):
+  """
+  OUTPUT: a generator of (order, weight) pairs, one per line of the file; each order is a tuple
+  in the format of CompactOrderProfile.get_order_tuple (tied objects are grouped in tuples).
+
+  >>> import tempfile, os
+  >>> fname = os.path.join(tempfile.mkdtemp(), "example.toc")
+  >>> with open(fname, "w") as f: _ = f.write("3\\n1,a\\n2,b\\n3,c\\n8,8,3\\n5,1,2,3\\n2,{2,3},1\\n1,3,{1,2}\\n")
+  >>> list(iter_preflib_orders(fname))
+  [((1, 2, 3), 5), (((2, 3), 1), 2), ((3, (1, 2)), 1)]
+  """
+  with open_preflib_file(fname) as fin:
+    num_objects = int(fin.readline().strip())
+    for _ in range(num_objects+1):
+      fin.readline()
+    for line in fin:
+      if not line.strip():
+        continue
+      count, _, rest = line.partition(",")
+      if "{" not in rest:
+        order = tuple(int(x) for x in rest.split(",") if x.strip())
+      else:
+        order, group = [], None
+        for token in rest.split(","):
+          token = token.strip()
+          if token.startswith("{"):
+            group = []
+          obj = int(token.strip("{}"))
+          if group is None:
+            order.append(obj)
+          else:
+            group.append(obj)
+          if token.endswith("}"):
+            order.append(group[0] if len(group) == 1 else tuple(group))
+            group = None
+        order = tuple(order)
+      yield order, num(count.strip())
+
+# Given a profile.CompactOrderProfile, write it in Preflib format,
+# formatting many orders at a time into one large string.
+def write_compact(compact, file, compression=None, chunksize=2**16):
+  """
+  INPUT:
+  * compact     - profile.CompactOrderProfile to write.
+  * file        - str (a path) or an open text file.
+  * compression - None, "gzip", "xz" or "bz2"; applies only when file is a path.
+                  If None, it is determined by the extension of the path (see preflib_file_type).
+  * chunksize   - int, number of orders formatted into a single write.
+
+  The output is the same as write_map with the corresponding votemap (without the
+  trailing space after the candidate names): the orders are sorted by weight, from the largest to the smallest.
+
+  >>> import sys
+  >>> p = profile.CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[3,1,2],[1,2,3],[2,3,0]], weights=[2,5,1], ties=[[False,False,False],[False,False,False],[False,True,False]])
+  >>> write_compact(p, sys.stdout)
+  3
+  1,a
+  2,b
+  3,c
+  8,8,3
+  5,1,2,3
+  2,3,1,2
+  1,{2,3}
+  """
+  if isinstance(file, str):
+    with _open_for_write(file, compression) as fout:
+      return write_compact(compact, fout, chunksize=chunksize)
+
+  #Write the header.
+  header = [str(len(compact.objects))]
+  header += [str(ele) + "," + str(compact.objects[ele]) for ele in sorted(compact.objects)]
+  header.append(str(compact.numvoters) + "," + str(compact.weights.sum().item()) + "," + str(len(compact.orders)))
+  file.write("\n".join(header) + "\n")
+
+  # Strict rows are joined from a table of object strings; rows with ties or unranked objects are formatted one by one.
+  order = np.argsort(-compact.weights, kind="stable")
+  names = np.array([str(i) for i in range(compact.orders.max(initial=0) + 1)], dtype=object)
+  simple = ~compact.ties.any(axis=1) & (compact.orders > 0).all(axis=1)
+  for start in range(0, len(order), chunksize):
+    rows = order[start:start+chunksize]
+    tokens = np.empty((len(rows), compact.orders.shape[1] + 1), dtype=object)
+    tokens[:, 0] = [str(w) for w in compact.weights[rows].tolist()]
+    tokens[:, 1:] = names[compact.orders[rows]]
+    lines = list(map(",".join, tokens.tolist()))
+    for i in np.nonzero(~simple[rows])[0].tolist():
+      groups = compact.get_order_groups(rows[i])
+      lines[i] = tokens[i, 0] + "," + ",".join(str(g[0]) if len(g) == 1 else "{" + ",".join(map(str, g)) + "}" for g in groups)
+    file.write("\n".join(lines) + "\n")
+
+# Open a path for writing text, compressed according to the compression
+# argument or the extension of the path.
+def _open_for_write(fname, compression=None):
+  if compression is None:
+    compression = preflib_file_type(fname)[1]
+  if compression is None:
+    return open(fname, "w")
+  return _open_compressed(fname, compression, "wt")
+
 # Given a candmap and a votemap, write the output in
 # Preflib format to the given file.
 def write_map(candmap, nvoters, votemap, file):
@@ -135,6 +429,7 @@ def read_election_file(inputfile):
   """
   INPUT: inputfile, a file-object. 
   Should be open and point to a file in the PrefLib Election Data format, "ED-*.*".
+  It can also be a path, possibly of a compressed file (see open_preflib_file).
   
   OUTPUT:
   * candmap       - dict, maps candidate-id to candidate-name.
@@ -142,6 +437,10 @@ def read_election_file(inputfile):
   * rankmapcounts - list of ints,  each of them represents the frequency of the above rankings.
   * numvoters     - int, total number of voters.
   """
+  if isinstance(inputfile, str):
+    with open_preflib_file(inputfile) as fin:
+      return read_election_file(fin)
+
   #first element is the number of candidates.
   l = inputfile.readline()
   numcands = int(l.strip())
@@ -0,0 +1,291 @@
+#!python3
+"""
+Fitting Mallows models to observed profiles, so that generate_profiles.gen_mallows
+can produce synthetic profiles that look like real ones.
+
+A Mallows model with reference ranking r and parameter phi in [0,1] gives each ranking p
+a probability proportional to phi**d(p,r), where d is the Kendall-tau distance.
+The maximum-likelihood phi (for a given reference) is the one whose expected distance equals
+the observed mean distance. The expected distance has the closed form
+
+	E[D](phi) = m*phi/(1-phi) - sum_{j=1..m} j*phi**j/(1-phi**j),
+
+which increases in phi, so it is inverted by bisection.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import numpy as np
+from preflibtools import consensus, inversions
+
+KEMENY_EXACT_LIMIT = 10   # the exact Kemeny ranking is computed for at most this many alternatives
+
+
+def profileArrays(profile) -> (list, np.ndarray, np.ndarray):
+	"""
+	INPUT: profile - a dict that maps strict rankings (tuples) to weights, or any profile with
+	get_map_from_order_to_weight (e.g. the result of io.read_weighted_preflib_file).
+
+	OUTPUT: (alternatives, ranks, weights): ranks[j,c] is the position of alternatives[c] in the j-th ranking.
+
+	>>> alternatives, ranks, weights = profileArrays({(1,2,3):3, (3,1,2):2})
+	>>> alternatives, ranks.tolist(), weights.tolist()
+	([1, 2, 3], [[0, 1, 2], [1, 2, 0]], [3.0, 2.0])
+	"""
+	if hasattr(profile, "get_map_from_order_to_weight"):
+		profile = profile.get_map_from_order_to_weight()
+	prefs = list(profile.keys())
+	ranks = consensus.rankMatrix(prefs)
+	# Small integers make the distance computations (which are memory-bound) faster.
+	ranks = ranks.astype(np.int8 if ranks.shape[1] <= 127 else np.int16)
+	return list(prefs[0]), ranks, np.array(list(profile.values()), dtype=float)
+
+
+def distances(ranks: np.ndarray, reference) -> np.ndarray:
+	"""
+	Returns the Kendall-tau distance of each ranking from the reference, in one vectorized pass.
+
+	INPUT: ranks - as returned by profileArrays; reference - a list of alternative indices, from best to worst.
+
+	>>> distances(np.array([[0,1,2],[1,2,0],[2,1,0]]), [0,1,2])
+	array([0, 2, 3])
+	"""
+	# Row j lists the positions in ranking j of the reference alternatives; its inversions are the disagreements.
+	return inversions.countInversions(ranks[:, list(reference)])
+
+
+def distanceHistogram(ranks: np.ndarray, weights: np.ndarray, reference) -> np.ndarray:
+	"""
+	Returns the weighted histogram of the Kendall distances from the reference; element d is the total weight at distance d.
+
+	>>> distanceHistogram(np.array([[0,1,2],[1,2,0],[2,1,0]]), np.array([5.,2.,1.]), [0,1,2])
+	array([5., 0., 2., 1.])
+	"""
+	m = ranks.shape[1]
+	return np.bincount(distances(ranks, reference), weights=weights, minlength=m*(m-1)//2+1)
+
+
+def expectedDistance(phi: float, m: int) -> float:
+	"""
+	The expected Kendall distance from the reference of a ranking drawn from a Mallows model.
+
+	>>> expectedDistance(0.0, 4), expectedDistance(1.0, 4)
+	(0.0, 3.0)
+	>>> round(expectedDistance(0.5, 3), 6)   # (0*1 + 1*0.5*2 + 2*0.25*2 + 3*0.125) / (1+0.5)(1+0.5+0.25)
+	0.904762
+	"""
+	if phi <= 0:
+		return 0.0
+	if phi >= 1:
+		return m*(m-1)/4
+	j = np.arange(1, m+1)
+	return float(m*phi/(1-phi) - np.sum(j*phi**j/(1-phi**j)))
+
+
+def fitPhi(meanDistance: float, m: int, tolerance: float=1e-12) -> float:
+	"""
+	Returns the maximum-likelihood phi for the given mean distance from the reference:
+	the root of expectedDistance(phi, m) = meanDistance, found by bisection.
+
+	>>> round(fitPhi(expectedDistance(0.3, 5), 5), 9)
+	0.3
+	>>> fitPhi(0, 5), fitPhi(5, 5)
+	(0.0, 1.0)
+	"""
+	if meanDistance <= 0:
+		return 0.0
+	if meanDistance >= m*(m-1)/4:
+		return 1.0
+	low, high = 0.0, 1.0
+	while high - low > tolerance:
+		middle = (low + high) / 2
+		if expectedDistance(middle, m) < meanDistance:
+			low = middle
+		else:
+			high = middle
+	return (low + high) / 2
+
+
+def logNormalization(phi: float, m: int) -> float:
+	"""
+	The log of the normalization constant of a Mallows model: prod_{i=1..m} (1+phi+...+phi**(i-1)).
+	"""
+	return float(sum(np.log(np.sum(phi ** np.arange(i))) for i in range(1, m+1)))
+
+
+def bordaReference(ranks: np.ndarray, weights: np.ndarray) -> list:
+	"""
+	Returns the alternative indices sorted by their weighted mean position (the Borda ranking).
+
+	>>> bordaReference(np.array([[0,1,2],[1,2,0],[1,0,2]]), np.array([3.,2.,2.]))
+	[0, 1, 2]
+	"""
+	return np.argsort(weights @ ranks, kind="stable").tolist()
+
+
+def kemenyReference(ranks: np.ndarray, weights: np.ndarray) -> list:
+	"""
+	Returns a ranking of the alternative indices with a minimum total weighted Kendall distance from the profile.
+	It is exact (by dynamic programming over subsets) for at most KEMENY_EXACT_LIMIT alternatives;
+	for more alternatives, it is a local optimum, found by moving single alternatives starting from the Borda ranking.
+
+	>>> kemenyReference(np.array([[0,1,2],[1,2,0],[2,0,1]]), np.array([3.,2.,2.]))
+	[0, 1, 2]
+	"""
+	m = ranks.shape[1]
+	# pairwise[c,d] = the total weight of the rankings that put c above d.
+	pairwise = np.zeros((m, m))
+	for c in range(m):
+		pairwise[c] = weights @ (ranks[:, c, None] < ranks)
+	if m <= KEMENY_EXACT_LIMIT:
+		return _exactKemeny(pairwise)
+	return _localKemeny(pairwise, bordaReference(ranks, weights))
+
+
+def _exactKemeny(pairwise: np.ndarray) -> list:
+	# best[S] = the maximum agreement of an order whose top |S| alternatives are the set S (a bitmask).
+	m = len(pairwise)
+	above = np.zeros((1 << m, m))   # above[S,c] = total weight of c above the alternatives of S
+	for b in range(m):
+		above[1 << b: 1 << (b+1)] = above[:1 << b] + pairwise[:, b]
+	gains = pairwise.sum(axis=1) - above   # gains[S,c] = agreement gained by putting c right after S
+	best = np.full(1 << m, -np.inf)
+	best[0] = 0
+	choice = np.zeros(1 << m, dtype=np.int64)
+	for S in range(1, 1 << m):
+		members = [c for c in range(m) if S >> c & 1]
+		values = [best[S ^ (1 << c)] + gains[S ^ (1 << c), c] for c in members]
+		i = int(np.argmax(values))
+		best[S], choice[S] = values[i], members[i]
+	order = []
+	S = (1 << m) - 1
+	while S:
+		order.append(int(choice[S]))
+		S ^= 1 << order[-1]
+	return order[::-1]
+
+
+def _localKemeny(pairwise: np.ndarray, order: list) -> list:
+	# Move one alternative at a time to the position that increases the agreement most, until no move helps.
+	m = len(order)
+	improved = True
+	while improved:
+		improved = False
+		for i in range(m):
+			c = order[i]
+			rest = order[:i] + order[i+1:]
+			# agreement of c at position t, relative to position 0: sum over the alternatives above c of (P[d,c]-P[c,d]).
+			delta = np.concatenate(([0.0], np.cumsum(pairwise[rest, c] - pairwise[c, rest])))
+			t = int(np.argmax(delta))
+			if delta[t] > delta[i] + 1e-9:
+				order = rest[:t] + [c] + rest[t:]
+				improved = True
+	return order
+
+
+def referenceRanking(ranks: np.ndarray, weights: np.ndarray, method: str="kemeny") -> list:
+	if method == "kemeny":
+		return kemenyReference(ranks, weights)
+	if method == "borda":
+		return bordaReference(ranks, weights)
+	raise ValueError("method should be 'kemeny' or 'borda', not "+str(method))
+
+
+def fitMallows(profile, method: str="kemeny") -> (list, float):
+	"""
+	Estimates a single Mallows model.
+
+	INPUT:
+	profile - strict rankings with weights (see profileArrays).
+	method  - "kemeny" or "borda": how to find the reference ranking.
+
+	OUTPUT: a tuple (reference, phi); reference is a list of alternatives, from best to worst.
+
+	>>> from preflibtools import generate_profiles
+	>>> np.random.seed(1)
+	>>> voteset = generate_profiles.gen_mallows_voteset(100000, [1,2,3,4,5], [1.0], [0.4], [[3,1,5,2,4]])
+	>>> reference, phi = fitMallows(voteset)
+	>>> reference, round(phi, 2)
+	([3, 1, 5, 2, 4], 0.4)
+	"""
+	alternatives, ranks, weights = profileArrays(profile)
+	reference = referenceRanking(ranks, weights, method)
+	histogram = distanceHistogram(ranks, weights, reference)
+	phi = fitPhi(histogram @ np.arange(len(histogram)) / histogram.sum(), len(alternatives))
+	return [alternatives[c] for c in reference], phi
+
+
+def fitMallowsMixture(profile, numComponents: int, method: str="borda", iterations: int=100, tolerance: float=1e-6) -> (list, list, list):
+	"""
+	Estimates a mixture of Mallows models with the EM algorithm.
+
+	INPUT:
+	profile       - strict rankings with weights (see profileArrays).
+	numComponents - int, number of Mallows models in the mixture.
+	method        - "kemeny" or "borda": how to find the reference ranking of each component in the M-step.
+	iterations    - int, maximum number of EM iterations.
+	tolerance     - float, EM stops when the log-likelihood per voter improves by less than this.
+
+	OUTPUT: a tuple (mix, phis, refs), in the format of generate_profiles.gen_mallows.
+	The components are initialized at the most frequent rankings, so the profile must have at least numComponents distinct rankings.
+
+	>>> from preflibtools import generate_profiles
+	>>> np.random.seed(2)
+	>>> voteset = generate_profiles.gen_mallows_voteset(100000, [1,2,3,4,5], [0.7,0.3], [0.3,0.2], [[1,2,3,4,5],[5,4,3,2,1]])
+	>>> mix, phis, refs = fitMallowsMixture(voteset, 2)
+	>>> [round(x, 2) for x in mix], [round(x, 2) for x in phis], refs
+	([0.7, 0.3], [0.3, 0.2], [[1, 2, 3, 4, 5], [5, 4, 3, 2, 1]])
+	>>> fitMallowsMixture({(1,2,3):3, (3,2,1):2}, 3)
+	Traceback (most recent call last):
+	...
+	ValueError: cannot fit 3 components to a profile with 2 distinct rankings
+	>>> fitMallowsMixture({(1,2,3):3, (3,2,1):2}, 0)
+	Traceback (most recent call last):
+	...
+	ValueError: numComponents should be at least 1, not 0
+	"""
+	if numComponents < 1:
+		raise ValueError("numComponents should be at least 1, not "+str(numComponents))
+	alternatives, ranks, weights = profileArrays(profile)
+	numRankings = np.count_nonzero(weights)
+	if numComponents > numRankings:
+		raise ValueError("cannot fit "+str(numComponents)+" components to a profile with "+str(numRankings)+" distinct rankings")
+	m = ranks.shape[1]
+	total = weights.sum()
+	# Initialize at the most frequent rankings:
+	top = np.argsort(-weights, kind="stable")[:numComponents]
+	refs = [np.argsort(ranks[j]).tolist() for j in top]
+	phis = [0.5] * len(refs)
+	mix = np.full(len(refs), 1.0/len(refs))
+	dists = [distances(ranks, ref) for ref in refs]
+	previous = -np.inf
+	for iteration in range(iterations):
+		# E-step: responsibilities, computed in the log domain.
+		with np.errstate(divide="ignore"):
+			logLikelihoods = np.stack([
+				np.log(mix[k]) + dists[k] * np.log(max(phis[k], 1e-300)) - logNormalization(phis[k], m)
+				for k in range(len(refs))], axis=1)
+		maxima = logLikelihoods.max(axis=1, keepdims=True)
+		logTotals = maxima[:,0] + np.log(np.exp(logLikelihoods - maxima).sum(axis=1))
+		responsibilities = np.exp(logLikelihoods - logTotals[:,None]) * weights[:,None]
+		current = float(weights @ logTotals) / total
+		if current - previous < tolerance:
+			break
+		previous = current
+		# M-step: each component is fitted to the rankings, weighted by their responsibilities.
+		mix = responsibilities.sum(axis=0) / total
+		for k in range(len(refs)):
+			if mix[k] == 0:
+				continue
+			refs[k] = referenceRanking(ranks, responsibilities[:,k], method)
+			dists[k] = distances(ranks, refs[k])
+			histogram = np.bincount(dists[k], weights=responsibilities[:,k], minlength=m*(m-1)//2+1)
+			phis[k] = fitPhi(histogram @ np.arange(len(histogram)) / histogram.sum(), m)
+	return mix.tolist(), phis, [[alternatives[c] for c in ref] for ref in refs]
+
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
+	print("Doctest OK!\n")
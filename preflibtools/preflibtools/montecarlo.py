@@ -0,0 +1,130 @@
+#!python3
+"""
+Sequential Monte Carlo estimation of probabilities: samples are drawn in blocks,
+until the confidence interval of every estimated probability is narrower than a requested width
+(or a maximum number of samples is reached).
+
+This lets an experiment sweep spend few samples where the probability is near 0 or 1,
+and more where it is near 1/2.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import math
+from statistics import NormalDist
+import numpy as np
+
+
+def wilsonInterval(successes: int, trials: int, confidence: float=0.95) -> (float, float):
+	"""
+	The Wilson score interval for a binomial proportion.
+
+	>>> [round(x, 4) for x in wilsonInterval(50, 100)]
+	[0.4038, 0.5962]
+	>>> [round(x, 4) for x in wilsonInterval(0, 100)]
+	[0.0, 0.037]
+	>>> wilsonInterval(0, 0)
+	(0.0, 1.0)
+	"""
+	if trials == 0:
+		return (0.0, 1.0)
+	z = NormalDist().inv_cdf((1+confidence)/2)
+	p = successes / trials
+	denominator = 1 + z*z/trials
+	center = (p + z*z/(2*trials)) / denominator
+	halfWidth = z * math.sqrt(p*(1-p)/trials + z*z/(4*trials*trials)) / denominator
+	return (max(0.0, center-halfWidth), min(1.0, center+halfWidth))
+
+
+def _binomialTail(successes: int, trials: int, p: float) -> float:
+	# P[X >= successes] for X ~ Binomial(trials, p), summed in log space.
+	if p <= 0: return float(successes <= 0)
+	if p >= 1: return 1.0
+	k = np.arange(successes, trials+1)
+	logFactorials = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, trials+1)))))
+	logChoose = logFactorials[trials] - logFactorials[k] - logFactorials[trials-k]
+	return float(np.exp(logChoose + k*math.log(p) + (trials-k)*math.log1p(-p)).sum())
+
+
+def clopperPearsonInterval(successes: int, trials: int, confidence: float=0.95, tolerance: float=1e-10) -> (float, float):
+	"""
+	The Clopper-Pearson ("exact") interval for a binomial proportion, found by bisection on the binomial tails.
+
+	>>> [round(x, 4) for x in clopperPearsonInterval(50, 100)]
+	[0.3983, 0.6017]
+	>>> [round(x, 4) for x in clopperPearsonInterval(0, 100)]
+	[0.0, 0.0362]
+	>>> [round(x, 4) for x in clopperPearsonInterval(100, 100)]
+	[0.9638, 1.0]
+	"""
+	if trials == 0:
+		return (0.0, 1.0)
+	alpha = 1 - confidence
+
+	def bisect(function, target):
+		# function is increasing in p; returns the p where it crosses target.
+		low, high = 0.0, 1.0
+		while high - low > tolerance:
+			middle = (low+high)/2
+			if function(middle) < target: low = middle
+			else: high = middle
+		return (low+high)/2
+
+	low = 0.0 if successes == 0 else bisect(lambda p: _binomialTail(successes, trials, p), alpha/2)
+	high = 1.0 if successes == trials else bisect(lambda p: _binomialTail(successes+1, trials, p), 1-alpha/2)
+	return (low, high)
+
+
+INTERVALS = {"wilson": wilsonInterval, "clopper-pearson": clopperPearsonInterval}
+
+
+def estimateProbabilities(sampleBlock, width: float, blockSize: int=100, maxSamples: int=100000,
+		confidence: float=0.95, interval: str="wilson") -> dict:
+	"""
+	Estimates the probabilities of several events on the same random samples, drawing them in blocks
+	until the confidence interval of each probability is at most the given width, or maxSamples samples were drawn.
+
+	INPUT:
+	sampleBlock - a function that takes a number of samples, draws them, and returns a dict that maps
+	              each event name to a boolean array (or the number of samples in which the event happened).
+	width       - float, the requested width (high - low) of each confidence interval.
+	blockSize   - int, the number of samples drawn between checks.
+	maxSamples  - int, a hard cap on the number of samples.
+	confidence  - float, the confidence level of the intervals.
+	interval    - a name in INTERVALS.
+
+	OUTPUT: dict with "samples" (the number of samples drawn), and for each event a dict with
+	"successes", "estimate", "low" and "high".
+
+	>>> np.random.seed(0)
+	>>> result = estimateProbabilities(lambda n: {"rare": np.random.random(n) < 0.001, "even": np.random.random(n) < 0.5}, width=0.1)
+	>>> result["samples"], result["rare"]["high"] - result["rare"]["low"] <= 0.1, result["even"]["high"] - result["even"]["low"] <= 0.1
+	(400, True, True)
+	>>> estimateProbabilities(lambda n: {"rare": np.zeros(n, dtype=bool)}, width=0.1)["samples"]
+	100
+	>>> estimateProbabilities(lambda n: {"even": np.arange(n) % 2 == 0}, width=0.01, maxSamples=300)["samples"]
+	300
+	"""
+	intervalFunction = INTERVALS[interval]
+	samples = 0
+	successes = {}
+	while True:
+		size = min(blockSize, maxSamples - samples)
+		for name, outcomes in sampleBlock(size).items():
+			successes[name] = successes.get(name, 0) + int(np.sum(outcomes))
+		samples += size
+		bounds = {name: intervalFunction(count, samples, confidence) for name, count in successes.items()}
+		if samples >= maxSamples or all(high-low <= width for low,high in bounds.values()):
+			break
+	result = {"samples": samples}
+	for name, count in successes.items():
+		low, high = bounds[name]
+		result[name] = {"successes": count, "estimate": count/samples, "low": low, "high": high}
+	return result
+
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
+	print("Doctest OK!\n")
@@ -0,0 +1,162 @@
+#!python3
+"""
+Precomputed tables over the space of all rankings of a small number of alternatives.
+
+For m <= 7 alternatives, every strict profile is a count vector over at most 7! = 5040 rankings,
+so distances, consensus and single-peakedness can be computed by table lookups.
+The r-th ranking is the r-th element of itertools.permutations(range(m)),
+which is also the order of the Lehmer code (factorial number system).
+
+The tables are built lazily, one at a time, and saved as .npy files in a cache directory
+(the environment variable PREFLIBTOOLS_CACHE, or ~/.cache/preflibtools).
+Later calls, in the same process or in other processes, memory-map the files instead of rebuilding them.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import numpy as np
+import functools, itertools, os, tempfile
+
+MAX_ALTERNATIVES = 7
+
+def cacheDirectory() -> str:
+	"""
+	Returns the directory in which the tables are saved.
+	"""
+	return os.environ.get("PREFLIBTOOLS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "preflibtools"))
+
+
+class PermutationTables:
+	"""
+	Lazily-built tables for the rankings of m alternatives. Each attribute is built (or memory-mapped) on first access.
+	All arrays are read-only.
+
+	Data
+	-----------
+	permutations: int8 array of shape (m!, m). Row r is the r-th ranking (alternative indices from best to worst).
+	radixIndex:   int16 array of shape (m**m,). Maps the base-m number of a ranking to its index; see indexOf.
+	kendall:      int8 array of shape (m!, m!). The Kendall-tau (inversion) distance between every two rankings.
+	mahonian:     int64 array of shape (m(m-1)/2+1,). Element k is the number of rankings at distance k from any ranking.
+	              The Kendall distance is invariant to relabeling, so the distance histogram is the same Mahonian row for every ranking.
+	axes:         int16 array of shape (m!/2,). The indices of the potential single-peaked axes: one of each pair of reversed rankings.
+	singlePeaked: uint8 array of shape (m!, ceil(m!/16)). Bit j of row r (in np.packbits order) is 1 iff
+	              ranking r is single-peaked with respect to the axis permutations[axes[j]].
+	-----------
+
+	>>> t = PermutationTables(3)
+	>>> t.permutations.tolist()
+	[[0, 1, 2], [0, 2, 1], [1, 0, 2], [1, 2, 0], [2, 0, 1], [2, 1, 0]]
+	>>> t.indexOf([[2,1,0],[1,0,2]])
+	array([5, 2])
+	>>> t.kendall[0].tolist()
+	[0, 1, 1, 2, 2, 3]
+	>>> t.mahonian.tolist()
+	[1, 2, 2, 1]
+	>>> t.permutations[t.axes].tolist()
+	[[0, 1, 2], [0, 2, 1], [1, 0, 2]]
+	>>> compatible = np.unpackbits(t.singlePeaked, axis=1, count=len(t.axes))
+	>>> compatible[:,0].tolist()   # the rankings that are single-peaked on the axis 0,1,2 are 012, 102, 120, 210.
+	[1, 0, 1, 1, 0, 1]
+	"""
+	TABLES = ("permutations", "radixIndex", "kendall", "mahonian", "axes", "singlePeaked")
+
+	def __init__(self, numOfAlternatives: int, directory: str=None):
+		if not 1 <= numOfAlternatives <= MAX_ALTERNATIVES:
+			raise ValueError("Permutation tables are available for 1 to "+str(MAX_ALTERNATIVES)+" alternatives, not "+str(numOfAlternatives))
+		self.numOfAlternatives = numOfAlternatives
+		self.directory = os.path.join(directory or cacheDirectory(), "m"+str(numOfAlternatives))
+
+	def __getattr__(self, name: str):
+		# Called only for attributes that were not loaded yet.
+		if name not in PermutationTables.TABLES:
+			raise AttributeError(name)
+		table = self._load(name)
+		setattr(self, name, table)
+		return table
+
+	def indexOf(self, rankings) -> np.ndarray:
+		"""
+		INPUT: rankings - int array whose last axis has length m; each row is a ranking of the alternative indices.
+		OUTPUT: int array with the index of each ranking in self.permutations.
+		"""
+		rankings = np.asarray(rankings)
+		powers = self.numOfAlternatives ** np.arange(self.numOfAlternatives-1, -1, -1)
+		return self.radixIndex[rankings @ powers].astype(np.int64)
+
+	def _load(self, name: str) -> np.ndarray:
+		path = os.path.join(self.directory, name+".npy")
+		try:
+			return np.load(path, mmap_mode="r")
+		except (OSError, ValueError):  # missing or partially-written file
+			pass
+		table = getattr(self, "_build_"+name)()
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+			# Write to a temporary file and rename, so that concurrent processes never see a partial file.
+			fd, tmpPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+			with os.fdopen(fd, "wb") as tmpFile:
+				np.save(tmpFile, table)
+			os.replace(tmpPath, path)
+			return np.load(path, mmap_mode="r")
+		except OSError:  # read-only cache directory: keep the table in memory.
+			table.setflags(write=False)
+			return table
+
+	def _build_permutations(self) -> np.ndarray:
+		return np.array(list(itertools.permutations(range(self.numOfAlternatives))), dtype=np.int8).reshape(-1, self.numOfAlternatives)
+
+	def _build_radixIndex(self) -> np.ndarray:
+		m = self.numOfAlternatives
+		radixIndex = np.full(m**m, -1, dtype=np.int16)
+		radixIndex[self.permutations.astype(np.int64) @ (m ** np.arange(m-1, -1, -1))] = np.arange(len(self.permutations))
+		return radixIndex
+
+	def _build_kendall(self) -> np.ndarray:
+		ranks = np.argsort(self.permutations, axis=1)   # ranks[r,c] = position of alternative c in ranking r
+		kendall = np.zeros((len(ranks), len(ranks)), dtype=np.int8)
+		for c, d in itertools.combinations(range(self.numOfAlternatives), 2):
+			cBeforeD = ranks[:,c] < ranks[:,d]
+			kendall += cBeforeD[:,None] != cBeforeD[None,:]
+		return kendall
+
+	def _build_mahonian(self) -> np.ndarray:
+		from preflibtools import inversions
+		return np.array(inversions.mahonianRow(self.numOfAlternatives))
+
+	def _build_axes(self) -> np.ndarray:
+		return np.nonzero(self.permutations[:,0] <= self.permutations[:,-1])[0].astype(np.int16)
+
+	def _build_singlePeaked(self) -> np.ndarray:
+		# A ranking is single-peaked w.r.t. an axis iff each of its prefixes is an interval of the axis.
+		m = self.numOfAlternatives
+		axisPositions = np.argsort(self.permutations[self.axes], axis=1)   # [j,c] = position of alternative c on axis j
+		compatible = np.empty((len(self.permutations), len(self.axes)), dtype=bool)
+		chunk = max(1, 2**22 // (len(self.permutations)*m))
+		for start in range(0, len(self.axes), chunk):
+			positions = axisPositions[start:start+chunk][:, self.permutations]   # [j,r,t] = position on axis j of the t-th alternative of ranking r
+			spans = np.maximum.accumulate(positions, axis=2) - np.minimum.accumulate(positions, axis=2)
+			compatible[:, start:start+chunk] = np.all(spans == np.arange(m), axis=2).T
+		return np.packbits(compatible, axis=1)
+
+
+@functools.lru_cache(maxsize=None)
+def getTables(numOfAlternatives: int) -> PermutationTables:
+	"""
+	Returns the (process-wide shared) tables for rankings of the given number of alternatives.
+	"""
+	return PermutationTables(numOfAlternatives)
+
+
+if __name__ == "__main__":
+	import doctest, time
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	# Build (or check) the tables for all supported sizes, e.g. before starting many worker processes:
+	for m in range(1, MAX_ALTERNATIVES+1):
+		start = time.time()
+		tables = getTables(m)
+		for name in PermutationTables.TABLES:
+			getattr(tables, name)
+		print("m={}: {} rankings, tables in {} ({:.2f} seconds)".format(m, len(tables.permutations), tables.directory, time.time()-start))
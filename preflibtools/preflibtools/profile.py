@@ -46,6 +46,8 @@ allow for more flexiable control.
 
 '''
 
+import numpy as np
+
 class WeightedPreferenceOrder:
   '''
   Weighted Pref Order object which holds a weight, a mapping from
@@ -212,6 +214,124 @@ class WeightedOrderProfile:
       o += "{:^10}".format(str(k)) + "|" + "{:^9}".format(str(v.weight)) + "|" + "{:^30}".format(v.get_order_string()) + "|" + "{:^30}".format(v.get_utilities_string()) + "\n"
     return o
 
+class CompactOrderProfile:
+  '''
+  A profile stored in numpy arrays, with one row per distinct order.
+  This takes much less memory than a WeightedOrderProfile, and is cheap to
+  pickle, cache on disk, or hand to vectorized code.
+
+  Data
+  -----------
+  objects: dict
+    A mapping of object index (int) --> name.
+
+  orders: int array of shape (k, m)
+    orders[j] lists the objects of the j-th order from best to worst.
+    Unranked positions at the end of a partial order are 0.
+
+  weights: array of shape (k,)
+    The weight (number of voters) of each order.
+
+  ties: bool array of shape (k, m)
+    ties[j,i] is True iff orders[j,i] is tied with orders[j,i-1]; these are the tie boundaries.
+
+  numvoters: int
+    The number of voters, as given in the file header.
+  -----------
+
+  >>> p = CompactOrderProfile({1: "a", 2: "b", 3: "c"}, orders=[[1,2,3],[2,1,3],[3,1,2]], weights=[5,2,1])
+  >>> p.get_map_from_order_to_weight()
+  {(1, 2, 3): 5, (2, 1, 3): 2, (3, 1, 2): 1}
+  >>> p.num_of_alternatives(), p.numvoters, p.is_strict()
+  (3, 8, True)
+  >>> q = CompactOrderProfile({1: "a", 2: "b", 3: "c", 4: "d"}, orders=[[1,4,3,2],[2,3,0,0]], weights=[12,3], ties=[[False,True,False,False],[False,False,False,False]])
+  >>> q.get_map_from_order_to_weight()
+  {((1, 4), 3, 2): 12, (2, 3): 3}
+  >>> q.get_order_strings()
+  ['{1,4},3,2', '2,3']
+  >>> q.is_strict()
+  False
+  '''
+  def __init__(self, objects={}, orders=None, weights=None, ties=None, numvoters=None):
+    self.objects = objects
+    self.orders = np.asarray(orders if orders is not None else np.zeros((0, len(objects))), dtype=np.int32)
+    self.weights = np.asarray(weights if weights is not None else np.ones(len(self.orders), dtype=np.int64))
+    self.ties = np.asarray(ties, dtype=bool) if ties is not None else np.zeros(self.orders.shape, dtype=bool)
+    self.numvoters = numvoters if numvoters is not None else self.weights.sum().item()
+
+  @staticmethod
+  def from_map(objects, order_to_weight, numvoters=None):
+    '''
+    Build a CompactOrderProfile with one row per key of a dict that maps orders
+    (tuples, as returned by get_map_from_order_to_weight) to weights.
+
+    >>> p = CompactOrderProfile.from_map({1: "a", 2: "b", 3: "c"}, {((1, 3), 2): 4, (2,): 1})
+    >>> p.get_order_strings(), p.weights.tolist(), p.numvoters
+    (['{1,3},2', '2'], [4, 1], 5)
+    '''
+    m = len(objects)
+    orders = np.zeros((len(order_to_weight), m), dtype=np.int32)
+    ties = np.zeros((len(order_to_weight), m), dtype=bool)
+    for j, order in enumerate(order_to_weight):
+      i = 0
+      for group in order:
+        group = tuple(group) if isinstance(group, (tuple, list)) else (group,)
+        orders[j, i:i+len(group)] = group
+        ties[j, i+1:i+len(group)] = True
+        i += len(group)
+    weights = np.array(list(order_to_weight.values())) if order_to_weight else np.zeros(0, dtype=np.int64)
+    return CompactOrderProfile(objects, orders, weights, ties, numvoters)
+
+  def num_of_alternatives(self):
+    return self.orders.shape[1]
+
+  def is_strict(self):
+    # True iff all orders are complete and without ties.
+    return not self.ties.any() and bool((self.orders > 0).all())
+
+  def get_order_groups(self, j):
+    # Return the j-th order as a list of tuples of tied objects.
+    groups = []
+    for obj, tied in zip(self.orders[j].tolist(), self.ties[j].tolist()):
+      if obj == 0:
+        break
+      if tied:
+        groups[-1] += (obj,)
+      else:
+        groups.append((obj,))
+    return groups
+
+  def get_order_tuple(self, j):
+    # Like WeightedPreferenceOrder.get_order_tuple, but tied objects are grouped in (hashable) tuples.
+    return tuple(g[0] if len(g) == 1 else g for g in self.get_order_groups(j))
+
+  def get_order_strings(self):
+    # Return the orders in PrefLib format.
+    return [",".join(str(g[0]) if len(g) == 1 else "{" + ",".join(map(str, g)) + "}" for g in self.get_order_groups(j)) for j in range(len(self.orders))]
+
+  def get_map_from_order_to_weight(self) -> dict:
+    '''
+    Returns a dict that maps each order (a tuple) to its weight (number of agents with that order).
+    '''
+    weights = {}
+    for j, weight in enumerate(self.weights.tolist()):
+      order = self.get_order_tuple(j)
+      weights[order] = weights.get(order, 0) + weight
+    return weights
+
+  def __repr__(self):
+    o = "{:-^79}".format("") + "\n"
+    o += "{:^10}".format("ID") + "|" + "{:^30}".format('Objects') + "\n"
+    o += "{:-^79}".format("") + "\n"
+    for k,v in sorted(self.objects.items()):
+      o +="{:^10}".format(str(k)) + "|" + "{:^30}".format(str(v)) + "\n"
+    o += "{:-^79}".format("")
+    o += "\n" + "{:^9}".format("Weight") + "|" + "{:^30}".format('Order') + "\n"
+    o += "{:-^79}".format("") + "\n"
+    for weight, order in zip(self.weights.tolist(), self.get_order_strings()):
+      o += "{:^9}".format(str(weight)) + "|" + "{:^30}".format(order) + "\n"
+    return o
+
 if __name__ == "__main__":
   import doctest
   doctest.testmod()
@@ -0,0 +1,162 @@
+#!python3
+"""
+A persistent on-disk store of per-profile analysis results, so that experiments
+can be re-run (e.g. after changing a plot) without re-analysing every profile.
+
+Results are kept in a local SQLite database, keyed by a content hash of the profile
+and by the name and version of the analysis (e.g. "level1-strict", "1").
+Bump the version of an analysis whenever its code changes, so that old results are not reused.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import hashlib, json, sqlite3, time
+
+def profileHash(profile: dict) -> str:
+	"""
+		Returns a content hash of a weighted profile: the same rankings with the same weights
+		give the same hash, regardless of the order of the dict.
+
+		>>> profileHash({(1,2,3):3, (2,1,3):2}) == profileHash({(2,1,3):2, (1,2,3):3})
+		True
+		>>> profileHash({(1,2,3):3, (2,1,3):2}) == profileHash({(1,2,3):2, (2,1,3):3})
+		False
+
+		Numpy scalars (e.g. from a CompactOrderProfile or a count vector) hash like the equal Python numbers:
+
+		>>> import numpy as np
+		>>> profileHash({(1,2,3):3}) == profileHash({(np.int32(1),2,3):np.int64(3)}) == profileHash({(1,2,3):3.0})
+		True
+
+		Orders with tie-groups, as in .toc and .toi files, are hashed too:
+
+		>>> profileHash({(1,(2,3)):1, ((1,2),3):1}) == profileHash({((1,2),3):1, (1,(2,3)):1})
+		True
+	"""
+	# Sorted by repr, since the orders of weak profiles mix alternatives and tie-groups, which are not comparable.
+	return hashlib.sha1(repr(sorted(((_plain(order), _plain(weight)) for order, weight in profile.items()), key=repr)).encode("utf-8")).hexdigest()
+
+def _plain(value):
+	# Converts numpy scalars to Python numbers (integral floats to ints), recursively inside tuples, so that their repr is canonical.
+	if isinstance(value, (tuple, list)):
+		return tuple(_plain(x) for x in value)
+	if hasattr(value, "item"):
+		value = value.item()
+	if isinstance(value, float) and value.is_integer():
+		return int(value)
+	return value
+
+
+class ResultStore:
+	"""
+	Results of analyses on profiles, stored in an SQLite database file.
+
+	A key is a tuple (profileHash, analysis, version); a value is anything that can be saved as JSON
+	(tuples are returned as lists). None is a valid value, e.g. for "there is no consensus".
+
+	Eviction: entries that were not accessed for more than maxAge seconds are removed, and then,
+	if there are more than maxEntries entries, the least-recently-accessed ones are removed.
+	Eviction runs when the store is opened and after each putMany.
+
+	>>> import tempfile, os
+	>>> store = ResultStore(os.path.join(tempfile.mkdtemp(), "results.sqlite"), maxEntries=2)
+	>>> h1, h2, h3 = profileHash({(1,2):1}), profileHash({(2,1):1}), profileHash({(1,2):1, (2,1):1})
+	>>> store.putMany([((h1,"level1-strict","1"), [1,2]), ((h2,"level1-strict","1"), None)])
+	>>> found = store.getMany([(h1,"level1-strict","1"), (h2,"level1-strict","1"), (h1,"level1-strict","2")])
+	>>> found[(h1,"level1-strict","1")], found[(h2,"level1-strict","1")], (h1,"level1-strict","2") in found
+	([1, 2], None, False)
+	>>> store.getOrCompute([{(1,2):1, (2,1):1}, {(1,2):1}], "level1-strict", "1", lambda profile: len(profile))
+	[2, [1, 2]]
+	>>> len(store)   # only the 2 most recently accessed entries are kept
+	2
+	>>> store.close()
+	"""
+	BATCH = 500   # number of keys per SELECT statement
+
+	def __init__(self, path: str, maxEntries: int=None, maxAge: float=None):
+		self.path = path
+		self.maxEntries = maxEntries
+		self.maxAge = maxAge
+		self.connection = sqlite3.connect(path)
+		self.connection.execute("PRAGMA journal_mode=WAL")   # allow readers in other processes while writing
+		self.connection.execute("""CREATE TABLE IF NOT EXISTS results (
+			profile TEXT, analysis TEXT, version TEXT, value TEXT, accessed REAL,
+			PRIMARY KEY (profile, analysis, version))""")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+		self.evict()
+
+	def getMany(self, keys: list) -> dict:
+		"""
+		Returns a dict with the stored values of the given keys; keys that are not in the store are omitted.
+		"""
+		keysByAnalysis = {}
+		for profile,analysis,version in keys:
+			keysByAnalysis.setdefault((analysis,version), []).append(profile)
+		found = {}
+		now = time.time()
+		with self.connection:
+			for (analysis,version),profiles in keysByAnalysis.items():
+				for start in range(0, len(profiles), ResultStore.BATCH):
+					batch = profiles[start:start+ResultStore.BATCH]
+					placeholders = ",".join("?"*len(batch))
+					for profile,value in self.connection.execute(
+						"SELECT profile, value FROM results WHERE analysis=? AND version=? AND profile IN ("+placeholders+")",
+						[analysis,version]+batch):
+						found[(profile,analysis,version)] = json.loads(value)
+			self.connection.executemany(
+				"UPDATE results SET accessed=? WHERE profile=? AND analysis=? AND version=?",
+				[(now,)+key for key in found])
+		return found
+
+	def putMany(self, items: list):
+		"""
+		Stores the given (key, value) pairs, replacing existing values.
+		"""
+		now = time.time()
+		with self.connection:
+			self.connection.executemany(
+				"INSERT OR REPLACE INTO results (profile, analysis, version, value, accessed) VALUES (?,?,?,?,?)",
+				[tuple(key)+(json.dumps(value), now) for key,value in items])
+		self.evict()
+
+	def getOrCompute(self, profiles: list, analysis: str, version: str, function) -> list:
+		"""
+		Returns [function(profile) for profile in profiles], computing only the results that are not stored yet,
+		and storing them with one batched insert.
+		"""
+		keys = [(profileHash(profile), analysis, version) for profile in profiles]
+		found = self.getMany(set(keys))
+		computed = {}
+		for key,profile in zip(keys, profiles):
+			if key not in found and key not in computed:
+				computed[key] = function(profile)
+		self.putMany(computed.items())
+		# Return the values as they come back from the store (e.g. tuples as lists), so reruns give the same results.
+		return [json.loads(json.dumps(computed[key])) if key in computed else found[key] for key in keys]
+
+	def evict(self):
+		with self.connection:
+			if self.maxAge is not None:
+				self.connection.execute("DELETE FROM results WHERE accessed < ?", (time.time()-self.maxAge,))
+			if self.maxEntries is not None:
+				self.connection.execute("""DELETE FROM results WHERE rowid IN
+					(SELECT rowid FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)""", (self.maxEntries,))
+
+	def __len__(self):
+		return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+	def close(self):
+		self.connection.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
+	print("Doctest OK!\n")
@@ -0,0 +1,221 @@
+#!python3
+"""
+Publishing a CompactOrderProfile in shared memory, so that multiprocessing workers can analyze it without pickling.
+
+The owner process copies the arrays of the profile (orders, weights, ties), and optionally its pairwise and position matrices
+(winners.pairwiseMatrix, winners.positionMatrix), into multiprocessing.shared_memory segments.
+Workers receive a small picklable SharedProfileHandle, and attach to the segments as numpy arrays, without copying them.
+Each worker process attaches to a profile once, and reuses the attachment for all its tasks.
+
+The owner unlinks the segments when it is closed (explicitly, at the end of a with block, when it is garbage-collected,
+or at interpreter exit), so the segments are not leaked. Workers only close their mappings.
+Handles are meant for processes started by multiprocessing from the owner process: they share its resource tracker,
+which also unlinks the segments if the owner is killed.
+
+	with SharedProfile(profile) as shared:
+		results = parallelMap(analysis, shared, tasks)   # analysis(view, task) runs in the workers
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import os, weakref
+from multiprocessing import Pool, shared_memory
+import numpy as np
+from preflibtools import winners
+from preflibtools.profile import CompactOrderProfile
+
+
+class SharedProfileHandle:
+	"""
+	A picklable description of a shared profile: its objects, its number of voters,
+	and the name, shape and dtype of the shared segment of each array.
+	"""
+
+	def __init__(self, objects: dict, numvoters: int, arrays: dict):
+		self.objects = objects
+		self.numvoters = numvoters
+		self.arrays = arrays   # maps an array name to a tuple (segment name, shape, dtype string)
+
+	def attach(self) -> 'SharedProfileView':
+		"""
+		Returns a view of the shared profile in this process. The view is cached, so repeated calls (e.g. one per task) are cheap.
+		"""
+		key = tuple(segment for segment, _, _ in self.arrays.values())
+		if key not in _attached:
+			_attached[key] = SharedProfileView(self)
+		return _attached[key]
+
+	def detach(self):
+		"""
+		Drops the cached view of this process, and closes its mappings.
+		"""
+		view = _attached.pop(tuple(segment for segment, _, _ in self.arrays.values()), None)
+		if view is not None:
+			view.close()
+
+# The views attached by this process, keyed by their segment names.
+_attached = {}
+
+
+class SharedProfileView:
+	"""
+	Zero-copy access to a shared profile:
+	* profile - a CompactOrderProfile whose orders, weights and ties are read-only arrays in shared memory.
+	* pairwise, positions - the shared (read-only) matrices, or None if they were not published.
+	"""
+
+	def __init__(self, handle: SharedProfileHandle):
+		self.handle = handle
+		self._segments = []
+		arrays = {}
+		for name, (segment, shape, dtype) in handle.arrays.items():
+			memory = shared_memory.SharedMemory(name=segment)
+			self._segments.append(memory)
+			arrays[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+			arrays[name].flags.writeable = False
+		self._setArrays(handle, arrays)
+
+	def _setArrays(self, handle: SharedProfileHandle, arrays: dict):
+		self.profile = CompactOrderProfile(handle.objects, arrays["orders"], arrays["weights"], arrays["ties"], handle.numvoters)
+		self.pairwise = arrays.get("pairwise")
+		self.positions = arrays.get("positions")
+
+	def rows(self, start: int, end: int) -> CompactOrderProfile:
+		"""
+		Returns the orders start,...,end-1 as a CompactOrderProfile, without copying them.
+		"""
+		profile = self.profile
+		return CompactOrderProfile(profile.objects, profile.orders[start:end], profile.weights[start:end], profile.ties[start:end])
+
+	def close(self):
+		# The arrays must not be used after this; a mapping stays open while other references to its arrays exist.
+		self.profile = self.pairwise = self.positions = None
+		_closeSegments(self._segments)
+
+
+class SharedProfile(SharedProfileView):
+	"""
+	The owner of a shared profile: copies the profile into new shared segments, and unlinks them when closed.
+
+	>>> profile = CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,2,3],[2,3,1],[3,1,2],[1,3,2]], weights=[3,2,2,1])
+	>>> with SharedProfile(profile) as shared:
+	...     view = shared.handle.attach()
+	...     view.profile.get_map_from_order_to_weight() == profile.get_map_from_order_to_weight(), view.pairwise.tolist()
+	(True, [[0, 6, 4], [2, 0, 5], [4, 3, 0]])
+	>>> shared.handle.attach()   # doctest: +ELLIPSIS
+	Traceback (most recent call last):
+	...
+	FileNotFoundError: [Errno 2] No such file or directory: ...
+	"""
+
+	def __init__(self, profile: CompactOrderProfile, matrices: bool=True):
+		arrays = {"orders": profile.orders, "weights": profile.weights, "ties": profile.ties}
+		if matrices:
+			arrays["pairwise"] = winners.pairwiseMatrix(profile)
+			arrays["positions"] = winners.positionMatrix(profile)
+		self._segments = []
+		# Registered before the segments are created, so that they are unlinked even if a later one fails:
+		self._finalizer = weakref.finalize(self, _unlinkSegments, self._segments, os.getpid())
+		shared, handleArrays = {}, {}
+		for name, array in arrays.items():
+			array = np.ascontiguousarray(array)
+			memory = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+			self._segments.append(memory)
+			shared[name] = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)
+			shared[name][...] = array
+			shared[name].flags.writeable = False
+			handleArrays[name] = (memory.name, array.shape, array.dtype.str)
+		self.handle = SharedProfileHandle(profile.objects, profile.numvoters, handleArrays)
+		self._setArrays(self.handle, shared)
+
+	def close(self):
+		"""
+		Unlinks the shared segments. Workers that are still attached keep their mappings until they close them.
+		"""
+		self.profile = self.pairwise = self.positions = None
+		self.handle.detach()
+		self._finalizer()
+
+	def __enter__(self) -> 'SharedProfile':
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
+
+	def __reduce__(self):
+		raise TypeError("a SharedProfile cannot be pickled; send its handle to the workers instead")
+
+
+def _closeSegments(segments: list):
+	for memory in segments:
+		try:
+			memory.close()
+		except BufferError:
+			pass   # arrays on this segment are still referenced; the mapping is released when they are collected
+
+def _unlinkSegments(segments: list, ownerPid: int):
+	if os.getpid() != ownerPid:
+		return   # a forked worker inherited the owner's finalizer; only the owner unlinks
+	for memory in segments:
+		try:
+			memory.unlink()
+		except FileNotFoundError:
+			pass
+	_closeSegments(segments)
+
+
+def _runTask(task: tuple):
+	function, handle, argument = task
+	return function(handle.attach(), argument)
+
+def parallelMap(function, shared: SharedProfile, tasks: list, processes: int=None) -> list:
+	"""
+	Runs function(view, task) for each task in worker processes, where view is the SharedProfileView of the shared profile
+	in the worker. Only the handle, the function and the tasks are pickled. processes=1 runs the tasks in this process.
+
+	>>> profile = CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,2,3],[2,3,1],[3,1,2],[1,3,2]], weights=[3,2,2,1])
+	>>> with SharedProfile(profile) as shared:
+	...     parts = parallelMap(partialPairwise, shared, rowRanges(len(profile.orders), 3), processes=2)
+	...     bool(np.array_equal(sum(parts), shared.pairwise))
+	True
+	"""
+	tasks = [(function, shared.handle, task) for task in tasks]
+	if processes == 1:
+		return [_runTask(task) for task in tasks]
+	with Pool(processes) as pool:
+		return pool.map(_runTask, tasks)
+
+
+def rowRanges(numRows: int, numParts: int) -> list:
+	"""
+	Splits the rows 0,...,numRows-1 into at most numParts contiguous ranges of nearly equal sizes.
+
+	>>> rowRanges(10, 3)
+	[(0, 3), (3, 7), (7, 10)]
+	"""
+	bounds = np.linspace(0, numRows, min(numParts, max(numRows, 1))+1).round().astype(int).tolist()
+	return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def partialPairwise(view: SharedProfileView, rows: tuple) -> np.ndarray:
+	"""
+	The pairwise matrix of the orders in the given range of rows; summing over a partition of the rows gives winners.pairwiseMatrix.
+	"""
+	return winners.pairwiseMatrix(view.rows(*rows))
+
+
+if __name__ == "__main__":
+	import doctest, pickle, time
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	m, k = 10, 2*10**6
+	orders = np.argsort(np.random.random((k, m)), axis=1).astype(np.int32) + 1
+	profile = CompactOrderProfile({c: str(c) for c in range(1, m+1)}, orders=orders, weights=np.random.randint(1, 10, size=k))
+	with SharedProfile(profile, matrices=False) as shared:
+		print("pickled profile: {:.1f} MB; pickled handle: {} bytes".format(len(pickle.dumps(profile))/2**20, len(pickle.dumps(shared.handle))))
+	for processes in sorted({1, os.cpu_count()}):
+		start = time.time()
+		with SharedProfile(profile, matrices=False) as shared:
+			pairwise = sum(parallelMap(partialPairwise, shared, rowRanges(k, 4*processes), processes))
+		print("{} processes: pairwise matrix of {} orders in {:.2f} seconds".format(processes, k, time.time()-start))
@@ -0,0 +1,246 @@
+#!python3
+"""
+A heavy-hitter sketch of the frequent rankings of a stream of votes, in bounded memory.
+
+When there are many alternatives, almost every vote is distinct, so the exact dict from rankings to counts
+grows with the number of voters. But level-1 consensus (consensus.getLevel1Consensus) considers as axes
+only the rankings of maximal frequency, and these are heavy hitters when a consensus is plausible at all.
+
+The sketch is the Space-Saving algorithm of Metwally, Agrawal and El Abbadi (2005), with weighted updates:
+it keeps at most `capacity` counters. Each tracked ranking has an upper bound (its counter) and a lower bound
+(its counter minus the error inherited when it replaced another ranking) on its true frequency,
+and every untracked ranking has frequency at most `untrackedBound` <= numVoters / capacity.
+In particular, every ranking with frequency above numVoters / capacity is tracked.
+Sketches over parts of a stream are merged as in Agarwal et al., "Mergeable summaries" (2012).
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import heapq, itertools
+import numpy as np
+from preflibtools import io
+
+
+class RankingSketch:
+	"""
+	A Space-Saving sketch of the frequencies of rankings (tuples, as in get_map_from_order_to_weight).
+
+	>>> sketch = RankingSketch(capacity=2)
+	>>> for order in [(1,2,3), (1,2,3), (2,1,3), (3,2,1), (1,2,3)]:
+	...     sketch.add(order)
+	>>> sketch.bounds((1,2,3)), sketch.bounds((3,2,1)), sketch.bounds((2,1,3)), sketch.untrackedBound
+	((3, 3), (1, 2), (0, 1), 1)
+	>>> sketch.possibleAxes(), sketch.certainAxes()
+	([(1, 2, 3)], [(1, 2, 3)])
+	"""
+
+	def __init__(self, capacity: int):
+		if capacity < 1:
+			raise ValueError("capacity should be positive, not "+str(capacity))
+		self.capacity = capacity
+		self.counts = {}   # maps each tracked ranking to an upper bound on its frequency
+		self.errors = {}   # maps each tracked ranking to the maximal overestimation of its count
+		self.untrackedBound = 0
+		self.numVoters = 0
+		# A heap of (count, tiebreaker, ranking) for finding the minimal counter; entries whose count is outdated are skipped.
+		self._heap = []
+		self._tiebreaker = itertools.count()
+
+	def _push(self, order: tuple):
+		heapq.heappush(self._heap, (self.counts[order], next(self._tiebreaker), order))
+		if len(self._heap) > 4*self.capacity:
+			self._heap = [(count, next(self._tiebreaker), order) for order, count in self.counts.items()]
+			heapq.heapify(self._heap)
+
+	def _popMinimum(self) -> tuple:
+		while True:
+			count, _, order = heapq.heappop(self._heap)
+			if self.counts.get(order) == count:
+				return order
+
+	def add(self, order: tuple, weight: int=1):
+		"""
+		Adds weight votes with the given ranking, in O(log capacity) amortized time.
+		"""
+		self.numVoters += weight
+		if order in self.counts:
+			self.counts[order] += weight
+		elif len(self.counts) < self.capacity:
+			# After a merge, a ranking that is not tracked may already have up to untrackedBound votes.
+			self.counts[order] = self.untrackedBound + weight
+			self.errors[order] = self.untrackedBound
+		else:
+			# Replace the ranking with the minimal counter; the new ranking may have had that many votes before.
+			evicted = self._popMinimum()
+			minimum = self.counts.pop(evicted)
+			del self.errors[evicted]
+			self.untrackedBound = max(self.untrackedBound, minimum)
+			self.counts[order] = minimum + weight
+			self.errors[order] = minimum
+		self._push(order)
+
+	def addOrders(self, orders):
+		"""
+		Adds a stream of (order, weight) pairs, e.g. io.iter_preflib_orders or the items of get_map_from_order_to_weight.
+		"""
+		for order, weight in orders:
+			self.add(order, weight)
+
+	def addVotes(self, votes: np.ndarray, alternatives: list=None):
+		"""
+		Adds votes given as an int array with one ranking of 0,...,m-1 per row, as returned by the vote generators
+		(e.g. generate_profiles.gen_mallows_votes). The rows are aggregated first, so each distinct ranking is one update.
+		If alternatives is given, index i in a row stands for alternatives[i].
+
+		>>> sketch = RankingSketch(capacity=3)
+		>>> sketch.addVotes(np.array([[0,1,2], [2,1,0], [0,1,2]]), alternatives=["a", "b", "c"])
+		>>> sketch.topOrders()
+		[(('a', 'b', 'c'), 2, 2), (('c', 'b', 'a'), 1, 1)]
+		"""
+		votes = np.ascontiguousarray(votes)
+		# Comparing each row as one opaque value is much faster than np.unique(axis=0):
+		rows = votes.view(np.dtype((np.void, votes.dtype.itemsize*votes.shape[1]))).ravel()
+		_, first, counts = np.unique(rows, return_index=True, return_counts=True)
+		for order, count in zip(votes[first].tolist(), counts.tolist()):
+			self.add(tuple(order) if alternatives is None else tuple(alternatives[i] for i in order), count)
+
+	@staticmethod
+	def fromFile(path: str, capacity: int) -> 'RankingSketch':
+		"""
+		Returns a sketch of a PrefLib file of orders (possibly compressed), read as a stream.
+		"""
+		sketch = RankingSketch(capacity)
+		sketch.addOrders(io.iter_preflib_orders(path))
+		return sketch
+
+	def bounds(self, order: tuple) -> (int, int):
+		"""
+		Returns a lower bound and an upper bound on the frequency of the given ranking.
+		"""
+		if order in self.counts:
+			return (self.counts[order] - self.errors[order], self.counts[order])
+		return (0, self.untrackedBound)
+
+	def errorBound(self) -> int:
+		"""
+		The maximal difference between the upper and lower bounds of any ranking; at most numVoters / capacity.
+		"""
+		return max([self.untrackedBound] + list(self.errors.values()))
+
+	def topOrders(self, count: int=None) -> list:
+		"""
+		Returns the tracked rankings as triples (ranking, lower bound, upper bound), by descending upper bound.
+		"""
+		ordered = sorted(self.counts, key=lambda order: -self.counts[order])[:count]
+		return [(order,) + self.bounds(order) for order in ordered]
+
+	def heavyHitters(self, threshold: float) -> (list, list):
+		"""
+		Returns two lists of rankings: those whose frequency is certainly at least threshold,
+		and those whose frequency may be at least threshold (the untracked rankings certainly are not, if threshold > untrackedBound).
+
+		>>> sketch = RankingSketch.fromOrders([((1,2,3), 5), ((2,1,3), 3), ((3,2,1), 1)], capacity=2)
+		>>> sketch.heavyHitters(4), sketch.untrackedBound
+		(([(1, 2, 3)], [(1, 2, 3), (3, 2, 1)]), 3)
+		"""
+		certain = [order for order in self.counts if self.bounds(order)[0] >= threshold]
+		possible = [order for order in self.counts if self.counts[order] >= threshold]
+		return certain, possible
+
+	def possibleAxes(self) -> list:
+		"""
+		Returns the rankings that may have the maximal frequency, i.e. the potential axes of a level-1 consensus
+		(all other rankings are ruled out). Returns None if an untracked ranking may have the maximal frequency,
+		i.e. the capacity is too small to rule out the untracked rankings.
+		"""
+		if not self.counts:
+			return None
+		maxLower = max(self.bounds(order)[0] for order in self.counts)
+		if self.untrackedBound >= maxLower and self.untrackedBound > 0:
+			return None
+		return [order for order, lower, upper in self.topOrders() if upper >= maxLower]
+
+	def certainAxes(self) -> list:
+		"""
+		Returns the rankings that certainly have the maximal frequency:
+		their lower bound is at least the upper bound of every other ranking, tracked or not.
+
+		>>> sketch = RankingSketch.fromOrders([((1,2,3), 4), ((2,1,3), 4), ((3,2,1), 1)], capacity=3)
+		>>> sketch.certainAxes()
+		[(1, 2, 3), (2, 1, 3)]
+		"""
+		top = self.topOrders(2)
+		axes = []
+		for order in self.counts:
+			lower = self.bounds(order)[0]
+			# the largest upper bound of another tracked ranking:
+			otherUpper = max([upper for other, _, upper in top if other != order], default=0)
+			if lower >= self.untrackedBound and lower >= otherUpper:
+				axes.append(order)
+		return axes
+
+	def merge(self, other: 'RankingSketch'):
+		"""
+		Adds the votes summarized by another sketch. The merged sketch keeps the larger capacity of the two,
+		and its bounds remain valid for the combined stream.
+
+		>>> a = RankingSketch.fromOrders([((1,2,3), 5), ((2,1,3), 1)], capacity=2)
+		>>> b = RankingSketch.fromOrders([((1,2,3), 2), ((3,2,1), 3), ((3,1,2), 1)], capacity=2)
+		>>> a.merge(b)
+		>>> a.numVoters, a.topOrders(), a.untrackedBound
+		(12, [((1, 2, 3), 5, 7), ((3, 2, 1), 3, 3)], 3)
+		"""
+		combined = {}
+		for order in list(self.counts) + [order for order in other.counts if order not in self.counts]:
+			selfLower, selfUpper = self.bounds(order)
+			otherLower, otherUpper = other.bounds(order)
+			combined[order] = (selfUpper + otherUpper, selfUpper + otherUpper - selfLower - otherLower)
+		self.capacity = max(self.capacity, other.capacity)
+		kept = sorted(combined, key=lambda order: (-combined[order][0], combined[order][1]))
+		untrackedBound = self.untrackedBound + other.untrackedBound
+		if len(kept) > self.capacity:
+			untrackedBound = max(untrackedBound, combined[kept[self.capacity]][0])
+			kept = kept[:self.capacity]
+		self.counts = {order: combined[order][0] for order in kept}
+		self.errors = {order: combined[order][1] for order in kept}
+		self.untrackedBound = untrackedBound
+		self.numVoters += other.numVoters
+		self._heap = [(count, next(self._tiebreaker), order) for order, count in self.counts.items()]
+		heapq.heapify(self._heap)
+
+	@staticmethod
+	def fromOrders(orders, capacity: int) -> 'RankingSketch':
+		sketch = RankingSketch(capacity)
+		sketch.addOrders(orders)
+		return sketch
+
+	def __getstate__(self):
+		# The heap is rebuilt after unpickling, so that sketches are cheap to send between processes.
+		state = dict(self.__dict__)
+		del state["_heap"], state["_tiebreaker"]
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._tiebreaker = itertools.count()
+		self._heap = [(count, next(self._tiebreaker), order) for order, count in self.counts.items()]
+		heapq.heapify(self._heap)
+
+
+if __name__ == "__main__":
+	import doctest, time
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	from preflibtools import generate_profiles
+	m, n = 50, 10**6
+	ref = list(range(m))
+	votes = [generate_profiles.gen_mallows_votes(10**5, ref, 0.02) for _ in range(n // 10**5)]
+	start = time.time()
+	sketch = RankingSketch(capacity=1000)
+	for chunk in votes:
+		sketch.addVotes(chunk)
+	print("{} Mallows votes over {} alternatives in {:.2f} seconds; error bound {}".format(n, m, time.time()-start, sketch.errorBound()))
+	print("top orders (lower, upper):", [(lower, upper) for order, lower, upper in sketch.topOrders(5)])
+	print("certain axes:", sketch.certainAxes() == [tuple(ref)], "possible axes:", len(sketch.possibleAxes() or []))
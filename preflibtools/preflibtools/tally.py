@@ -0,0 +1,366 @@
+#!python3
+"""
+A live tally of votes, that keeps the majority relation and the winners current as votes are added or retracted.
+
+The tally holds the pairwise matrix, the positional histogram (as in winners.pairwiseMatrix and winners.positionMatrix)
+and the count of each distinct order. Adding or removing a vote updates them in O(m^2);
+the Condorcet, plurality and Borda winners are computed from them in O(m^2).
+
+Tallies are also mergeable summaries: merging is associative and commutative, so the shards of a large
+ballot set can be tallied separately (in worker processes, or on other machines, saved as JSON files)
+and combined in a reduction tree. For example:
+
+	preflib-tally summarize shard1/*.soc -o shard1.json     # on one machine
+	preflib-tally summarize shard2/*.soc -o shard2.json     # on another machine
+	preflib-tally merge shard1.json shard2.json -o all.json
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import argparse, json, numbers
+from multiprocessing import Pool
+import numpy as np
+from preflibtools import io, winners
+from preflibtools.profile import CompactOrderProfile
+
+
+class VoteTally:
+	"""
+	A mutable tally of votes over a fixed set of objects.
+
+	An order is a tuple in the format of get_order_tuple: objects from best to worst,
+	where tied objects are grouped in a tuple; objects that do not appear are unranked.
+	Matrices are indexed by the position of each object in sorted(objects).
+
+	>>> tally = VoteTally({1:"a", 2:"b", 3:"c"})
+	>>> tally.add((1,2,3), 3)
+	>>> tally.add((2,3,1), 2)
+	>>> tally.add((3,1,2), 2)
+	>>> tally.pairwise
+	array([[0, 5, 3],
+	       [2, 0, 5],
+	       [4, 2, 0]])
+	>>> tally.condorcetWinner() is None, tally.bordaWinners(), tally.pluralityWinners()
+	(True, [1], [1])
+	>>> tally.remove((3,1,2), 2)
+	>>> tally.condorcetWinner(), tally.numVoters, tally.orderCounts
+	(1, 5, {(1, 2, 3): 3, (2, 3, 1): 2})
+	>>> tally.add(((2,3),), 1)   # a vote that ties 2 and 3 first, and leaves 1 unranked (so neither is counted as preferred to 1)
+	>>> tally.positions[:, 0].tolist(), tally.pairwise[1].tolist()
+	([3, 3, 1], [2, 0, 5])
+	"""
+
+	def __init__(self, objects: dict):
+		self.objects = objects
+		self.sortedObjects = sorted(objects)
+		self.indexOf = {obj: i for i, obj in enumerate(self.sortedObjects)}
+		m = len(self.sortedObjects)
+		self.pairwise = np.zeros((m, m), dtype=np.int64)
+		self.positions = np.zeros((m, m), dtype=np.int64)
+		self.orderCounts = {}
+		self.numVoters = 0
+
+	def _groupRanks(self, order: tuple) -> np.ndarray:
+		# The index of the tie-group of each object in the order, or inf if the order does not rank it.
+		ranks = np.full(len(self.sortedObjects), np.inf)
+		for group, members in enumerate(order):
+			for obj in (members if isinstance(members, tuple) else (members,)):
+				ranks[self.indexOf[obj]] = group
+		return ranks
+
+	def _update(self, order: tuple, weight: int):
+		ranks = self._groupRanks(order)
+		ranked = np.isfinite(ranks)
+		self.pairwise += weight * ((ranks[:,None] < ranks[None,:]) & ranked[None,:])
+		self.positions[np.nonzero(ranked)[0], ranks[ranked].astype(np.int64)] += weight
+		self.numVoters += weight
+
+	def add(self, order: tuple, weight: int=1):
+		"""
+		Adds weight votes with the given order. Raises ValueError if weight is not a positive integer.
+
+		>>> tally = VoteTally({1:"a", 2:"b"})
+		>>> tally.add((1,2), np.int64(2)); tally.orderCounts
+		{(1, 2): 2}
+		>>> tally.add((2,1), 0)
+		Traceback (most recent call last):
+		...
+		ValueError: the weight of a vote should be a positive integer, not 0
+		>>> tally.add((2,1), 1.5)
+		Traceback (most recent call last):
+		...
+		ValueError: the weight of a vote should be a positive integer, not 1.5
+		"""
+		weight = _checkWeight(weight)
+		order = _canonicalOrder(order)
+		self._update(order, weight)
+		self.orderCounts[order] = self.orderCounts.get(order, 0) + weight
+
+	def remove(self, order: tuple, weight: int=1):
+		"""
+		Retracts weight votes with the given order. Raises ValueError if there are fewer such votes.
+
+		>>> tally = VoteTally({1:"a", 2:"b"})
+		>>> tally.add((1,2))
+		>>> tally.remove((2,1))
+		Traceback (most recent call last):
+		...
+		ValueError: cannot remove 1 votes of (2, 1): the tally has 0
+		>>> tally.remove((1,2), -1)
+		Traceback (most recent call last):
+		...
+		ValueError: the weight of a vote should be a positive integer, not -1
+		"""
+		weight = _checkWeight(weight)
+		order = _canonicalOrder(order)
+		count = self.orderCounts.get(order, 0)
+		if weight > count:
+			raise ValueError("cannot remove {} votes of {}: the tally has {}".format(weight, order, count))
+		self._update(order, -weight)
+		if count == weight:
+			del self.orderCounts[order]
+		else:
+			self.orderCounts[order] = count - weight
+
+	def merge(self, other: 'VoteTally'):
+		"""
+		Adds all the votes of another tally (over the same objects) to this tally.
+
+		>>> a, b = VoteTally({1:"a", 2:"b"}), VoteTally({1:"a", 2:"b"})
+		>>> a.add((1,2), 2); b.add((2,1), 3); b.add((1,2))
+		>>> a.merge(b)
+		>>> a.orderCounts, a.numVoters, a.pluralityWinners()
+		({(1, 2): 3, (2, 1): 3}, 6, [1, 2])
+		>>> a.merge(VoteTally({1:"a", 3:"c"}))
+		Traceback (most recent call last):
+		...
+		ValueError: cannot merge tallies over different objects: [1, 2] and [1, 3]
+		"""
+		if self.sortedObjects != other.sortedObjects:
+			raise ValueError("cannot merge tallies over different objects: {} and {}".format(self.sortedObjects, other.sortedObjects))
+		self.pairwise += other.pairwise
+		self.positions += other.positions
+		for order, count in other.orderCounts.items():
+			self.orderCounts[order] = self.orderCounts.get(order, 0) + count
+		self.numVoters += other.numVoters
+
+	def __add__(self, other: 'VoteTally') -> 'VoteTally':
+		merged = self.snapshot()
+		merged.merge(other)
+		return merged
+
+	def __eq__(self, other) -> bool:
+		return isinstance(other, VoteTally) and self.objects == other.objects and self.orderCounts == other.orderCounts \
+			and self.numVoters == other.numVoters and np.array_equal(self.pairwise, other.pairwise) and np.array_equal(self.positions, other.positions)
+
+	# The interface of the profile classes, so that the analyses of full profiles accept a tally:
+
+	@property
+	def numvoters(self) -> int:
+		return self.numVoters
+
+	def num_of_alternatives(self) -> int:
+		return len(self.sortedObjects)
+
+	def get_map_from_order_to_weight(self) -> dict:
+		return dict(self.orderCounts)
+
+	def toProfile(self) -> CompactOrderProfile:
+		"""
+		Returns a CompactOrderProfile with the distinct orders of the tally.
+
+		>>> tally = VoteTally({1:"a", 2:"b", 3:"c"})
+		>>> tally.add((3,1,2), 2); tally.add(((1,2),3))
+		>>> tally.toProfile().get_order_strings()
+		['3,1,2', '{1,2},3']
+		"""
+		return CompactOrderProfile.from_map(self.objects, self.orderCounts, self.numVoters)
+
+	def condorcetWinner(self):
+		return winners.condorcetWinner(self.pairwise, self.sortedObjects)
+
+	def scoringWinners(self, scoreVector) -> list:
+		return winners.scoringWinners(self.positions, scoreVector, self.sortedObjects)
+
+	def pluralityWinners(self) -> list:
+		return self.scoringWinners(winners.pluralityVector(len(self.sortedObjects)))
+
+	def bordaWinners(self) -> list:
+		return self.scoringWinners(winners.bordaVector(len(self.sortedObjects)))
+
+	def snapshot(self) -> 'VoteTally':
+		"""
+		Returns an independent copy of the tally, that does not change when the tally does.
+
+		>>> tally = VoteTally({1:"a", 2:"b"})
+		>>> tally.add((1,2))
+		>>> frozen = tally.snapshot()
+		>>> tally.add((2,1), 2)
+		>>> frozen.pluralityWinners(), tally.pluralityWinners()
+		([1], [2])
+		"""
+		copy = VoteTally.__new__(VoteTally)
+		copy.objects = dict(self.objects)
+		copy.sortedObjects = list(self.sortedObjects)
+		copy.indexOf = dict(self.indexOf)
+		copy.pairwise = self.pairwise.copy()
+		copy.positions = self.positions.copy()
+		copy.orderCounts = dict(self.orderCounts)
+		copy.numVoters = self.numVoters
+		return copy
+
+	def toDict(self) -> dict:
+		"""
+		Returns a JSON-serializable dict with the objects, the order counts and the matrices.
+
+		>>> tally = VoteTally({1:"a", 2:"b", 3:"c"})
+		>>> tally.add(((1,3),2), 4)
+		>>> restored = VoteTally.fromDict(json.loads(json.dumps(tally.toDict())))
+		>>> restored.orderCounts, restored.objects, bool((restored.pairwise == tally.pairwise).all())
+		({((1, 3), 2): 4}, {1: 'a', 2: 'b', 3: 'c'}, True)
+		"""
+		return {
+			"objects": [[obj, name] for obj, name in self.objects.items()],
+			"orders": [[[list(g) if isinstance(g, tuple) else g for g in order], count] for order, count in self.orderCounts.items()],
+			"pairwise": self.pairwise.tolist(),
+			"positions": self.positions.tolist(),
+			"numVoters": self.numVoters,
+		}
+
+	@staticmethod
+	def fromDict(data: dict) -> 'VoteTally':
+		tally = VoteTally({obj: name for obj, name in data["objects"]})
+		tally.orderCounts = {_canonicalOrder(order): count for order, count in data["orders"]}
+		tally.pairwise = np.array(data["pairwise"], dtype=np.int64).reshape(tally.pairwise.shape)
+		tally.positions = np.array(data["positions"], dtype=np.int64).reshape(tally.positions.shape)
+		tally.numVoters = data["numVoters"]
+		return tally
+
+	def save(self, path: str):
+		with open(path, "w") as file:
+			json.dump(self.toDict(), file)
+
+	@staticmethod
+	def load(path: str) -> 'VoteTally':
+		with open(path) as file:
+			return VoteTally.fromDict(json.load(file))
+
+	@staticmethod
+	def fromOrders(objects: dict, orders) -> 'VoteTally':
+		"""
+		Returns a tally of a stream of (order, weight) pairs, e.g. the items of get_map_from_order_to_weight.
+
+		>>> VoteTally.fromOrders({1:"a", 2:"b"}, iter([((1,2), 2), ((2,1), 1), ((1,2), 1)])).orderCounts
+		{(1, 2): 3, (2, 1): 1}
+		"""
+		tally = VoteTally(objects)
+		for order, weight in orders:
+			tally.add(order, weight)
+		return tally
+
+	@staticmethod
+	def fromProfile(profile) -> 'VoteTally':
+		"""
+		Returns a tally of the orders of a profile. For a CompactOrderProfile, the matrices are computed for all orders at once.
+
+		>>> tally = VoteTally.fromProfile(CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,2,3],[2,3,1],[3,1,2]], weights=[3,2,2]))
+		>>> tally.pairwise.tolist(), tally.bordaWinners()
+		([[0, 5, 3], [2, 0, 5], [4, 2, 0]], [1])
+		"""
+		if not isinstance(profile, CompactOrderProfile):
+			return VoteTally.fromOrders(profile.objects, profile.get_map_from_order_to_weight().items())
+		tally = VoteTally(profile.objects)
+		tally.pairwise = winners.pairwiseMatrix(profile).astype(np.int64)
+		tally.positions = winners.positionMatrix(profile).astype(np.int64)
+		tally.orderCounts = profile.get_map_from_order_to_weight()
+		tally.numVoters = sum(tally.orderCounts.values())
+		return tally
+
+	@staticmethod
+	def fromFile(path: str) -> 'VoteTally':
+		"""
+		Returns a tally of a PrefLib file of orders (possibly compressed; see io.read_compact_preflib_file).
+		"""
+		return VoteTally.fromProfile(io.read_compact_preflib_file(path))
+
+
+def _mergePair(pair: tuple) -> VoteTally:
+	return pair[0] + pair[1] if len(pair) == 2 else pair[0]
+
+def mergeTallies(tallies: list, pool: Pool=None) -> VoteTally:
+	"""
+	Merges a list of tallies in a balanced reduction tree; with a multiprocessing pool, the merges of each level run in parallel.
+
+	>>> tallies = [VoteTally.fromOrders({1:"a", 2:"b"}, [((1,2), i), ((2,1), 1)]) for i in range(1, 6)]
+	>>> merged = mergeTallies(tallies)
+	>>> merged.orderCounts, merged == mergeTallies(tallies[::-1])
+	({(1, 2): 15, (2, 1): 5}, True)
+	"""
+	if len(tallies) == 0:
+		raise ValueError("no tallies to merge")
+	tallies = list(tallies)
+	while len(tallies) > 1:
+		pairs = [tuple(tallies[i:i+2]) for i in range(0, len(tallies), 2)]
+		tallies = pool.map(_mergePair, pairs) if pool is not None else list(map(_mergePair, pairs))
+	return tallies[0]
+
+def tallyFiles(paths: list, processes: int=None) -> VoteTally:
+	"""
+	Tallies each file in a worker process, and merges the tallies in a reduction tree.
+	"""
+	if processes == 1 or len(paths) <= 1:
+		return mergeTallies([VoteTally.fromFile(path) for path in paths])
+	with Pool(processes) as pool:
+		return mergeTallies(pool.map(VoteTally.fromFile, paths), pool)
+
+
+def main(argv: list=None):
+	parser = argparse.ArgumentParser(description='Tally PrefLib files into mergeable JSON summaries, and merge summaries.')
+	subparsers = parser.add_subparsers(dest='command', required=True)
+	summarizeParser = subparsers.add_parser('summarize', help='Tally PrefLib files of orders (one shard of an election) into one summary.')
+	summarizeParser.add_argument('files', nargs='+')
+	summarizeParser.add_argument('-p', '--processes', type=int, default=None, help='Number of worker processes (default: the number of cores).')
+	summarizeParser.add_argument('-o', '--output', default=None, help='JSON file for the summary.')
+	mergeParser = subparsers.add_parser('merge', help='Merge JSON summaries (e.g. of shards from different machines).')
+	mergeParser.add_argument('files', nargs='+')
+	mergeParser.add_argument('-o', '--output', default=None, help='JSON file for the merged summary.')
+	args = parser.parse_args(argv)
+
+	if args.command == 'summarize':
+		tally = tallyFiles(args.files, args.processes)
+	else:
+		tally = mergeTallies([VoteTally.load(path) for path in args.files])
+	if args.output:
+		tally.save(args.output)
+	print("voters: {}, distinct orders: {}".format(tally.numVoters, len(tally.orderCounts)))
+	print("Condorcet winner: {}".format(tally.condorcetWinner()))
+	print("plurality winners: {}".format(tally.pluralityWinners()))
+	print("Borda winners: {}".format(tally.bordaWinners()))
+	return 0
+
+
+def _checkWeight(weight) -> int:
+	# Zero, negative or fractional weights would leave the matrices and the order counts inconsistent.
+	if isinstance(weight, bool) or not isinstance(weight, numbers.Integral) or weight <= 0:
+		raise ValueError("the weight of a vote should be a positive integer, not {}".format(weight))
+	return int(weight)
+
+def _canonicalOrder(order) -> tuple:
+	# Orders are dict keys, so tie-groups (possibly given as lists, e.g. from JSON) become tuples.
+	return tuple(tuple(g) if isinstance(g, (tuple, list)) else g for g in order)
+
+
+if __name__ == "__main__":
+	import doctest, time
+	doctest.testmod()
+	print("Doctest OK!\n")
+
+	m = 20
+	tally = VoteTally({c: str(c) for c in range(1, m+1)})
+	votes = [tuple(np.random.permutation(m)+1) for _ in range(10000)]
+	start = time.time()
+	for vote in votes:
+		tally.add(vote)
+		tally.condorcetWinner()
+	print("{} votes with {} alternatives, each followed by a Condorcet query, in {:.2f} seconds".format(len(votes), m, time.time()-start))
@@ -0,0 +1,114 @@
+#!python3
+"""
+Pairwise and positional summaries of a profile, and the winners they determine
+(Condorcet winner, plurality, Borda and other scoring rules).
+
+The summaries are numpy matrices indexed by the position of each object in sorted(objects),
+computed for all the orders of a profile.CompactOrderProfile at once.
+
+Author:  Erel Segal-Halevi
+Date:    2026-10
+"""
+
+import numpy as np
+
+def groupRanks(profile) -> np.ndarray:
+	"""
+	Returns a float array of shape (k, m); element [j,c] is the index of the tie-group of the c-th object
+	(in sorted(profile.objects)) in the j-th order, or inf if the j-th order does not rank that object.
+
+	>>> from preflibtools.profile import CompactOrderProfile
+	>>> groupRanks(CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[3,1,2],[2,3,0]], ties=[[False,True,False],[False,False,False]]))
+	array([[ 0.,  1.,  0.],
+	       [inf,  0.,  1.]])
+	"""
+	objects = sorted(profile.objects)
+	lookup = np.zeros(max(objects)+1, dtype=np.int64)
+	lookup[objects] = np.arange(len(objects))
+	ranks = np.full((len(profile.orders), len(objects)), np.inf)
+	groups = np.cumsum(~profile.ties, axis=1) - 1
+	rows, positions = np.nonzero(profile.orders > 0)
+	ranks[rows, lookup[profile.orders[rows, positions]]] = groups[rows, positions]
+	return ranks
+
+
+def pairwiseMatrix(profile, chunkSize: int=2**22) -> np.ndarray:
+	"""
+	Returns the weighted majority matrix: element [c,d] is the total weight of the orders
+	that rank the c-th object strictly above the d-th object (both must be ranked).
+
+	>>> from preflibtools.profile import CompactOrderProfile
+	>>> pairwiseMatrix(CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,2,3],[2,3,1],[3,1,2]], weights=[3,2,2]))
+	array([[0, 5, 3],
+	       [2, 0, 5],
+	       [4, 2, 0]])
+	"""
+	ranks = groupRanks(profile)
+	m = ranks.shape[1]
+	weights = profile.weights
+	pairwise = np.zeros((m, m), dtype=np.result_type(weights, np.int64))
+	rowsPerChunk = max(1, chunkSize // (m*m))
+	for start in range(0, len(ranks), rowsPerChunk):
+		chunk = ranks[start:start+rowsPerChunk]
+		above = (chunk[:,:,None] < chunk[:,None,:]) & np.isfinite(chunk[:,None,:])
+		pairwise += np.einsum("j,jcd->cd", weights[start:start+rowsPerChunk], above.astype(pairwise.dtype))
+	return pairwise
+
+
+def positionMatrix(profile) -> np.ndarray:
+	"""
+	Returns the positional histogram: element [c,p] is the total weight of the orders in which
+	the c-th object is in the p-th tie-group (for strict orders, in position p).
+
+	>>> from preflibtools.profile import CompactOrderProfile
+	>>> positionMatrix(CompactOrderProfile({1:"a",2:"b",3:"c"}, orders=[[1,2,3],[2,3,1],[3,1,2]], weights=[3,2,2]))
+	array([[3, 2, 2],
+	       [2, 3, 2],
+	       [2, 2, 3]])
+	"""
+	ranks = groupRanks(profile)
+	m = ranks.shape[1]
+	positions = np.zeros((m, m), dtype=np.result_type(profile.weights, np.int64))
+	rows, objects = np.nonzero(np.isfinite(ranks))
+	np.add.at(positions, (objects, ranks[rows, objects].astype(np.int64)), profile.weights[rows])
+	return positions
+
+
+def condorcetWinner(pairwise: np.ndarray, objects: list):
+	"""
+	Returns the object that beats every other object in the pairwise matrix, or None if there is no such object.
+
+	>>> condorcetWinner(np.array([[0,5,3],[2,0,5],[4,2,0]]), [1,2,3]) is None
+	True
+	>>> condorcetWinner(np.array([[0,5,5],[2,0,5],[2,2,0]]), [1,2,3])
+	1
+	"""
+	winning = np.nonzero((pairwise > pairwise.T).sum(axis=1) == len(objects)-1)[0]
+	return objects[winning[0]] if len(winning) > 0 else None
+
+
+def pluralityVector(m: int) -> np.ndarray:
+	return np.eye(1, m, dtype=np.int64)[0]
+
+def bordaVector(m: int) -> np.ndarray:
+	return np.arange(m-1, -1, -1)
+
+def scoringWinners(positions: np.ndarray, scoreVector, objects: list) -> list:
+	"""
+	Returns the list of objects with the maximum score under the given positional scoring vector.
+
+	>>> scoringWinners(np.array([[3,2,2],[2,3,2],[2,2,3]]), bordaVector(3), [1,2,3])
+	[1]
+	>>> scoringWinners(np.array([[2,2,2],[2,2,2],[2,2,2]]), bordaVector(3), [1,2,3])
+	[1, 2, 3]
+	>>> scoringWinners(np.array([[3,2,2],[2,3,2],[1,2,4]]), pluralityVector(3), [1,2,3])
+	[1]
+	"""
+	scores = positions @ np.asarray(scoreVector)
+	return [objects[c] for c in np.nonzero(scores == scores.max())[0]]
+
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
+	print("Doctest OK!\n")
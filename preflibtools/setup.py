@@ -38,7 +38,7 @@ with open('HISTORY.rst') as history_file:
 '''
 
 requirements = [
-    # TODO: put package requirements here
+    'numpy>=1.17',  # np.random.SeedSequence
 ]
 
 test_requirements = [
@@ -60,6 +60,13 @@ setup(
     #             '{{ cookiecutter.repo_name }}'},
     #include_package_data=True,
     install_requires=requirements,
+    python_requires='>=3.8',  # multiprocessing.shared_memory
+    entry_points={
+        'console_scripts': [
+            'preflib-analyze=preflibtools.analyze:main',
+            'preflib-tally=preflibtools.tally:main',
+        ],
+    },
     #license="BSD",
     #zip_safe=False,
     #keywords='{{ cookiecutter.repo_name }}',